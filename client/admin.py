@@ -1,11 +1,36 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import Count
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from unfold.admin import ModelAdmin
-from unfold.decorators import display
+from unfold.decorators import action, display
+from unfold.widgets import UnfoldAdminFileFieldWidget
 
+from le_vanille.admin_metrics import admin_metric, get_metric
+from .imports import import_clients
 from .models import Shop, Client, Banner
 
+# Import sahifasida ko'rsatiladigan xatolar soni
+ERROR_PREVIEW = 200
+
+
+class ClientImportForm(forms.Form):
+    file = forms.FileField(label="Fayl (XLSX yoki CSV)", widget=UnfoldAdminFileFieldWidget)
+
+
+@admin_metric("shops_total", Shop)
+def shops_total():
+    return Shop.objects.count()
+
+
+@admin_metric("clients_total", Client)
+def clients_total():
+    return Client.objects.count()
+
 
 @admin.register(Banner)
 class BannerAdmin(ModelAdmin):
@@ -28,16 +53,19 @@ class ShopAdmin(ModelAdmin):
         # Format: (Sarlavha, Ikonka_yoki_Izoh)
         return obj.name
 
-    @display(description="Mijozlar soni", label=True)
+    @display(description="Mijozlar soni", label=True, ordering="clients_count")
     def clients_count_badge(self, obj):
-        count = obj.clients.count()
-        return f"{count} ta mijoz"
+        # get_queryset dagi annotatsiyadan: har qator uchun alohida COUNT yo'q
+        return f"{obj.clients_count} ta mijoz"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(clients_count=Count("clients"))
 
     def get_list_display_metrics(self, request):
         return [
             {
                 "title": "Jami do‘konlar",
-                "value": Shop.objects.count(),
+                "value": get_metric("shops_total"),
                 "icon": "store",
                 "color": "primary",
             },
@@ -110,16 +138,17 @@ class ClientAdmin(ModelAdmin):
         return format_html('<span class="text-gray-400 italic">Joylashuv yo‘q</span>')
 
     def get_list_display_metrics(self, request):
+        clients = get_metric("clients_total")
         return [
             {
                 "title": "Jami mijozlar",
-                "value": Client.objects.count(),
+                "value": clients,
                 "icon": "group",
                 "color": "info",
             },
             {
                 "title": "Tizimdagi faollik",
-                "value": Client.objects.all().count(),
+                "value": clients,
                 "icon": "analytics",
                 "color": "success",
             },
@@ -127,3 +156,32 @@ class ClientAdmin(ModelAdmin):
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('shop')
+
+    @action(description="Excel/CSV dan import", url_path="import", permissions=["add"], icon="upload_file")
+    def import_clients(self, request):
+        form = ClientImportForm(request.POST or None, request.FILES or None)
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Mijozlarni import qilish",
+            "opts": self.model._meta,
+            "form": form,
+        }
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            try:
+                result = import_clients(upload, upload.name)
+            except ValueError as e:
+                form.add_error("file", str(e))
+            else:
+                self.message_user(request, f"Yangi: {result.created}, yangilangan: {result.updated}")
+                if not result.errors:
+                    return redirect(reverse("admin:client_client_changelist"))
+                self.message_user(request, f"{len(result.errors)} ta qator xato bilan o'tkazib yuborildi",
+                                  level=messages.WARNING)
+                context["import_errors"] = {
+                    "headers": ["Qator", "Xato"], "rows": result.errors[:ERROR_PREVIEW],
+                }
+                context["more_errors"] = max(len(result.errors) - ERROR_PREVIEW, 0)
+        return TemplateResponse(request, "admin/client/client/import_clients.html", context)
+
+    actions_list = ["import_clients"]
@@ -0,0 +1,111 @@
+import threading
+import time
+from collections import OrderedDict
+
+from config.env_config import CLIENT_CACHE_SIZE, CLIENT_CACHE_TTL
+from le_vanille.metrics import cache_result
+from .models import Client, Shop
+
+# Buyurtma va hisobot uchun kerak bo'lgan maydonlar
+FIELDS = ("id", "telegram_id", "shop_id", "shop__name", "full_name", "phone", "filial_name", "latitude", "longitude")
+
+
+class ClientCache:
+    """telegram_id -> mijoz ma'lumotlari uchun jarayon ichidagi LRU kesh (TTL bilan)"""
+
+    def __init__(self, maxsize=CLIENT_CACHE_SIZE, ttl=CLIENT_CACHE_TTL, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, telegram_id):
+        with self._lock:
+            entry = self._data.get(telegram_id)
+            if entry is None:
+                return None
+            expires, row = entry
+            if expires < self.clock():
+                del self._data[telegram_id]
+                return None
+            self._data.move_to_end(telegram_id)
+            return row
+
+    def set(self, telegram_id, row):
+        if not self.maxsize:
+            return
+        with self._lock:
+            self._data[telegram_id] = (self.clock() + self.ttl, row)
+            self._data.move_to_end(telegram_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def evict(self, telegram_id=None, client_id=None, shop_id=None):
+        with self._lock:
+            if telegram_id is not None:
+                self._data.pop(telegram_id, None)
+            if client_id is not None or shop_id is not None:
+                for key, (_, row) in list(self._data.items()):
+                    if row["id"] == client_id or row["shop_id"] == shop_id:
+                        del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+client_cache = ClientCache()
+
+
+def parse_telegram_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def to_client(row):
+    """Keshdagi qatordan Client obyekti (shop bilan birga, bazaga murojaatsiz)"""
+    row = dict(row)
+    shop = Shop(id=row["shop_id"], name=row.pop("shop__name"))
+    client = Client(**row)
+    client.shop = shop
+    return client
+
+
+def cached_client(telegram_id):
+    """Faqat keshdan (topilmasa None)"""
+    row = client_cache.get(telegram_id)
+    cache_result("client", row is not None)
+    return to_client(row) if row else None
+
+
+def get_client(telegram_id):
+    """Mijozni keshdan, bo'lmasa bazadan (unique indeks bo'yicha) olish; topilmasa None"""
+    telegram_id = parse_telegram_id(telegram_id)
+    if telegram_id is None:
+        return None
+    client = cached_client(telegram_id)
+    if client is None:
+        row = Client.objects.filter(telegram_id=telegram_id).values(*FIELDS).first()
+        if row is None:
+            return None
+        client_cache.set(telegram_id, row)
+        client = to_client(row)
+    return client
+
+
+async def aget_client(telegram_id):
+    """get_client ning async varianti"""
+    telegram_id = parse_telegram_id(telegram_id)
+    if telegram_id is None:
+        return None
+    client = cached_client(telegram_id)
+    if client is None:
+        row = await Client.objects.filter(telegram_id=telegram_id).values(*FIELDS).afirst()
+        if row is None:
+            return None
+        client_cache.set(telegram_id, row)
+        client = to_client(row)
+    return client
@@ -0,0 +1,217 @@
+"""Kompaniya/filial nomlaridagi dublikatlarni topish (sample.py ning kengaytirilgani).
+
+Har bir nomni hamma nomlar bilan solishtirish o'rniga nomlar trigrammalari bo'yicha teskari
+indeksga joylanadi. Indeksga nomning faqat eng kam uchraydigan trigrammalari (prefix filtering)
+kiradi: trigrammalarining kamida ``min_overlap`` qismi umumiy bo'lgan ikki nom albatta shu
+prefikslardan birini baham ko'radi. Qolgan nomzod juftliklar bir nechta jarayonda
+``SequenceMatcher`` bilan baholanadi va o'xshashlar union-find bilan guruhlanadi.
+"""
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+
+from openpyxl import Workbook, load_workbook
+from openpyxl.utils import column_index_from_string
+
+THRESHOLD = 85
+NGRAM = 3
+MIN_OVERLAP = 0.5
+CHUNK_SIZE = 2000
+# Bundan kam nomni jarayonlarga bo'lishga arzimaydi
+PARALLEL_MIN = 5000
+RESULT_COLUMN = "standard_company_name"
+DIGITS = re.compile(r"\d+")
+
+
+def clean_name(text):
+    """sample.py dagi clean_text_basic: boshi/oxiridagi raqamlar va qisqartmalar"""
+    if text is None:
+        return ""
+    text = str(text)
+    text = re.sub(r'[\s\-\.]+\d+$', '', text)
+    text = re.sub(r'^\d+[\s\-\.]+', '', text)
+    text = text.replace('Logistics', 'Log')
+    return " ".join(text.split())
+
+
+def name_key(name):
+    """Solishtirish kaliti: kichik harf, tinish belgilarisiz"""
+    return " ".join(re.sub(r"[^\w]+", " ", name.casefold()).split())
+
+
+def ngrams(key, n=NGRAM):
+    padded = f" {key} "
+    return frozenset(padded[i:i + n] for i in range(max(len(padded) - n + 1, 1)))
+
+
+def score(a, b, sorted_a, sorted_b):
+    """0..100: to'g'ridan-to'g'ri va so'zlar tartiblangan holdagi o'xshashlikning kattasi"""
+    # Faqat raqami bilan farq qiladigan nomlar ("Kafe 12 Chilonzor" va "Kafe 13 Chilonzor") boshqa-boshqa
+    if DIGITS.findall(a) != DIGITS.findall(b):
+        return 0
+    ratio = SequenceMatcher(None, a, b).ratio()
+    if sorted_a != a or sorted_b != b:
+        ratio = max(ratio, SequenceMatcher(None, sorted_a, sorted_b).ratio())
+    return ratio * 100
+
+
+class Matcher:
+    """Teskari indeks; jarayonlarga bir marta (initializer orqali) uzatiladi"""
+
+    def __init__(self, keys, threshold=THRESHOLD, min_overlap=MIN_OVERLAP):
+        self.keys = keys
+        self.sorted_keys = [" ".join(sorted(key.split())) for key in keys]
+        self.grams = [ngrams(key) for key in keys]
+        self.threshold = threshold
+        self.min_overlap = min_overlap
+
+        # Trigrammalar kam uchraydiganidan ko'piga qarab tartiblanadi
+        frequency = Counter(gram for grams in self.grams for gram in grams)
+        self.prefixes = []
+        self.index = defaultdict(list)
+        for number, grams in enumerate(self.grams):
+            ordered = sorted(grams, key=lambda gram: (frequency[gram], gram))
+            prefix = ordered[:len(ordered) - self.required(len(ordered)) + 1]
+            self.prefixes.append(prefix)
+            for gram in prefix:
+                self.index[gram].append(number)
+
+    def required(self, size):
+        return max(math.ceil(self.min_overlap * size), 1)
+
+    def candidates(self, number):
+        found = set()
+        for gram in self.prefixes[number]:
+            found.update(other for other in self.index[gram] if other > number)
+        return found
+
+    def pairs(self, start, stop):
+        """``[start, stop)`` oralig'idagi nomlar uchun o'xshash juftliklar"""
+        result = []
+        for number in range(start, stop):
+            key, grams = self.keys[number], self.grams[number]
+            for other in self.candidates(number):
+                other_key, other_grams = self.keys[other], self.grams[other]
+                # Uzunlik farqi katta bo'lsa ratio chegaraga yetmaydi (tartiblangan kalit ham shu uzunlikda)
+                if 200 * min(len(key), len(other_key)) < self.threshold * (len(key) + len(other_key)):
+                    continue
+                if len(grams & other_grams) < self.required(max(len(grams), len(other_grams))):
+                    continue
+                if score(key, other_key, self.sorted_keys[number], self.sorted_keys[other]) >= self.threshold:
+                    result.append((number, other))
+        return result
+
+
+_matcher = None
+
+
+def _init_worker(matcher):
+    global _matcher
+    _matcher = matcher
+
+
+def _worker_pairs(bounds):
+    return _matcher.pairs(*bounds)
+
+
+def similar_pairs(keys, threshold=THRESHOLD, workers=None, min_overlap=MIN_OVERLAP):
+    matcher = Matcher(keys, threshold, min_overlap)
+    chunks = [(start, min(start + CHUNK_SIZE, len(keys))) for start in range(0, len(keys), CHUNK_SIZE)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(keys) < PARALLEL_MIN:
+        for start, stop in chunks:
+            yield from matcher.pairs(start, stop)
+        return
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(matcher,)) as executor:
+        for pairs in executor.map(_worker_pairs, chunks):
+            yield from pairs
+
+
+def _root(parents, number):
+    while parents[number] != number:
+        parents[number] = parents[parents[number]]
+        number = parents[number]
+    return number
+
+
+def standardize(names, threshold=THRESHOLD, workers=None, min_overlap=MIN_OVERLAP):
+    """``{asl nom: standart nom}``; standart — guruhdagi eng ko'p uchragan tozalangan nom"""
+    counts = Counter(str(name) for name in names if name not in (None, ""))
+    cleaned = {name: clean_name(name) for name in counts}
+    cleaned_counts = Counter()
+    for name, count in counts.items():
+        cleaned_counts[cleaned[name]] += count
+
+    key_numbers = {}
+    for name in cleaned_counts:
+        key_numbers.setdefault(name_key(name), len(key_numbers))
+    keys = list(key_numbers)
+
+    parents = list(range(len(keys)))
+    for number, other in similar_pairs(keys, threshold, workers, min_overlap):
+        parents[_root(parents, other)] = _root(parents, number)
+
+    # Teng bo'lsa birinchi uchragani (sample.py dagidek)
+    masters = {}
+    for position, name in enumerate(cleaned_counts):
+        root = _root(parents, key_numbers[name_key(name)])
+        rank = (cleaned_counts[name], -position)
+        if root not in masters or rank > masters[root][0]:
+            masters[root] = (rank, name)
+
+    return {
+        name: masters[_root(parents, key_numbers[name_key(cleaned[name])])][1] or cleaned[name]
+        for name in counts
+    }
+
+
+def duplicate_groups(mapping):
+    """O'zgaradigan nomlar guruhi: ``{standart nom: [asl nomlar]}``"""
+    groups = defaultdict(list)
+    for name, master in mapping.items():
+        groups[master].append(name)
+    return {master: sorted(names) for master, names in groups.items() if names != [master]}
+
+
+def column_number(column):
+    """``F`` yoki ``6`` -> 6"""
+    column = str(column).strip()
+    return int(column) if column.isdigit() else column_index_from_string(column.upper())
+
+
+def sheet_rows(path):
+    """Birinchi varaq qatorlari; read-only rejimda fayl qatorma-qator o'qiladi"""
+    workbook = load_workbook(path, read_only=True)
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_column(path, column):
+    """Ustun qiymatlari (birinchi qator — sarlavha)"""
+    number = column_number(column) - 1
+    rows = sheet_rows(path)
+    next(rows, None)
+    for row in rows:
+        yield row[number] if number < len(row) else None
+
+
+def write_standardized(path, output, column, mapping):
+    """Kiruvchi faylni oxirgi ustunga standart nom qo'shib yozadi (write-only rejimda)"""
+    number = column_number(column) - 1
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    total = 0
+    for position, row in enumerate(sheet_rows(path)):
+        if position == 0:
+            sheet.append(list(row) + [RESULT_COLUMN])
+            continue
+        value = row[number] if number < len(row) else None
+        sheet.append(list(row) + [mapping.get(str(value)) if value not in (None, "") else None])
+        total += 1
+    workbook.save(output)
+    return total
@@ -0,0 +1,88 @@
+"""Geohash va masofa hisoblari (tashqi kutubxonasiz).
+
+Geohash yaqin nuqtalarga umumiy prefiks beradi: mijozlar ``Client.geohash`` bo'yicha
+indekslanadi, yetkazib berish partiyalari esa prefiks katakchalari bo'yicha guruhlanadi.
+"""
+import math
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+PRECISION = 9  # ~4.8 x 4.8 m
+EARTH_RADIUS_KM = 6371.0088
+
+
+def _spread(value):
+    """Bitlar orasiga nol qo'yish: abc -> 0a0b0c"""
+    value = (value | value << 16) & 0x0000FFFF0000FFFF
+    value = (value | value << 8) & 0x00FF00FF00FF00FF
+    value = (value | value << 4) & 0x0F0F0F0F0F0F0F0F
+    value = (value | value << 2) & 0x3333333333333333
+    return (value | value << 1) & 0x5555555555555555
+
+
+def _cell(coordinate, low, high, bits):
+    return min(max(int((float(coordinate) - low) / (high - low) * (1 << bits)), 0), (1 << bits) - 1)
+
+
+def encode(latitude, longitude, precision=PRECISION):
+    # Katak raqamlari butun songa aylantirilib, bitlari aralashtiriladi (birinchi bit — uzunlik)
+    bits = 5 * precision
+    lon = _spread(_cell(longitude, -180.0, 180.0, (bits + 1) // 2))
+    lat = _spread(_cell(latitude, -90.0, 90.0, bits // 2))
+    value = lon | lat << 1 if bits % 2 else lon << 1 | lat
+    return "".join(BASE32[value >> shift & 31] for shift in range(bits - 5, -1, -5))
+
+
+def bounds(geohash):
+    """``(lat_min, lat_max, lon_min, lon_max)``"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            span = lon_range if even else lat_range
+            middle = (span[0] + span[1]) / 2
+            if value >> shift & 1:
+                span[0] = middle
+            else:
+                span[1] = middle
+            even = not even
+    return lat_range[0], lat_range[1], lon_range[0], lon_range[1]
+
+
+def neighbors(geohash):
+    """Katakning o'zi va 8 ta qo'shnisi"""
+    lat_min, lat_max, lon_min, lon_max = bounds(geohash)
+    lat, lon = (lat_min + lat_max) / 2, (lon_min + lon_max) / 2
+    dlat, dlon = lat_max - lat_min, lon_max - lon_min
+    return {
+        encode(max(-90.0, min(90.0, lat + i * dlat)), (lon + j * dlon + 180) % 360 - 180, len(geohash))
+        for i in (-1, 0, 1) for j in (-1, 0, 1)
+    }
+
+
+# Katak o'lchamlari (kenglik, balandlik; km, ekvatorda) prefiks uzunligi bo'yicha
+CELL_SIZES = (
+    (5000, 5000), (1250, 625), (156, 156), (39.1, 19.5), (4.89, 4.89),
+    (1.22, 0.61), (0.153, 0.153), (0.0382, 0.0191), (0.00477, 0.00477),
+)
+
+
+def precision_for(radius_km, latitude=0.0):
+    """Katakning ikkala o'lchami ham radiusdan kichik bo'lmagan eng aniq prefiks uzunligi.
+
+    Shunda radius ichidagi har qanday nuqta katakning o'zida yoki 8 qo'shnisidan birida bo'ladi.
+    """
+    shrink = math.cos(math.radians(float(latitude)))
+    precision = 1
+    for length, (width, height) in enumerate(CELL_SIZES, 1):
+        if min(width * shrink, height) >= radius_km:
+            precision = length
+    return precision
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Haversine masofasi"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
@@ -0,0 +1,170 @@
+"""Mijozlarni XLSX/CSV fayldan ommaviy import qilish.
+
+Fayl qatorma-qator o'qiladi (openpyxl read-only / csv), qatorlar ``ClientSerializer``
+maydonlari bilan tekshiriladi va ``CHUNK_SIZE`` lik bo'laklarda yoziladi: restoranlar
+``resolve_shops`` bilan bir yo'la topiladi, mijozlar ``telegram_id`` bo'yicha
+``bulk_create(update_conflicts=True)`` bilan qo'shiladi yoki yangilanadi.
+"""
+import codecs
+import csv
+import zipfile
+
+from django.db import transaction
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from rest_framework.exceptions import ValidationError
+from rest_framework.fields import SkipField, empty
+
+from le_vanille.admin_metrics import invalidate
+from .cache import client_cache
+from .geo import encode
+from .models import Client, Shop
+from .serializers import ClientSerializer
+from .shops import ShopIndex, resolve_shops
+
+CHUNK_SIZE = 2000
+FIELDS = ClientSerializer.Meta.fields
+UPDATE_FIELDS = ("shop", "filial_name", "full_name", "phone", "latitude", "longitude", "geohash")
+
+# Sarlavha (kichik harflarda) -> maydon
+HEADERS = {
+    **{field: field for field in FIELDS},
+    "shop_name": "shop_name",
+    "telegram id": "telegram_id",
+    "restoran": "shop_name",
+    "do'kon": "shop_name",
+    "do‘kon": "shop_name",
+    "do‘kon nomi": "shop_name",
+    "filial": "filial_name",
+    "ism": "full_name",
+    "mijoz": "full_name",
+    "telefon": "phone",
+    "kenglik": "latitude",
+    "uzunlik": "longitude",
+}
+REQUIRED = ("telegram_id", "shop_name")
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.updated = 0
+        # [(qator raqami, xato matni), ...]
+        self.errors = []
+
+    @property
+    def imported(self):
+        return self.created + self.updated
+
+
+def table_rows(file, filename):
+    """Fayl qatorlari (birinchisi — sarlavha); .csv dan boshqasi XLSX deb o'qiladi"""
+    if filename.lower().endswith(".csv"):
+        yield from csv.reader(codecs.iterdecode(file, "utf-8-sig"))
+        return
+    try:
+        workbook = load_workbook(file, read_only=True)
+    except (InvalidFileException, zipfile.BadZipFile):
+        raise ValueError("Fayl XLSX yoki CSV bo'lishi kerak")
+    try:
+        yield from workbook.worksheets[0].iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_rows(file, filename):
+    """``(qator raqami, {maydon: qiymat})``; bo'sh qatorlar tashlab ketiladi"""
+    rows = table_rows(file, filename)
+    header = next(rows, None) or ()
+    columns = {}
+    for position, title in enumerate(header):
+        field = HEADERS.get(str(title or "").strip().casefold())
+        if field:
+            columns.setdefault(field, position)
+    missing = [field for field in REQUIRED if field not in columns]
+    if missing:
+        raise ValueError(f"Ustun topilmadi: {', '.join(missing)}")
+
+    for number, row in enumerate(rows, 2):
+        if not any(value not in (None, "") for value in row):
+            continue
+        yield number, {field: row[position] if position < len(row) else None for field, position in columns.items()}
+
+
+def validate_row(row, fields):
+    """ClientSerializer qoidalari bo'yicha: ``(ma'lumot, xatolar)``"""
+    data, errors = {}, []
+    for name in FIELDS:
+        value = row.get(name)
+        if value is None or value == "":
+            value = empty
+        elif name in ("latitude", "longitude"):
+            # Eksport qilingan fayllarda koordinata odatda 6 xonadan ko'p kasr bilan keladi
+            try:
+                value = round(float(value), 6)
+            except (TypeError, ValueError):
+                pass
+        try:
+            data[name] = fields[name].run_validation(value)
+        except SkipField:
+            pass
+        except ValidationError as e:
+            errors.append(f"{name}: {' '.join(map(str, e.detail))}")
+    shop_name = " ".join(str(row.get("shop_name") or "").split())
+    if not shop_name:
+        errors.append("shop_name: Do‘kon nomi majburiy")
+    data["shop_name"] = shop_name
+    return data, errors
+
+
+def save_chunk(rows, result, shops, created):
+    """``shops`` — import davomidagi ``{nom: shop_id}``: har bir nom bir marta qidiriladi"""
+    # Bitta so'rovda bir xil telegram_id ikki marta bo'lolmaydi: oxirgi qator olinadi
+    rows = {data["telegram_id"]: data for data in rows}
+    existing = set(Client.objects.filter(telegram_id__in=rows).values_list("telegram_id", flat=True))
+    shops.update(resolve_shops({data["shop_name"] for data in rows.values()} - shops.keys(), created))
+
+    clients = []
+    for telegram_id, data in rows.items():
+        client = Client(shop_id=shops[data.pop("shop_name")], **data)
+        # bulk_create pre_save signalini chaqirmaydi
+        if client.latitude is not None and client.longitude is not None:
+            client.geohash = encode(client.latitude, client.longitude)
+        clients.append(client)
+    Client.objects.bulk_create(
+        clients, update_conflicts=True, unique_fields=["telegram_id"], update_fields=UPDATE_FIELDS,
+    )
+    result.updated += len(existing)
+    result.created += len(rows) - len(existing)
+
+
+def import_clients(file, filename, chunk_size=CHUNK_SIZE):
+    """Fayldagi mijozlarni qo'shadi yoki yangilaydi; xato qatorlar o'tkazib yuboriladi"""
+    result = ImportResult()
+    fields = ClientSerializer().fields
+    shops = {}
+    # Importda yaratilgan restoranlar: umumiy indeksga commitdan keyin qo'shiladi
+    created = ShopIndex()
+    chunk = []
+    with transaction.atomic():
+        for number, row in read_rows(file, filename):
+            data, errors = validate_row(row, fields)
+            if errors:
+                result.errors.append((number, "; ".join(errors)))
+                continue
+            chunk.append(data)
+            if len(chunk) >= chunk_size:
+                save_chunk(chunk, result, shops, created)
+                chunk = []
+        if chunk:
+            save_chunk(chunk, result, shops, created)
+        # Signallar chaqirilmadi: keshlar qo'lda tozalanadi
+        transaction.on_commit(client_cache.clear)
+        invalidate(Client, Shop)
+    return result
+
+
+def write_errors(result, output):
+    writer = csv.writer(output)
+    writer.writerow(["qator", "xato"])
+    writer.writerows(result.errors)
@@ -0,0 +1,81 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from client.cache import client_cache
+from client.dedup import THRESHOLD, duplicate_groups, read_column, standardize, write_standardized
+from client.models import Client, Shop
+
+SOURCES = {
+    "filial": (Client, "filial_name"),
+    "shop": (Shop, "name"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Kompaniya nomlaridagi dublikatlarni topish (Excel fayl, Client.filial_name yoki Shop.name).\n\n"
+        "  python manage.py dedup_names --file data.xlsx --column F\n"
+        "  python manage.py dedup_names --source filial --apply"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", help="Excel fayl (birinchi varaq, birinchi qator — sarlavha)")
+        parser.add_argument("--column", default="F", help="Nomlar ustuni: harf yoki tartib raqami")
+        parser.add_argument("--source", choices=SOURCES, default="filial", help="--file bo'lmasa: bazadagi maydon")
+        parser.add_argument("--output", help="Natija: Excel uchun .xlsx, baza uchun CSV (nom, standart nom)")
+        parser.add_argument("--threshold", type=int, default=THRESHOLD, help="O'xshashlik chegarasi (0-100)")
+        parser.add_argument("--workers", type=int, help="Jarayonlar soni (standart: CPU soni)")
+        parser.add_argument("--apply", action="store_true", help="Client.filial_name ni standart nomga almashtirish")
+
+    def handle(self, *args, **options):
+        if options["file"]:
+            self.handle_file(options)
+            return
+
+        model, field = SOURCES[options["source"]]
+        if options["apply"] and model is not Client:
+            # Shop.name unikal: restoranlarni birlashtirish buyurtma va mijozlarni ko'chirishni talab qiladi
+            raise CommandError("--apply faqat --source filial uchun; restoranlar admin orqali birlashtiriladi")
+
+        names = model.objects.values_list(field, flat=True).iterator(chunk_size=5000)
+        mapping = standardize(names, options["threshold"], options["workers"])
+        groups = duplicate_groups(mapping)
+        for master, names in sorted(groups.items()):
+            self.stdout.write(f"{master}: {' | '.join(names)}")
+
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8-sig") as output:
+                writer = csv.writer(output)
+                writer.writerow([field, "standart"])
+                writer.writerows(sorted(mapping.items()))
+
+        updated = 0
+        if options["apply"]:
+            with transaction.atomic():
+                for master, names in groups.items():
+                    updated += Client.objects.filter(filial_name__in=names).exclude(filial_name=master).update(
+                        filial_name=master,
+                    )
+                # update() signal chaqirmaydi
+                transaction.on_commit(client_cache.clear)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Nomlar: {len(mapping)}, guruhlar: {len(groups)}" + (f", yangilangan mijozlar: {updated}" if options["apply"] else "")
+        ))
+
+    def handle_file(self, options):
+        if options["apply"]:
+            raise CommandError("--apply faqat bazadagi nomlar uchun")
+        column = options["column"].upper()
+        output = options["output"] or f"cleaned_companies_{column}_column.xlsx"
+        try:
+            mapping = standardize(read_column(options["file"], column), options["threshold"], options["workers"])
+            rows = write_standardized(options["file"], output, column, mapping)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Qatorlar: {rows}, nomlar: {len(mapping)}, guruhlar: {len(duplicate_groups(mapping))}. Natija: {output}"
+        ))
@@ -0,0 +1,37 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from client.imports import CHUNK_SIZE, import_clients, write_errors
+
+
+class Command(BaseCommand):
+    help = (
+        "Mijozlarni XLSX/CSV fayldan import qilish (telegram_id bo'yicha qo'shish yoki yangilash).\n"
+        "Ustunlar: telegram_id, shop_name, filial_name, full_name, phone, latitude, longitude"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file")
+        parser.add_argument("--errors", help="Xato qatorlarni CSV faylga yozish")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        try:
+            with open(options["file"], "rb") as file:
+                result = import_clients(file, os.path.basename(options["file"]), options["chunk_size"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for number, message in result.errors[:20]:
+            self.stderr.write(f"{number}-qator: {message}")
+        if options["errors"] and result.errors:
+            with open(options["errors"], "w", newline="", encoding="utf-8-sig") as output:
+                write_errors(result, output)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Yangi: {result.created}, yangilangan: {result.updated}, xato: {len(result.errors)} "
+            f"({time.monotonic() - started:.1f} s)"
+        ))
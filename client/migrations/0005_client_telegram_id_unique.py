@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 08:06
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def check_duplicates(apps, schema_editor):
+    # Takroriy telegram_id bo'lsa unique indeks yaratilmaydi — avval qo'lda birlashtirish kerak
+    Client = apps.get_model('client', 'Client')
+    duplicates = list(
+        Client.objects.values('telegram_id').annotate(n=Count('id')).filter(n__gt=1).values_list('telegram_id', flat=True)
+    )
+    if duplicates:
+        raise RuntimeError(
+            "Bir xil telegram_id li mijozlar bor, ularni birlashtiring: "
+            + ", ".join(map(str, duplicates[:50]))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0004_banner_image_variants'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='client',
+            name='telegram_id',
+            field=models.BigIntegerField(unique=True),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2 on 2026-10-18 08:21
+
+from django.db import migrations, models
+
+BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+
+def encode(latitude, longitude, precision=9):
+    # client.geo.encode ning shu migratsiya vaqtidagi nusxasi (keyingi o'zgarishlar ta'sir qilmaydi)
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    latitude, longitude = float(latitude), float(longitude)
+    chars = []
+    bits = value = 0
+    even = True
+    while len(chars) < precision:
+        span, coordinate = (lon_range, longitude) if even else (lat_range, latitude)
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinate >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(BASE32[value])
+            bits = value = 0
+    return "".join(chars)
+
+
+def fill_geohash(apps, schema_editor):
+    Client = apps.get_model('client', 'Client')
+    clients = list(Client.objects.filter(latitude__isnull=False, longitude__isnull=False).only('id', 'latitude', 'longitude'))
+    for client in clients:
+        client.geohash = encode(client.latitude, client.longitude)
+    Client.objects.bulk_update(clients, ['geohash'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0005_client_telegram_id_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='client',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(fill_geohash, migrations.RunPython.noop),
+    ]
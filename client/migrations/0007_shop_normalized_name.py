@@ -0,0 +1,51 @@
+import re
+
+from django.db import migrations, models
+
+
+# client.dedup dagi clean_name/name_key ning shu migratsiya vaqtidagi nusxasi
+def clean_name(text):
+    text = re.sub(r'[\s\-\.]+\d+$', '', text)
+    text = re.sub(r'^\d+[\s\-\.]+', '', text)
+    text = text.replace('Logistics', 'Log')
+    return " ".join(text.split())
+
+
+def name_key(name):
+    return " ".join(re.sub(r"[^\w]+", " ", name.casefold()).split())
+
+
+def fill_normalized_name(apps, schema_editor):
+    # Bir xil kalitli restoranlardan birinchisi kalitni oladi, qolganlari "kalit#id"
+    # (ular dedup_names --source shop bilan topilib, admin orqali birlashtiriladi)
+    Shop = apps.get_model('client', 'Shop')
+    seen = set()
+    shops = list(Shop.objects.order_by('id').only('id', 'name'))
+    for shop in shops:
+        name = " ".join(shop.name.split())
+        key = name_key(clean_name(name)) or name.casefold()
+        shop.normalized_name = key if key not in seen else f"{key}#{shop.id}"
+        seen.add(key)
+    Shop.objects.bulk_update(shops, ['normalized_name'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0006_client_geohash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='shop',
+            name='normalized_name',
+            field=models.CharField(default='', editable=False, max_length=120),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_normalized_name, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='shop',
+            name='normalized_name',
+            field=models.CharField(editable=False, max_length=120, unique=True),
+        ),
+    ]
@@ -1,12 +1,30 @@
+from django.core.exceptions import ValidationError
 from django.db import models
 
+from .dedup import clean_name, name_key
+
+
+def shop_key(name):
+    """"Evos", "EVOS " va "Evos-12" uchun bitta kalit"""
+    name = " ".join(str(name).split())
+    return name_key(clean_name(name)) or name.casefold()
+
 
 class Shop(models.Model):
     name = models.CharField(max_length=100, unique=True)
+    # client.signals to'ldiradi; bulk_create/update() da qo'lda shop_key(name)
+    normalized_name = models.CharField(max_length=120, unique=True, editable=False)
 
     def __str__(self):
         return self.name
 
+    def clean(self):
+        key = shop_key(self.name)
+        if key == self.normalized_name.partition("#")[0]:
+            return
+        if Shop.objects.filter(normalized_name=key).exclude(pk=self.pk).exists():
+            raise ValidationError({"name": "Bu nomdagi restoran allaqachon bor"})
+
 
 class Client(models.Model):
     shop = models.ForeignKey(
@@ -15,11 +33,13 @@ class Client(models.Model):
         related_name="clients"
     )
     filial_name = models.CharField(max_length=100, verbose_name="Filial")
-    telegram_id = models.BigIntegerField(null=False)
+    telegram_id = models.BigIntegerField(null=False, unique=True)
     full_name = models.CharField(max_length=200)
     phone = models.CharField(max_length=20)
     latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True)
     longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True)
+    # Koordinatalardan hisoblanadi (client.signals): yaqin mijozlar umumiy prefiksga ega
+    geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
 
     def __str__(self):
         return f"{self.full_name} ({self.filial_name})"
@@ -27,6 +47,7 @@ class Client(models.Model):
 
 class Banner(models.Model):
     image = models.ImageField(upload_to="banners/")
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     title = models.CharField(max_length=255, blank=True)
     is_active = models.BooleanField(default=True)
 
@@ -12,3 +12,5 @@ class ClientSerializer(serializers.ModelSerializer):
             "latitude",
             "longitude",
         )
+        # Takrorlanish view'da (409) va bazadagi unique indeksda tekshiriladi
+        extra_kwargs = {"telegram_id": {"validators": []}}
@@ -0,0 +1,176 @@
+"""Ro'yxatdan o'tishda kiritilgan restoran nomini mavjud restoranga bog'lash.
+
+Jarayon ichida ``shop_key -> restoran`` lug'ati va kalitlarning trigramma indeksi saqlanadi:
+aniq kalit bo'lmasa eng o'xshash nom (``SHOP_MATCH_THRESHOLD`` dan yuqori) olinadi. Mos
+restoran topilmasa u ``normalized_name`` unique kaliti bo'yicha get_or_create bilan yaratiladi,
+shuning uchun bir vaqtda kelgan "Evos" va "EVOS " ikkinchi restoranni yaratmaydi.
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from config.env_config import SHOP_INDEX_TTL, SHOP_MATCH_THRESHOLD
+from le_vanille.metrics import cache_result
+from .dedup import MIN_OVERLAP, ngrams, score
+from .models import Shop, shop_key
+
+
+class ShopIndex:
+    def __init__(self, threshold=SHOP_MATCH_THRESHOLD, ttl=SHOP_INDEX_TTL, clock=time.monotonic):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        # {kalit: (id, nom)}, {kalit: trigrammalar} va {trigramma: {kalit, ...}}
+        self._shops = {}
+        self._grams = {}
+        self._postings = defaultdict(set)
+        self._ids = {}
+        self._expires = None
+
+    def fresh(self):
+        return self._expires is not None and self._expires > self.clock()
+
+    def load(self):
+        rows = Shop.objects.order_by("id").values_list("id", "name")
+        with self._lock:
+            self.clear()
+            for shop_id, name in rows:
+                self._add(shop_id, name)
+            self._expires = self.clock() + self.ttl
+
+    def _add(self, shop_id, name):
+        key = shop_key(name)
+        self._ids[shop_id] = key
+        # Bir xil kalitli eski dublikatlardan eng birinchisi asosiy hisoblanadi
+        current = self._shops.get(key)
+        if current is not None and current[0] < shop_id:
+            return
+        self._shops[key] = (shop_id, name)
+        self._grams[key] = ngrams(key)
+        for gram in self._grams[key]:
+            self._postings[gram].add(key)
+
+    def add(self, shop_id, name):
+        with self._lock:
+            if self._expires is not None:
+                self._add(shop_id, name)
+
+    def discard(self, shop_id):
+        with self._lock:
+            key = self._ids.pop(shop_id, None)
+            if key is None or self._shops.get(key, (None,))[0] != shop_id:
+                return
+            del self._shops[key]
+            for gram in self._grams.pop(key):
+                self._postings[gram].discard(key)
+            # Eski dublikat qolgan bo'lsa, keyingi yuklashda u asosiyga aylanadi
+            self._expires = None
+
+    def match(self, key):
+        """Aniq yoki eng o'xshash restoran ``(id, nom)``; topilmasa None"""
+        with self._lock:
+            found = self._shops.get(key)
+            if found is not None:
+                return found
+            # Kerakli umumiy trigrammalar bo'lsa, ulardan kamida bittasi eng kam uchraydiganlar orasida
+            grams = sorted(ngrams(key), key=lambda gram: len(self._postings.get(gram, ())))
+            prefix = grams[:len(grams) - math.ceil(MIN_OVERLAP * len(grams)) + 1]
+            candidates = set().union(*(self._postings.get(gram, ()) for gram in prefix))
+
+            grams = frozenset(grams)
+            sorted_key = " ".join(sorted(key.split()))
+            best, best_score = None, self.threshold
+            for other in candidates:
+                other_grams = self._grams[other]
+                if len(grams & other_grams) < MIN_OVERLAP * max(len(grams), len(other_grams)):
+                    continue
+                if 200 * min(len(key), len(other)) < best_score * (len(key) + len(other)):
+                    continue
+                similarity = score(key, other, sorted_key, " ".join(sorted(other.split())))
+                if similarity >= best_score:
+                    best, best_score = other, similarity
+            return self._shops[best] if best is not None else None
+
+
+shop_index = ShopIndex()
+
+
+def indexed_shop(key):
+    """Faqat indeksdan (bazaga murojaatsiz); indeks eskirgan bo'lsa ham None"""
+    found = shop_index.match(key) if shop_index.fresh() else None
+    cache_result("shop", found is not None)
+    return Shop(id=found[0], name=found[1]) if found else None
+
+
+def resolve_shop(name):
+    """Kiritilgan nom uchun restoran: mavjudi yoki yangi yaratilgani"""
+    name = " ".join(str(name).split())
+    key = shop_key(name)
+    shop = indexed_shop(key)
+    if shop is None and not shop_index.fresh():
+        shop_index.load()
+        shop = indexed_shop(key)
+    if shop is None:
+        # Unique kalit: parallel so'rov yaratib ulgurgan bo'lsa get_or_create o'shani qaytaradi
+        shop, _ = Shop.objects.get_or_create(normalized_name=key, defaults={"name": name})
+    return shop
+
+
+def resolve_shops(names, created=None):
+    """Ko'p nom uchun bir yo'la ``{nom: shop_id}``; yangi restoranlar bitta bulk_create bilan.
+
+    bulk_create signal chaqirmaydi: yangi restoranlar umumiy indeksga tranzaksiya commit
+    bo'lgandan keyin qo'shiladi (bekor qilinsa indeksda mavjud bo'lmagan restoran qolmaydi).
+    ``created`` — bitta tranzaksiyada bir necha marta chaqirilganda (import bo'laklari) shu
+    tranzaksiyada yaratilgan restoranlar indeksi.
+    """
+    if not shop_index.fresh():
+        shop_index.load()
+    if created is None:
+        created = ShopIndex(threshold=shop_index.threshold)
+    result = {}
+    # Yangi nomlar bir-biriga ham bog'lanadi ("Navruz" va "NAVRUZ-2" bitta restoran)
+    pending = ShopIndex(threshold=shop_index.threshold)
+    new_names = {}
+    for original in set(names):
+        name = " ".join(str(original).split())
+        key = shop_key(name)
+        found = shop_index.match(key) or created.match(key)
+        if found is not None:
+            result[original] = found[0]
+            continue
+        planned = pending.match(key)
+        if planned is None:
+            pending._add(-len(new_names) - 1, name)
+            new_names[key] = name
+            planned = (None, name)
+        result[original] = shop_key(planned[1])
+
+    if new_names:
+        Shop.objects.bulk_create(
+            [Shop(name=name, normalized_name=key) for key, name in new_names.items()], ignore_conflicts=True,
+        )
+        ids = {}
+        rows = list(Shop.objects.filter(normalized_name__in=new_names).values_list("id", "name", "normalized_name"))
+        for shop_id, name, key in rows:
+            created._add(shop_id, name)
+            ids[key] = shop_id
+        transaction.on_commit(lambda: [shop_index.add(shop_id, name) for shop_id, name, _ in rows])
+        result = {name: ids[value] if isinstance(value, str) else value for name, value in result.items()}
+    return result
+
+
+async def aresolve_shop(name):
+    """resolve_shop ning async varianti: odatda indeksning o'zidan javob beradi"""
+    shop = indexed_shop(shop_key(" ".join(str(name).split())))
+    if shop is None:
+        shop = await sync_to_async(resolve_shop)(name)
+    return shop
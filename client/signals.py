@@ -0,0 +1,38 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import client_cache
+from .geo import encode
+from .models import Client, Shop, shop_key
+from .shops import shop_index
+
+
+@receiver(pre_save, sender=Shop)
+def shop_normalized_name(sender, instance, **kwargs):
+    key = shop_key(instance.name)
+    # Migratsiyadan qolgan dublikatlar birlashtirilguncha "kalit#id" ko'rinishida qoladi
+    if instance.normalized_name.partition("#")[0] != key:
+        instance.normalized_name = key
+
+
+@receiver(pre_save, sender=Client)
+def client_geohash(sender, instance, **kwargs):
+    # bulk_create/update() signal chaqirmaydi: u yerda geohash qo'lda to'ldiriladi
+    if instance.latitude is not None and instance.longitude is not None:
+        instance.geohash = encode(instance.latitude, instance.longitude)
+    else:
+        instance.geohash = ""
+
+
+@receiver([post_save, post_delete], sender=Client)
+def client_changed(sender, instance, **kwargs):
+    # telegram_id o'zgargan bo'lishi mumkin, shuning uchun id bo'yicha ham tozalanadi
+    client_cache.evict(telegram_id=instance.telegram_id, client_id=instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Shop)
+def shop_changed(sender, instance, **kwargs):
+    client_cache.evict(shop_id=instance.pk)
+    shop_index.discard(instance.pk)
+    if kwargs["signal"] is post_save:
+        shop_index.add(instance.pk, instance.name)
@@ -1,3 +1,318 @@
-from django.test import TestCase
+import os
+import random
+import tempfile
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from le_vanille.admin_metrics import get_metric
+from openpyxl import Workbook, load_workbook
+
+from .cache import client_cache, get_client
+from .dedup import Matcher, score, standardize
+from .geo import BASE32, bounds, encode, neighbors
+from .imports import import_clients
+from .models import Client, Shop
+from .shops import resolve_shop, resolve_shops, shop_index
+from .views import SaveClientView, save_client_async
+
+
+def bisect_geohash(latitude, longitude, precision):
+    """Geohash ning oddiy (bit-bit) ta'rifi — encode shu bilan solishtiriladi"""
+    ranges, coordinates, value = [[-180.0, 180.0], [-90.0, 90.0]], (longitude, latitude), 0
+    for bit in range(5 * precision):
+        span = ranges[bit % 2]
+        middle = (span[0] + span[1]) / 2
+        value <<= 1
+        if coordinates[bit % 2] >= middle:
+            value |= 1
+            span[0] = middle
+        else:
+            span[1] = middle
+    return "".join(BASE32[value >> shift & 31] for shift in range(5 * precision - 5, -1, -5))
+
+
+class GeoTests(SimpleTestCase):
+    def test_known_geohash(self):
+        self.assertEqual(encode(57.64911, 10.40744, 11), "u4pruydqqvj")
+        self.assertEqual(encode("41.311081", "69.240562"), "tx35p87qq")
+
+    def test_encode_matches_bisection(self):
+        generator = random.Random(7)
+        points = [(90, 180), (-90, -180), (0, 0), (-0.0, 179.9999999), (41.311081, 69.240562)]
+        points += [(generator.uniform(-90, 90), generator.uniform(-180, 180)) for _ in range(2000)]
+        for latitude, longitude in points:
+            for precision in (1, 5, 9, 12):
+                self.assertEqual(
+                    encode(latitude, longitude, precision), bisect_geohash(latitude, longitude, precision),
+                    (latitude, longitude, precision),
+                )
+
+    def test_point_is_inside_its_cell(self):
+        lat_min, lat_max, lon_min, lon_max = bounds(encode(41.311081, 69.240562, 7))
+        self.assertTrue(lat_min <= 41.311081 < lat_max and lon_min <= 69.240562 < lon_max)
+        self.assertEqual(len(neighbors("tx35p87")), 9)
+
+
+class ClientCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.shop = Shop.objects.create(name="Evos")
+        cls.client_obj = Client.objects.create(
+            shop=cls.shop, filial_name="Chilonzor", telegram_id=111, full_name="Ali", phone="+998900000000",
+        )
+
+    def setUp(self):
+        client_cache.clear()
+
+    def test_repeat_lookup_does_not_hit_database(self):
+        with self.assertNumQueries(1):
+            get_client("111")
+        with self.assertNumQueries(0):
+            client = get_client(111)
+
+        self.assertEqual(client.id, self.client_obj.id)
+        self.assertEqual(client.shop.name, "Evos")
+
+    def test_save_invalidates_entry(self):
+        get_client(111)
+        self.client_obj.phone = "+998911111111"
+        self.client_obj.save()
+
+        self.assertEqual(get_client(111).phone, "+998911111111")
+
+    def test_shop_rename_invalidates_entry(self):
+        get_client(111)
+        self.shop.name = "EVOS"
+        self.shop.save()
+
+        self.assertEqual(get_client(111).shop.name, "EVOS")
+
+    def test_unknown_or_invalid_id(self):
+        self.assertIsNone(get_client(999))
+        self.assertIsNone(get_client("abc"))
+
+
+class AdminQueryTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def add_shops(self, count):
+        start = Shop.objects.count()
+        for i in range(start, start + count):
+            shop = Shop.objects.create(name=f"Do'kon #{i}")
+            Client.objects.create(shop=shop, filial_name="-", telegram_id=1000 + i, full_name="-", phone="-")
+
+    def changelist_queries(self, name):
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse(name)).status_code, 200)
+        return len(queries)
+
+    def test_changelist_query_count_does_not_depend_on_rows(self):
+        for name in ("admin:client_shop_changelist", "admin:client_client_changelist"):
+            self.add_shops(2)
+            few = self.changelist_queries(name)
+            self.add_shops(10)
+            self.assertEqual(self.changelist_queries(name), few, name)
+
+    def test_metrics_are_cached_until_model_changes(self):
+        self.add_shops(1)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_metric("clients_total"), 1)
+        with self.assertNumQueries(0):
+            get_metric("clients_total")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.add_shops(1)
+        self.assertEqual(get_metric("clients_total"), 2)
+
+
+class DedupTests(TestCase):
+    NAMES = [
+        "Navruz Logistics - 1", "Navruz Logistics", "2 - Navruz Log", "NAVRUZ LOG.", "Navruz Loh",
+        "Asia Trans", "Trans Asia", "Asia Trans", "Olmaliq Servis",
+    ]
+
+    def test_similar_names_share_one_standard(self):
+        mapping = standardize(self.NAMES, workers=1)
+
+        self.assertEqual({mapping[name] for name in self.NAMES[:5]}, {"Navruz Log"})
+        self.assertEqual({mapping[name] for name in self.NAMES[5:8]}, {"Asia Trans"})
+        self.assertEqual(mapping["Olmaliq Servis"], "Olmaliq Servis")
+
+    def test_names_differing_only_by_number_stay_apart(self):
+        # Oxiridagi raqam clean_name da olib tashlanadi, o'rtadagisi esa nomning bir qismi
+        names = [f"Zanjir {number} Chilonzor" for number in range(1, 30)]
+        mapping = standardize(names, workers=1)
+
+        self.assertEqual(len(set(mapping.values())), len(names))
+        self.assertEqual(score("kafe 12", "kafe 12", "12 kafe", "12 kafe"), 100)
+        self.assertEqual(score("kafe 12", "kafe 13", "12 kafe", "13 kafe"), 0)
+
+    def test_index_does_not_compare_unrelated_names(self):
+        matcher = Matcher(["navruz log", "navruz loh", "olmaliq servis", "asia trans"])
+        self.assertEqual(matcher.candidates(0), {1})
+        self.assertEqual(matcher.candidates(2), set())
+
+    def test_command_updates_filial_names(self):
+        shop = Shop.objects.create(name="Evos")
+        for number, name in enumerate(("Chilonzor filiali", "Chilonzor filiali", "Chilonzor filial", "Yunusobod")):
+            Client.objects.create(shop=shop, filial_name=name, telegram_id=500 + number, full_name="-", phone="-")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("dedup_names", "--source", "filial", "--apply", stdout=StringIO())
+
+        self.assertEqual(sorted(set(Client.objects.values_list("filial_name", flat=True))),
+                         ["Chilonzor filiali", "Yunusobod"])
+
+    def test_command_adds_standard_column_to_excel(self):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["Soni", "Kompaniya"])
+        for number, name in enumerate(("Navruz Logistics - 1", "Navruz Log", None)):
+            sheet.append([number, name])
+
+        with tempfile.TemporaryDirectory() as directory:
+            source, output = os.path.join(directory, "data.xlsx"), os.path.join(directory, "natija.xlsx")
+            workbook.save(source)
+            call_command("dedup_names", "--file", source, "--column", "B", "--output", output, stdout=StringIO())
+            rows = list(load_workbook(output).active.values)
+
+        self.assertEqual(rows, [("Soni", "Kompaniya", "standard_company_name"), (0, "Navruz Logistics - 1", "Navruz Log"),
+                                (1, "Navruz Log", "Navruz Log"), (2, None, None)])
+
+
+class ShopResolverTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.evos = Shop.objects.create(name="Evos")
+
+    def setUp(self):
+        shop_index.clear()
+
+    def test_variants_resolve_to_existing_shop(self):
+        for name in ("Evos", "EVOS ", "Evos-12", "12. evos", "Evoss"):
+            self.assertEqual(resolve_shop(name).id, self.evos.id, name)
+        self.assertEqual(Shop.objects.count(), 1)
+
+    def test_indexed_lookup_does_not_hit_database(self):
+        resolve_shop("Evos")
+        with self.assertNumQueries(0):
+            resolve_shop("  evos  ")
+
+    def test_new_shop_is_created_once_and_indexed(self):
+        shop = resolve_shop("Oqtepa Lavash")
+        with self.assertNumQueries(0):
+            self.assertEqual(resolve_shop("OQTEPA LAVASH - 3").id, shop.id)
+        self.assertEqual(Shop.objects.get(pk=shop.pk).normalized_name, "oqtepa lavash")
+
+    def test_bulk_created_shops_are_indexed_after_commit(self):
+        resolve_shop("Evos")
+        with self.captureOnCommitCallbacks() as callbacks:
+            shop_id = resolve_shops(["Oqtepa Lavash"])["Oqtepa Lavash"]
+        # Tranzaksiya bekor qilinsa restoran indeksda qolmasligi kerak
+        self.assertIsNone(shop_index.match("oqtepa lavash"))
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(shop_index.match("oqtepa lavash")[0], shop_id)
+
+    def test_registration_uses_canonical_shop(self):
+        response = self.client.post(reverse("save_client"), {
+            "telegram_id": 321, "shop_name": "EVOS-7", "full_name": "Ali", "phone": "-", "filial_name": "Chilonzor",
+        }, content_type="application/json")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["shop_id"], self.evos.id)
+        self.assertEqual(Client.objects.get(telegram_id=321).shop_id, self.evos.id)
+
+    def test_non_object_json_is_rejected(self):
+        factory = RequestFactory()
+        for body in ("[1, 2]", "null", "7"):
+            request = factory.post("/api/save-client/", body, content_type="application/json")
+            self.assertEqual(async_to_sync(save_client_async)(request).status_code, 400, body)
+            request = factory.post("/api/save-client/", body, content_type="application/json")
+            self.assertEqual(SaveClientView.as_view()(request).status_code, 400, body)
+        self.assertFalse(Client.objects.exists())
+
+
+class ClientImportTests(TestCase):
+    HEADER = "telegram_id,shop_name,filial_name,full_name,phone,latitude,longitude\n"
+
+    def setUp(self):
+        shop_index.clear()
+
+    def csv_file(self, lines):
+        return BytesIO((self.HEADER + "".join(lines)).encode())
+
+    def test_rows_are_upserted_and_errors_reported(self):
+        Client.objects.create(shop=Shop.objects.create(name="Evos"), filial_name="Eski", telegram_id=1,
+                              full_name="-", phone="-")
+        result = import_clients(self.csv_file([
+            "1,EVOS,Chilonzor,Ali,+998901,41.285,69.204\n",
+            "2,Navruz,Yunusobod,Vali,+998902,,\n",
+            "3,NAVRUZ-2,Sergeli,Soli,+998903,,\n",
+            ",Evos,Olmazor,Gani,+998904,,\n",
+            "5,Evos,Olmazor,Gani,+998905,1000,69\n",
+            ",,,,,,\n",
+        ]), "mijozlar.csv")
+
+        self.assertEqual((result.created, result.updated), (2, 1))
+        self.assertEqual([number for number, _ in result.errors], [5, 6])
+        self.assertIn("telegram_id", result.errors[0][1])
+        self.assertIn("latitude", result.errors[1][1])
+
+        updated = Client.objects.get(telegram_id=1)
+        self.assertEqual((updated.filial_name, updated.shop.name), ("Chilonzor", "Evos"))
+        self.assertEqual(len(updated.geohash), 9)
+        self.assertEqual(Client.objects.get(telegram_id=3).shop_id, Client.objects.get(telegram_id=2).shop_id)
+        self.assertEqual(Shop.objects.count(), 2)
+
+    def test_chunks_reuse_shops_created_in_same_import(self):
+        result = import_clients(self.csv_file([
+            "1,Navruz Food,A,-,-,,\n",
+            "2,Navruz Foods,B,-,-,,\n",
+        ]), "mijozlar.csv", chunk_size=1)
+
+        self.assertEqual(result.created, 2)
+        self.assertEqual(Shop.objects.count(), 1)
+
+    def test_query_count_does_not_depend_on_rows(self):
+        def queries(first, count):
+            lines = [f"{n},Do'kon #{n % 3},F,-,-,,\n" for n in range(first, first + count)]
+            with CaptureQueriesContext(connection) as captured:
+                import_clients(self.csv_file(lines), "mijozlar.csv")
+            return len(captured)
+
+        # Birinchi import restoranlar indeksini yuklaydi va restoranlarni yaratadi
+        queries(0, 3)
+        self.assertEqual(queries(100, 10), queries(200, 100))
+
+    def test_admin_import_page(self):
+        self.client.force_login(User.objects.create_superuser("admin", "admin@example.com", "x"))
+        url = reverse("admin:client_client_import_clients")
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        workbook = Workbook()
+        workbook.active.append(["Telegram ID", "Restoran", "Filial", "Ism", "Telefon"])
+        workbook.active.append([77, "Evos", "Chilonzor", "Ali", 998901234567])
+        content = BytesIO()
+        workbook.save(content)
+        upload = SimpleUploadedFile("mijozlar.xlsx", content.getvalue())
+
+        response = self.client.post(url, {"file": upload})
+        self.assertRedirects(response, reverse("admin:client_client_changelist"))
+        self.assertEqual(Client.objects.get(telegram_id=77).phone, "998901234567")
@@ -1,6 +1,7 @@
 from django.urls import path
 
-from .views import anketa_page, SaveClientView
+from config.env_config import ASYNC_VIEWS
+from .views import anketa_page, SaveClientView, save_client_async
 
 urlpatterns = [
 
@@ -8,5 +9,5 @@ urlpatterns = [
     path('anketa/', anketa_page, name='anketa_page'),
 
     # Bu manzilga JavaScript ma'lumot yuboradi
-    path('api/save-client/', SaveClientView.as_view(), name='save_client'),
+    path('api/save-client/', save_client_async if ASYNC_VIEWS else SaveClientView.as_view(), name='save_client'),
 ]
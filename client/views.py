@@ -1,10 +1,16 @@
+import json
+
+from django.db import IntegrityError
+from django.http import JsonResponse
 from django.shortcuts import render
+from django.views.decorators.csrf import csrf_exempt
 from rest_framework import status, permissions
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .models import Shop, Client
 from .serializers import ClientSerializer
+from .shops import aresolve_shop, resolve_shop
 
 
 # 1. HTML sahifani ko'rsatuvchi View
@@ -13,50 +19,83 @@ def anketa_page(request):
     return render(request, 'includes/anketa.html', {'shops': shops})
 
 
+def required_field_errors(data):
+    """Majburiy maydonlar tekshiruvi: xato bo'lsa DRF ko'rinishidagi dict, aks holda None"""
+    # JSON ro'yxat, son yoki null bo'lishi mumkin — .get() 500 qaytarmasligi uchun
+    if not isinstance(data, dict):
+        return {"non_field_errors": ["JSON obyekt kutilgan"]}
+    if not data.get("telegram_id"):
+        return {"telegram_id": ["Telegram ID majburiy"]}
+    if not data.get("shop_name"):
+        return {"shop_name": ["Do‘kon nomi majburiy"]}
+    return None
+
+
+ALREADY_REGISTERED = {"telegram_id": ["Siz allaqachon ro‘yxatdan o‘tgansiz"]}
+
+
 # 2. Ma'lumotni saqlovchi API View
 class SaveClientView(APIView):
     permission_classes = [permissions.AllowAny]
 
     def post(self, request):
+        errors = required_field_errors(request.data)
+        if errors:
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
         telegram_id = request.data.get("telegram_id")
         shop_name = request.data.get("shop_name")
 
-        if not telegram_id:
-            return Response(
-                {"telegram_id": ["Telegram ID majburiy"]},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        if not shop_name:
-            return Response(
-                {"shop_name": ["Do‘kon nomi majburiy"]},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
         # 🔴 1. TELEGRAM ID OLDINDAN BOR-YO‘QLIGINI TEKSHIRAMIZ
         if Client.objects.filter(telegram_id=telegram_id).exists():
-            return Response(
-                {
-                    "telegram_id": [
-                        "Siz allaqachon ro‘yxatdan o‘tgansiz"
-                    ]
-                },
-                status=status.HTTP_409_CONFLICT
-            )
+            return Response(ALREADY_REGISTERED, status=status.HTTP_409_CONFLICT)
 
-        # 2. Shop topiladi yoki yaratiladi
-        shop, _ = Shop.objects.get_or_create(
-            name=shop_name.strip()
-        )
+        # 2. Shop mavjudlaridan topiladi ("EVOS ", "Evos-12" -> "Evos") yoki yaratiladi
+        shop = resolve_shop(shop_name)
 
         # 3. Client serializer
         serializer = ClientSerializer(data=request.data)
 
         if serializer.is_valid():
-            serializer.save(shop=shop)
+            try:
+                serializer.save(shop=shop)
+            except IntegrityError:
+                # Bir vaqtda kelgan ikkinchi so'rov unique indeksga uriladi
+                return Response(ALREADY_REGISTERED, status=status.HTTP_409_CONFLICT)
             return Response(
                 {"status": "success", "shop_id": shop.id},
                 status=status.HTTP_201_CREATED
             )
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+# 3. SaveClientView ning async varianti (ASGI/uvicorn uchun)
+@csrf_exempt
+async def save_client_async(request):
+    if request.method != 'POST':
+        return JsonResponse({'status': 'invalid method'}, status=405)
+
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({"detail": "JSON noto'g'ri"}, status=400)
+
+    errors = required_field_errors(data)
+    if errors:
+        return JsonResponse(errors, status=400)
+
+    if await Client.objects.filter(telegram_id=data["telegram_id"]).aexists():
+        return JsonResponse(ALREADY_REGISTERED, status=409)
+
+    # Validatsiya bazaga murojaat qilmaydi, shuning uchun to'g'ridan-to'g'ri chaqiriladi
+    serializer = ClientSerializer(data=data)
+    if not serializer.is_valid():
+        return JsonResponse(serializer.errors, status=400)
+
+    shop = await aresolve_shop(data["shop_name"])
+    try:
+        await Client.objects.acreate(shop=shop, **serializer.validated_data)
+    except IntegrityError:
+        return JsonResponse(ALREADY_REGISTERED, status=409)
+    return JsonResponse({"status": "success", "shop_id": shop.id}, status=201)
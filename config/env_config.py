@@ -7,3 +7,46 @@ env.read_env()
 ADMINS = env.list("ADMINS")
 BOT_TOKEN = env.str("BOT_TOKEN")
 ADMIN_GROUP = env.str("ADMIN_GROUP")
+
+# WEBAPP
+# index.html katalog versiyasi va host bo'yicha bir marta render qilinadi
+PAGE_CACHE = env.bool("PAGE_CACHE", True)
+# Bo'sh bo'lmasa tayyor HTML shu papkaga ham yoziladi (nginx to'g'ridan-to'g'ri berishi uchun)
+PAGE_CACHE_DIR = env.str("PAGE_CACHE_DIR", "")
+
+# TELEGRAM
+# Testlar va yuklama sinovlarida mahalliy soxta Bot API ga yo'naltirish mumkin
+TELEGRAM_API_URL = env.str("TELEGRAM_API_URL", "https://api.telegram.org")
+
+# ASGI (uvicorn) ostida buyurtma va ro'yxatdan o'tish uchun async view'lar
+ASYNC_VIEWS = env.bool("ASYNC_VIEWS", False)
+
+# telegram_id -> mijoz keshi (har bir jarayonda alohida)
+CLIENT_CACHE_SIZE = env.int("CLIENT_CACHE_SIZE", 10000)
+CLIENT_CACHE_TTL = env.int("CLIENT_CACHE_TTL", 300)
+
+# Ro'yxatdan o'tishda restoran nomi mavjudiga shu o'xshashlikdan (0-100) boshlab bog'lanadi
+SHOP_MATCH_THRESHOLD = env.int("SHOP_MATCH_THRESHOLD", 85)
+# Restoranlar indeksi boshqa jarayonlardagi o'zgarishlar uchun shuncha soniyada qayta yuklanadi
+SHOP_INDEX_TTL = env.int("SHOP_INDEX_TTL", 300)
+
+# Admin guruhiga xabarlar: navbatda shuncha buyurtma to'planib qolsa, ular restoranlar
+# bo'yicha jamlanma xabarga birlashtiriladi (0 — o'chirilgan)
+NOTIFY_DIGEST_THRESHOLD = env.int("NOTIFY_DIGEST_THRESHOLD", 10)
+# Jamlanma rejimida xabarlar shuncha soniyada bir marta yuboriladi
+NOTIFY_DIGEST_WINDOW = env.int("NOTIFY_DIGEST_WINDOW", 60)
+
+# MONITORING
+# /metrics uchun Bearer token (bo'sh bo'lsa ochiq — faqat ichki tarmoqdan ruxsat bering)
+METRICS_TOKEN = env.str("METRICS_TOKEN", "")
+# Shundan uzoq davom etgan so'rovlar SQL'i bilan logga yoziladi (0 — o'chirilgan)
+SLOW_REQUEST_MS = env.int("SLOW_REQUEST_MS", 1000)
+
+# ADMIN
+# Ro'yxat sahifalaridagi ko'rsatkichlar keshda shuncha soniya turadi (model o'zgarsa darhol tozalanadi)
+ADMIN_METRICS_TTL = env.int("ADMIN_METRICS_TTL", 300)
+
+# YETKAZIB BERISH
+# Ombor koordinatalari: kuryer marshruti shu nuqtadan boshlanadi (bo'sh bo'lsa birinchi buyurtmadan)
+DEPOT_LATITUDE = env.float("DEPOT_LATITUDE", None)
+DEPOT_LONGITUDE = env.float("DEPOT_LONGITUDE", None)
@@ -0,0 +1,51 @@
+"""Admin ro'yxat sahifalaridagi ko'rsatkichlar uchun umumiy kesh.
+
+Ko'rsatkich ``@admin_metric(nom, Model, ...)`` bilan ro'yxatga olinadi: qiymat Django
+keshida TTL bilan saqlanadi va ko'rsatilgan modellar saqlanganda/o'chirilganda tozalanadi.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+
+from config.env_config import ADMIN_METRICS_TTL
+
+PREFIX = "admin-metrics:"
+
+# {nom: hisoblovchi funksiya}
+_metrics = {}
+# {model: {nom, ...}}
+_dependencies = {}
+
+
+def _invalidate(sender, **kwargs):
+    names = _dependencies.get(sender, ())
+    # Tranzaksiya bekor qilinsa ham zarar yo'q: keyingi so'rov qayta hisoblaydi
+    transaction.on_commit(lambda: cache.delete_many([PREFIX + name for name in names]))
+
+
+def invalidate(*models):
+    """Signal chaqirmaydigan bulk_create/update() dan keyin"""
+    for model in models:
+        _invalidate(model)
+
+
+def admin_metric(name, *models):
+    """Hisoblovchi funksiyani ko'rsatkich sifatida ro'yxatga olish"""
+    def register(compute):
+        _metrics[name] = compute
+        for model in models:
+            if model not in _dependencies:
+                post_save.connect(_invalidate, sender=model, dispatch_uid=f"admin_metrics_save_{model._meta.label}")
+                post_delete.connect(_invalidate, sender=model, dispatch_uid=f"admin_metrics_delete_{model._meta.label}")
+            _dependencies.setdefault(model, set()).add(name)
+        return compute
+    return register
+
+
+def get_metric(name):
+    key = PREFIX + name
+    value = cache.get(key)
+    if value is None:
+        value = _metrics[name]()
+        cache.set(key, value, ADMIN_METRICS_TTL)
+    return value
@@ -0,0 +1,273 @@
+"""So'rovlar bo'yicha metrikalar va Prometheus matn formatidagi ``/metrics``.
+
+Yoqish uchun settings.MIDDLEWARE ning boshiga qo'shing::
+
+    "le_vanille.metrics.MetricsMiddleware",
+
+Metrikalar har bir jarayonda alohida yig'iladi (uvicorn/gunicorn worker'lari bo'yicha).
+Bot API chaqiruvlari outbox worker'ida bo'ladi, shuning uchun ``telegram_request_duration_seconds``
+worker'ning o'z portidan olinadi::
+
+    python manage.py send_notifications --metrics-port 9101
+"""
+import bisect
+import contextvars
+import heapq
+import hmac
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse, HttpResponseForbidden
+
+from config.env_config import METRICS_TOKEN, SLOW_REQUEST_MS
+
+logger = logging.getLogger("le_vanille.slow")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+# Sekin so'rov logiga eng uzoq davom etgan shuncha SQL yoziladi
+SLOW_SQL_TOP = 5
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_labels(self.labels, key)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets=LATENCY_BUCKETS, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        # {labels: [bucket_1, ..., bucket_n, +Inf, sum]}
+        self._values = {}
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            row = self._values.get(key)
+            if row is None:
+                row = self._values[key] = [0] * (len(self.buckets) + 2)
+            row[index] += 1
+            row[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            values = [(key, list(row)) for key, row in self._values.items()]
+        names = self.labels + ("le",)
+        for key, row in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), row[:-1]):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(names, key + (bound,))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, key)} {row[-1]}"
+            yield f"{self.name}_count{_labels(self.labels, key)} {cumulative}"
+
+
+REGISTRY = []
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "So'rovni qayta ishlash vaqti", labels=("view", "method", "status"),
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Bitta so'rovdagi SQL so'rovlar soni", QUERY_BUCKETS, labels=("view",),
+)
+REQUEST_DB_SECONDS = Counter("http_request_db_seconds_total", "So'rovlardagi SQL vaqti yig'indisi", labels=("view",))
+TELEGRAM_LATENCY = Histogram(
+    "telegram_request_duration_seconds", "Bot API chaqiruvlari vaqti", labels=("method", "outcome"),
+)
+CACHE_REQUESTS = Counter("cache_requests_total", "Jarayon ichidagi keshlarga murojaatlar", labels=("cache", "result"))
+
+
+def cache_result(cache, hit):
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_time", "slowest")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        # (vaqt, sql) — eng sekin SLOW_SQL_TOP tasi (min-heap)
+        self.slowest = []
+
+
+_current = contextvars.ContextVar("request_stats", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    """Har bir ulanishga biriktiriladigan execute_wrapper; so'rovdan tashqarida hech narsa qilmaydi"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.db_time += elapsed
+        entry = (elapsed, sql)
+        if len(stats.slowest) < SLOW_SQL_TOP:
+            heapq.heappush(stats.slowest, entry)
+        elif elapsed > stats.slowest[0][0]:
+            heapq.heapreplace(stats.slowest, entry)
+
+
+def install_query_wrapper(connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+connection_created.connect(install_query_wrapper, dispatch_uid="metrics_query_wrapper")
+
+
+def view_name(request):
+    match = getattr(request, "resolver_match", None)
+    return match.view_name if match else "unmatched"
+
+
+class MetricsMiddleware:
+    """Har bir so'rov uchun vaqt, SQL soni/vaqti; sekin so'rovlar SQL bilan logga yoziladi"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        # Middleware yuklanishidan oldin ochilgan ulanishlar ham qamrab olinadi
+        for connection in connections.all(initialized_only=True):
+            install_query_wrapper(connection)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.finish(request, response, stats, time.perf_counter() - started)
+        return response
+
+    def finish(self, request, response, stats, elapsed):
+        view = view_name(request)
+        REQUEST_LATENCY.observe(elapsed, view=view, method=request.method, status=f"{response.status_code // 100}xx")
+        REQUEST_QUERIES.observe(stats.queries, view=view)
+        REQUEST_DB_SECONDS.inc(stats.db_time, view=view)
+
+        if SLOW_REQUEST_MS and elapsed * 1000 >= SLOW_REQUEST_MS:
+            logger.warning(
+                "Sekin so'rov %s %s (%s): %.0f ms, %d ta SQL, %.0f ms bazada\n%s",
+                request.method, request.path, view, elapsed * 1000, stats.queries, stats.db_time * 1000,
+                "\n".join(f"  {duration * 1000:.1f} ms: {sql}" for duration, sql in sorted(stats.slowest, reverse=True)),
+            )
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def metrics_view(request):
+    """Prometheus uchun ``Authorization: Bearer <METRICS_TOKEN>``; token berilmagan bo'lsa faqat xodimlarga"""
+    if METRICS_TOKEN:
+        allowed = hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}")
+    else:
+        user = getattr(request, "user", None)
+        allowed = bool(user and user.is_staff)
+    if not allowed:
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """HTTP serveri bo'lmagan jarayon (outbox worker) uchun fon oqimidagi ``/metrics``.
+
+    METRICS_TOKEN berilgan bo'lsa u talab qilinadi; aks holda port faqat ``host`` dan ochiq.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                return self._reply(404, b"")
+            if METRICS_TOKEN and not hmac.compare_digest(
+                self.headers.get("Authorization", ""), f"Bearer {METRICS_TOKEN}",
+            ):
+                return self._reply(403, b"")
+            self._reply(200, render_metrics().encode())
+
+        def _reply(self, code, body):
+            self.send_response(code)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -3,11 +3,14 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path, include
 
+from le_vanille.metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path("client/", include("client.urls")),
     path("product/", include("product.urls")),
     path("order/", include("order.urls")),
+    path("metrics", metrics_view, name="metrics"),
 ]
 
 urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,4 +1,5 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
 from django.utils import timezone
 from django.utils.html import format_html
 from import_export import resources, fields
@@ -7,7 +8,10 @@ from unfold.contrib.filters.admin import RelatedDropdownFilter
 from unfold.contrib.import_export.forms import ExportForm, ImportForm
 from unfold.decorators import action, display
 
-from .models import Order, OrderItem
+from . import rollups
+from .exports import XLSX_MAX_ROWS, export_xlsx, stream_csv
+from .models import Order, OrderItem, TelegramOutbox
+from .transitions import client_notifications, status_fields, transition
 
 
 # =========================
@@ -73,11 +77,25 @@ class OrderItemResource(resources.ModelResource):
         )
 
 
+class OrderAdminForm(forms.ModelForm):
+    """Tahrirlash sahifasida ham faqat ruxsat etilgan holat o'tishlari"""
+
+    def clean_status(self):
+        status = self.cleaned_data["status"]
+        current = self.initial.get("status")
+        if self.instance.pk and status != current and not Order.can_transition(current, status):
+            raise forms.ValidationError(
+                f"'{Order.Status(current).label}' holatidan '{Order.Status(status).label}' holatiga o'tib bo'lmaydi"
+            )
+        return status
+
+
 # =========================
 # ORDER ADMIN
 # =========================
 @admin.register(Order)
 class OrderAdmin(ModelAdmin):
+    form = OrderAdminForm
     import_form_class = ImportForm
     export_form_class = ExportForm
     list_filter_submit = True
@@ -92,6 +110,8 @@ class OrderAdmin(ModelAdmin):
     search_fields = ("id", "client__full_name", "client__phone", "client__filial_name", "shop__name")
     ordering = ("-created_at",)
     date_hierarchy = "created_at"
+    # Filtrsiz umumiy sonni (ikkinchi COUNT) hisoblamaslik
+    show_full_result_count = False
 
     readonly_fields = ("created_at", "confirmed_at", "delivered_at", "formatted_total_field")
     inlines = (OrderItemInline,)
@@ -146,21 +166,59 @@ class OrderAdmin(ModelAdmin):
     # ACTIONS
     @action(description="Tanlanganlarni 'Tasdiqlandi' holatiga o'tkazish")
     def mark_confirmed(self, request, queryset):
-        queryset.update(status="confirmed", confirmed_at=timezone.now())
+        self.apply_transition(request, queryset, Order.Status.CONFIRMED)
 
     @action(description="Tanlanganlarni 'Yetkazildi' holatiga o'tkazish")
     def mark_delivered(self, request, queryset):
-        queryset.update(status="delivered", delivered_at=timezone.now())
+        self.apply_transition(request, queryset, Order.Status.DELIVERED)
 
     @action(description="Tanlanganlarni 'Bekor qilindi' holatiga o'tkazish")
     def mark_canceled(self, request, queryset):
-        queryset.update(status="canceled", delivered_at=timezone.now())
+        self.apply_transition(request, queryset, Order.Status.CANCELED)
+
+    def apply_transition(self, request, queryset, target):
+        moved, skipped = transition(queryset, target)
+        label = Order.Status(target).label
+        if moved:
+            self.message_user(request, f"{len(moved)} ta buyurtma '{label}' holatiga o'tkazildi")
+        if skipped:
+            shown = ", ".join(f"#{pk} ({Order.Status(status).label})" for pk, status in skipped[:20])
+            more = f" va yana {len(skipped) - 20} ta" if len(skipped) > 20 else ""
+            self.message_user(
+                request, f"{len(skipped)} ta buyurtmani '{label}' holatiga o'tkazib bo'lmaydi: {shown}{more}",
+                level=messages.WARNING,
+            )
 
     actions = ["mark_confirmed", "mark_delivered", "mark_canceled"]
 
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('client', 'shop')
 
+    # Savdo yig'indisi: tahrirdan oldingi hissa ayiriladi, inline'lar saqlangach yangisi qo'shiladi
+    # (changeform_view tranzaksiya ichida ishlaydi)
+    def save_model(self, request, obj, form, change):
+        if change:
+            rollups.apply_orders([obj.pk], -1)
+        status_changed = change and "status" in form.changed_data
+        if status_changed:
+            for field, value in status_fields(obj.status).items():
+                setattr(obj, field, value)
+        super().save_model(request, obj, form, change)
+        if status_changed:
+            TelegramOutbox.objects.bulk_create(client_notifications([(obj.pk, obj.client.telegram_id)], obj.status))
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        rollups.apply_orders([form.instance.pk], 1)
+
+    def delete_model(self, request, obj):
+        rollups.apply_orders([obj.pk], -1)
+        super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        rollups.apply_orders(list(queryset.values_list('id', flat=True)), -1)
+        super().delete_queryset(request, queryset)
+
     # Ruxsatlar
     def has_add_permission(self, request):
         return request.user.is_superuser
@@ -186,6 +244,10 @@ class OrderItemAdmin(ModelAdmin):
 
     list_display = ('order', 'shop_name', 'category_name', 'product', 'quantity',
                     'summary_display')
+    # Ro'yxat va import-export eksporti uchun: har qatorda alohida so'rov bo'lmasin
+    list_select_related = ('order__shop', 'order__client', 'product__category')
+    show_full_result_count = False
+    actions = ['export_csv_stream', 'export_xlsx_file']
     list_filter_submit = True
     list_filter = (
         ('order', RelatedDropdownFilter),
@@ -207,5 +269,59 @@ class OrderItemAdmin(ModelAdmin):
     def summary_display(self, obj):
         return format_currency_text(obj.summary)
 
+    # Katta hajm uchun: "hammasini tanlash" bilan filtrlangan barcha qatorlar oqimda eksport qilinadi
+    @action(description="CSV eksport (oqimli, katta hajm uchun)")
+    def export_csv_stream(self, request, queryset):
+        return stream_csv(queryset, OrderItemResource())
+
+    @action(description="Excel eksport (200 000 qatorgacha)")
+    def export_xlsx_file(self, request, queryset):
+        if queryset.count() > XLSX_MAX_ROWS:
+            self.message_user(
+                request, f"Excel uchun {XLSX_MAX_ROWS:,} qatordan ko'p: CSV eksportdan foydalaning".replace(",", " "),
+                messages.WARNING,
+            )
+            return None
+        return export_xlsx(queryset, OrderItemResource())
+
+    def save_model(self, request, obj, form, change):
+        with rollups.refreshing([obj.order_id, getattr(obj, '_saved_state', (None,))[0]]):
+            super().save_model(request, obj, form, change)
+
+    def delete_model(self, request, obj):
+        with rollups.refreshing([obj.order_id]):
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with rollups.refreshing(queryset.values_list('order_id', flat=True).distinct()):
+            super().delete_queryset(request, queryset)
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
+
+
+# =========================
+# TELEGRAM OUTBOX
+# =========================
+@admin.register(TelegramOutbox)
+class TelegramOutboxAdmin(ModelAdmin):
+    list_display = ("id", "order", "method", "chat_id", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status", "method")
+    list_select_related = ("order",)
+    show_full_result_count = False
+    readonly_fields = [f.name for f in TelegramOutbox._meta.fields]
+    ordering = ("-id",)
+
+    @action(description="Qayta yuborish navbatiga qo'yish")
+    def retry(self, request, queryset):
+        queryset.exclude(status__in=[TelegramOutbox.Status.SENT, TelegramOutbox.Status.DIGESTED]).update(
+            status=TelegramOutbox.Status.PENDING, next_attempt_at=timezone.now(),
+        )
+
+    actions = ["retry"]
+
+    def has_add_permission(self, request):
+        return False
+
     def has_module_permission(self, request):
         return request.user.is_superuser
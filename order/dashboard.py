@@ -0,0 +1,95 @@
+"""Unfold admin bosh sahifasi uchun savdo vidjetlari (faqat SalesRollup dan o'qiladi).
+
+settings.py da::
+
+    UNFOLD = {..., "DASHBOARD_CALLBACK": "order.dashboard.dashboard_callback"}
+"""
+import json
+from datetime import timedelta
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .models import SalesRollup
+
+PERIODS = (7, 30, 90, 365)
+DEFAULT_PERIOD = 30
+TOP_SIZE = 10
+
+
+def money(value):
+    return "{:,.0f}".format(value or 0).replace(",", " ")
+
+
+def period_days(request):
+    try:
+        days = int(request.GET.get("days", DEFAULT_PERIOD))
+    except (TypeError, ValueError):
+        return DEFAULT_PERIOD
+    return days if days in PERIODS else DEFAULT_PERIOD
+
+
+def kpis(today):
+    totals = SalesRollup.objects.filter(day__gte=today - timedelta(days=29)).aggregate(
+        today=Sum("revenue", filter=Q(day=today)),
+        week=Sum("revenue", filter=Q(day__gte=today - timedelta(days=6))),
+        month=Sum("revenue"),
+        month_quantity=Sum("quantity"),
+    )
+    return [
+        {"title": "Bugungi tushum", "value": f"{money(totals['today'])} UZS"},
+        {"title": "Oxirgi 7 kun", "value": f"{money(totals['week'])} UZS"},
+        {"title": "Oxirgi 30 kun", "value": f"{money(totals['month'])} UZS"},
+        {"title": "30 kunda sotilgan (dona)", "value": money(totals['month_quantity'])},
+    ]
+
+
+def top_table(rows, name_field, headers):
+    return {
+        "headers": headers,
+        "rows": [[row[name_field], money(row["quantity"]), money(row["revenue"])] for row in rows],
+    }
+
+
+def trend_chart(rows, since, today):
+    by_day = {row["day"]: row["revenue"] for row in rows}
+    days = [since + timedelta(days=n) for n in range((today - since).days + 1)]
+    return json.dumps({
+        "labels": [day.strftime("%d.%m") for day in days],
+        "datasets": [{"label": "Tushum", "data": [float(by_day.get(day) or 0) for day in days]}],
+    })
+
+
+def dashboard_callback(request, context):
+    today = timezone.localdate()
+    days = period_days(request)
+    since = today - timedelta(days=days - 1)
+    period = SalesRollup.objects.filter(day__gte=since)
+
+    products = (
+        period.values("product__name").annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .order_by("-revenue")[:TOP_SIZE]
+    )
+    shops = (
+        period.values("shop__name").annotate(quantity=Sum("quantity"), revenue=Sum("revenue"))
+        .order_by("-revenue")[:TOP_SIZE]
+    )
+    # Kategoriya joriy mahsulot kategoriyasidan olinadi (yig'indi kalitida yo'q)
+    categories = list(
+        period.values("product__category__name").annotate(revenue=Sum("revenue")).order_by("-revenue")
+    )
+    trend = period.values("day").annotate(revenue=Sum("revenue")).order_by("day")
+
+    context.update({
+        "sales_days": days,
+        "sales_periods": PERIODS,
+        "sales_kpis": kpis(today),
+        "sales_top_products": top_table(products, "product__name", ["Mahsulot", "Soni", "Tushum"]),
+        "sales_shops": top_table(shops, "shop__name", ["Restoran", "Soni", "Tushum"]),
+        "sales_trend": trend_chart(trend, since, today),
+        "sales_categories": json.dumps({
+            "labels": [row["product__category__name"] for row in categories],
+            "datasets": [{"label": "Tushum", "data": [float(row["revenue"] or 0) for row in categories]}],
+        }),
+    })
+    return context
@@ -0,0 +1,125 @@
+"""Tasdiqlangan buyurtmalarni yetkazib berish partiyalariga bo'lish.
+
+Buyurtmalar bitta so'rov bilan o'qiladi va mijozning geohash prefiksi bo'yicha katakchalarga
+joylanadi: har bir partiya uchun faqat urug' buyurtma katagi va uning 8 qo'shnisi ko'riladi,
+shuning uchun minglab buyurtmada ham hamma juftliklar solishtirilmaydi. Partiya ichidagi
+tartib — eng yaqin qo'shni marshruti (ombordan yoki birinchi buyurtmadan boshlab).
+"""
+from collections import defaultdict
+
+from client.geo import distance_km, encode, neighbors, precision_for
+from config.env_config import DEPOT_LATITUDE, DEPOT_LONGITUDE
+from .digest import route_links
+from .models import Order
+
+DEFAULT_RADIUS_KM = 2.0
+DEFAULT_MAX_ORDERS = 15
+
+FIELDS = (
+    "id", "total_price", "shop__name", "client__full_name", "client__filial_name", "client__phone",
+    "client__latitude", "client__longitude", "client__geohash",
+)
+
+
+def depot():
+    if DEPOT_LATITUDE is None or DEPOT_LONGITUDE is None:
+        return None
+    return DEPOT_LATITUDE, DEPOT_LONGITUDE
+
+
+def confirmed_stops(queryset=None):
+    """``(manzilli to'xtashlar, manzilsiz buyurtma ID lari)``"""
+    if queryset is None:
+        queryset = Order.objects.all()
+    rows = queryset.filter(status=Order.Status.CONFIRMED).order_by("client__geohash", "id").values_list(*FIELDS)
+
+    stops, unlocated = [], []
+    for order_id, total, shop, name, filial, phone, latitude, longitude, geohash in rows:
+        if latitude is None or longitude is None:
+            unlocated.append(order_id)
+            continue
+        stops.append({
+            "order_id": order_id, "shop": shop, "client": name, "filial": filial, "phone": phone,
+            "total": total, "latitude": float(latitude), "longitude": float(longitude),
+            # Signal chaqirmagan yo'llar bilan yozilgan mijozlar uchun joyida hisoblanadi
+            "geohash": geohash or encode(latitude, longitude),
+        })
+    return stops, unlocated
+
+
+def cluster(stops, radius_km=DEFAULT_RADIUS_KM, max_orders=DEFAULT_MAX_ORDERS):
+    """Urug' buyurtmadan ``radius_km`` ichidagi eng yaqin ``max_orders`` ta buyurtma bitta partiya"""
+    if not stops:
+        return []
+    precision = precision_for(radius_km, max(abs(stop["latitude"]) for stop in stops))
+    cells = defaultdict(list)
+    for index, stop in enumerate(stops):
+        cells[stop["geohash"][:precision]].append(index)
+
+    assigned = set()
+    batches = []
+    # Geohash tartibida yurilgani uchun partiyalar xaritada ham ketma-ket chiqadi
+    for seed_index, seed in enumerate(stops):
+        if seed_index in assigned:
+            continue
+        candidates = []
+        for cell in neighbors(seed["geohash"][:precision]):
+            indexes = cells.get(cell)
+            if not indexes:
+                continue
+            # Band bo'lganlar katakdan chiqariladi: keyingi urug'lar ularni qayta ko'rmaydi
+            indexes[:] = [index for index in indexes if index not in assigned]
+            for index in indexes:
+                stop = stops[index]
+                distance = distance_km(seed["latitude"], seed["longitude"], stop["latitude"], stop["longitude"])
+                if distance <= radius_km:
+                    candidates.append((distance, index))
+        candidates.sort()
+        members = [index for _, index in candidates[:max_orders]]
+        assigned.update(members)
+        batches.append([stops[index] for index in members])
+    return batches
+
+
+def nearest_route(stops, start=None):
+    """Eng yaqin qo'shni tartibi va umumiy masofa (km)"""
+    remaining = list(stops)
+    if start is None:
+        first = remaining.pop(0)
+        route, (latitude, longitude) = [first], (first["latitude"], first["longitude"])
+    else:
+        route, (latitude, longitude) = [], start
+    total = 0.0
+    while remaining:
+        distance, index = min(
+            (distance_km(latitude, longitude, stop["latitude"], stop["longitude"]), index)
+            for index, stop in enumerate(remaining)
+        )
+        stop = remaining.pop(index)
+        route.append(stop)
+        total += distance
+        latitude, longitude = stop["latitude"], stop["longitude"]
+    return route, total
+
+
+def delivery_batches(radius_km=DEFAULT_RADIUS_KM, max_orders=DEFAULT_MAX_ORDERS, queryset=None, start=None):
+    stops, unlocated = confirmed_stops(queryset)
+    start = start or depot()
+    batches = []
+    for number, members in enumerate(cluster(stops, radius_km, max_orders), 1):
+        route, route_km = nearest_route(members, start)
+        points = ([start] if start else []) + [(stop["latitude"], stop["longitude"]) for stop in route]
+        batches.append({
+            "number": number,
+            "center": [
+                round(sum(stop["latitude"] for stop in route) / len(route), 6),
+                round(sum(stop["longitude"] for stop in route) / len(route), 6),
+            ],
+            "order_count": len(route),
+            "total": sum(stop["total"] for stop in route),
+            "route_km": round(route_km, 2),
+            # Google Maps havolasiga 10 tadan ortiq nuqta sig'maydi: marshrut ketma-ket havolalarga bo'linadi
+            "route_urls": route_links(points),
+            "orders": [{key: value for key, value in stop.items() if key != "geohash"} for stop in route],
+        })
+    return {"radius_km": radius_km, "max_orders": max_orders, "batches": batches, "unlocated": unlocated}
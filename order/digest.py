@@ -0,0 +1,148 @@
+"""Yuklama yuqori bo'lganda admin guruhiga buyurtmalarni jamlanma xabar bilan yuborish.
+
+Buyurtma yaratilganda har doimgidek alohida xabarlar outbox'ga yoziladi; worker navbatda
+ko'p buyurtma to'planib qolganini ko'rsa, ularni restoranlar bo'yicha bitta xabarga
+birlashtiradi, asl yozuvlar esa ``DIGESTED`` holatiga o'tadi.
+"""
+from collections import defaultdict
+from html import escape
+
+from django.db import transaction, connection
+from django.utils import timezone
+
+from .models import Order, OrderItem, TelegramOutbox
+
+# Telegram xabari 4096 belgidan oshmasligi kerak (HTML teglar bilan birga)
+MESSAGE_LIMIT = 3800
+# Google Maps marshrut havolasida ko'pi bilan shuncha nuqta
+ROUTE_POINTS = 10
+SEPARATOR = "━━━━━━━━━━━━━━━━━━━━\n"
+
+
+def pending_order_rows(chat_id):
+    """Chat navbatidagi buyurtma xabarlari (jamlanma xabarlarning o'zi order=None).
+
+    Worker ijarasidagi (hozir yuborilayotgan) qatorlar kirmaydi.
+    """
+    queryset = TelegramOutbox.objects.filter(
+        status=TelegramOutbox.Status.PENDING, chat_id=str(chat_id), order__isnull=False,
+        next_attempt_at__lte=timezone.now(),
+    ).order_by("id")
+    if connection.features.has_select_for_update_skip_locked:
+        queryset = queryset.select_for_update(skip_locked=True)
+    return queryset
+
+
+def map_link(latitude, longitude):
+    return f"https://maps.google.com/?q={latitude},{longitude}"
+
+
+def route_links(points):
+    """Manzillar marshruti havolalari: har birida ko'pi bilan ROUTE_POINTS nuqta bo'ladi,
+    keyingi havola oldingisining oxirgi nuqtasidan davom etadi (hech bir manzil tushib qolmaydi)"""
+    step = ROUTE_POINTS - 1
+    return [
+        "https://www.google.com/maps/dir/" + "/".join(f"{lat},{lon}" for lat, lon in points[start:start + ROUTE_POINTS])
+        for start in range(0, max(len(points) - 1, 1), step)
+    ]
+
+
+def order_block(order, items, limit=MESSAGE_LIMIT):
+    """Bitta buyurtma matni; mahsulotlar ro'yxati limitga sig'masa davomi keyingi bo'lakka o'tadi"""
+    client = order.client
+    location = ""
+    if client.latitude and client.longitude:
+        location = f' <a href="{escape(map_link(client.latitude, client.longitude))}">📍</a>'
+    # Ism va nomlar parse_mode=HTML da teg sifatida o'qilmasligi uchun escape qilinadi
+    line = (
+        f"🔹 <b>#{order.id}</b> {timezone.localtime(order.created_at).strftime('%H:%M')} | "
+        f"{escape(client.full_name)} ({escape(client.filial_name)}) | {order.total_price:,.0f} so'm{location}\n"
+        f"   └ "
+    )
+    blocks, empty = [], True
+    for item in items:
+        entry = f"{escape(item.product.name)} x {item.quantity}"
+        if not empty and len(line) + len(entry) + 3 > limit:
+            blocks.append(line + "\n")
+            line, empty = "   … ", True
+        line += entry if empty else ", " + entry
+        empty = False
+    blocks.append(line + "\n")
+    return blocks
+
+
+def shop_digest(shop, orders, items_by_order):
+    """Bitta restoran uchun jamlanma matn(lar)i — uzun bo'lsa bir nechta xabarga bo'linadi"""
+    total = sum(order.total_price for order in orders)
+
+    points = []
+    for order in orders:
+        point = (order.client.latitude, order.client.longitude)
+        if all(point) and point not in points:
+            points.append(point)
+
+    footer = SEPARATOR + f"💰 <b>JAMI: {total:,.0f} so'm</b>\n"
+    if len(points) > 1:
+        links = route_links(points)
+        if len(links) == 1:
+            footer += f'🗺 <a href="{escape(links[0])}">Barcha manzillar xaritada</a>\n'
+        else:
+            parts = ", ".join(f'<a href="{escape(url)}">{index}-qism</a>' for index, url in enumerate(links, 1))
+            footer += f"🗺 Barcha manzillar xaritada: {parts}\n"
+
+    def header(part):
+        return f"📦 <b>JAMLANMA: {escape(shop.name)}</b> — {len(orders)} ta buyurtma{part}\n" + SEPARATOR
+
+    # Eng uzun sarlavha va footer uchun joy qoldiriladi, shunda har bir bo'lak limitga sig'adi
+    budget = MESSAGE_LIMIT - len(footer) - len(header(" (9999/9999)"))
+    blocks = [block for order in orders for block in order_block(order, items_by_order[order.id], budget)]
+
+    chunks = [[]]
+    size = 0
+    for block in blocks:
+        if chunks[-1] and size + len(block) > budget:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(block)
+        size += len(block)
+
+    texts = []
+    for index, chunk in enumerate(chunks, 1):
+        part = f" ({index}/{len(chunks)})" if len(chunks) > 1 else ""
+        texts.append(header(part) + "".join(chunk) + (footer if index == len(chunks) else ""))
+    return texts
+
+
+def collapse_pending(chat_id):
+    """Navbatdagi buyurtma xabarlarini jamlanmaga aylantiradi; jamlangan buyurtmalar sonini qaytaradi"""
+    with transaction.atomic():
+        rows = list(pending_order_rows(chat_id).values_list("id", "order_id"))
+        order_ids = {order_id for _, order_id in rows}
+        if not order_ids:
+            return 0
+
+        orders = list(Order.objects.filter(id__in=order_ids).select_related("client", "shop").order_by("id"))
+        items_by_order = defaultdict(list)
+        for item in OrderItem.objects.filter(order_id__in=order_ids).select_related("product").order_by("id"):
+            items_by_order[item.order_id].append(item)
+
+        by_shop = defaultdict(list)
+        for order in orders:
+            by_shop[order.shop].append(order)
+
+        digests = [
+            TelegramOutbox(chat_id=str(chat_id), method="sendMessage", payload={
+                "chat_id": chat_id, "text": text, "parse_mode": "HTML", "disable_web_page_preview": True,
+            })
+            for shop, shop_orders in by_shop.items()
+            for text in shop_digest(shop, shop_orders, items_by_order)
+        ]
+        TelegramOutbox.objects.bulk_create(digests)
+        TelegramOutbox.objects.filter(id__in=[pk for pk, _ in rows]).update(status=TelegramOutbox.Status.DIGESTED)
+    return len(order_ids)
+
+
+def pending_order_count(chat_id):
+    return TelegramOutbox.objects.filter(
+        status=TelegramOutbox.Status.PENDING, chat_id=str(chat_id), order__isnull=False,
+    ).values("order_id").distinct().count()
@@ -0,0 +1,209 @@
+"""WebApp uchun yuklama sinovi: skriptlangan Telegram WebApp sessiyalari va natijalar hisoboti.
+
+Har bir sessiya haqiqiy foydalanuvchi kabi ishlaydi: sahifani ochadi, katalogni oladi,
+ro'yxatdan o'tadi va bir nechta buyurtma yuboradi. Buyurtma xabarlari outbox orqali
+soxta Bot API ga (``order.telegram_stub``) yuboriladi.
+"""
+import statistics
+import time
+import uuid
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import requests
+from django.db import connection, transaction
+from django.test import Client as DjangoClient
+from django.test.utils import CaptureQueriesContext
+
+from client.models import Client, Shop
+from product.models import Category, Product
+from .models import TelegramOutbox
+
+# Sinov mijozlari shu oraliqdagi telegram_id bilan yaratiladi va oxirida o'chiriladi
+TELEGRAM_ID_BASE = 990100000
+TELEGRAM_ID_RANGE = 1000000
+# Mahsulot yetmasa sinov mahsulotlari shu kategoriyada yaratiladi
+BENCHMARK_CATEGORY = "Benchmark"
+
+WEBAPP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Linux; Android 14) AppleWebKit/537.36 Telegram-Android/11.0",
+    "Accept-Language": "uz,ru;q=0.9",
+}
+
+ENDPOINTS = {
+    "home": "/product/",
+    "catalog": "/product/api/catalog/",
+    "save_client": "/client/api/save-client/",
+    "create_order": "/order/create-order/",
+}
+
+# Standart chegaralar: p95 (ms) va bitta so'rovdagi SQL so'rovlar soni (iliq holatda)
+THRESHOLDS = {
+    "home": {"p95": 150, "queries": 1},
+    "catalog": {"p95": 200, "queries": 1},
+    "save_client": {"p95": 400, "queries": 6},
+    "create_order": {"p95": 500, "queries": 7},
+}
+MAX_ERROR_RATE = 0.01
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def ensure_products(count, category_name=BENCHMARK_CATEGORY):
+    """Buyurtma uchun kamida ``count`` ta mavjud mahsulot ID si"""
+    category, _ = Category.objects.get_or_create(name=category_name)
+    ids = list(Product.objects.filter(is_available=True).values_list("id", flat=True)[:count])
+    while len(ids) < count:
+        ids.append(Product.objects.create(
+            category=category, name=f"{category_name} {len(ids)}", price=1000, image="products/benchmark.jpg",
+        ).id)
+    return ids
+
+
+def loadtest_clients():
+    """Yuklama sinovi sessiyalari yaratgan mijozlar"""
+    return Client.objects.filter(
+        telegram_id__gte=TELEGRAM_ID_BASE, telegram_id__lt=TELEGRAM_ID_BASE + TELEGRAM_ID_RANGE,
+    )
+
+
+def foreign_pending(clients):
+    """Sinovga tegishli bo'lmagan navbatdagi xabarlar — sinov worker'i ularni soxta Bot API ga yuborib yuboradi"""
+    return TelegramOutbox.objects.filter(status=TelegramOutbox.Status.PENDING).exclude(order__client__in=clients).count()
+
+
+def cleanup(clients, since=None):
+    """Sinov mijozlari va ulardan qolgan hamma narsani o'chirish.
+
+    Buyurtmalar mijoz bilan birga o'chadi, outbox xabarlari esa (SET_NULL) oldinroq o'chiriladi.
+    ``since`` berilsa shu vaqtdan beri yaratilgan jamlanmalar (order=None) ham o'chiriladi: sinov
+    paytida ularni faqat sinovning o'z worker'i yaratadi. Boshqa mijozi qolmagan restoranlar va
+    buyurtmasiz qolgan Benchmark mahsulotlari ham olib tashlanadi.
+    """
+    with transaction.atomic():
+        shop_ids = set(clients.values_list("shop_id", flat=True))
+        TelegramOutbox.objects.filter(order__client__in=clients).delete()
+        if since is not None:
+            TelegramOutbox.objects.filter(order__isnull=True, created_at__gte=since).delete()
+        deleted = clients.delete()[0]
+        Shop.objects.filter(id__in=shop_ids, clients__isnull=True).delete()
+        Product.objects.filter(category__name=BENCHMARK_CATEGORY, orderitem__isnull=True).delete()
+        Category.objects.filter(name=BENCHMARK_CATEGORY, products__isnull=True).delete()
+    return deleted
+
+
+class WebAppSession:
+    """Bitta foydalanuvchining WebApp'dagi harakatlari ketma-ketligi"""
+
+    def __init__(self, number, product_ids, orders=3):
+        self.telegram_id = TELEGRAM_ID_BASE + number
+        self.product_ids = product_ids
+        self.orders = orders
+
+    def registration(self):
+        return {
+            "telegram_id": self.telegram_id,
+            "shop_name": f"Yuklama {self.telegram_id % 10}",
+            "full_name": f"Yuklama {self.telegram_id}",
+            "phone": "+998900000000",
+            "filial_name": "Sinov",
+            "latitude": "41.311081",
+            "longitude": "69.240562",
+        }
+
+    def order(self):
+        return {
+            "telegram_id": self.telegram_id,
+            "items": [{"product_id": pid, "quantity": 1} for pid in self.product_ids],
+            "comment": "Yuklama sinovi",
+            "request_id": uuid.uuid4().hex,
+        }
+
+    def steps(self):
+        """``(endpoint, method, body, kutilgan_statuslar)`` ketma-ketligi"""
+        yield "home", "get", None, (200, 304)
+        yield "catalog", "get", None, (200, 304)
+        yield "save_client", "post", self.registration(), (201, 409)
+        for _ in range(self.orders):
+            yield "create_order", "post", self.order(), (200,)
+
+    def run(self, base_url):
+        """HTTP orqali bajaradi; ``[(endpoint, soniya, ok), ...]`` qaytaradi"""
+        results = []
+        with requests.Session() as http:
+            http.headers.update(WEBAPP_HEADERS)
+            for endpoint, method, body, expected in self.steps():
+                started = time.perf_counter()
+                try:
+                    response = http.request(method, base_url + ENDPOINTS[endpoint], json=body, timeout=30)
+                    ok = response.status_code in expected
+                except requests.RequestException:
+                    ok = False
+                results.append((endpoint, time.perf_counter() - started, ok))
+        return results
+
+
+def count_queries(sessions, host):
+    """Sessiyalarni jarayon ichida bajarib, har bir endpointning oxirgi (iliq) SQL so'rovlar sonini qaytaradi.
+
+    Birinchi sessiya keshlarni isitish uchun, hisobga oxirgisi olinadi.
+    """
+    headers = {f"HTTP_{key.upper().replace('-', '_')}": value for key, value in WEBAPP_HEADERS.items()}
+    django_client = DjangoClient(HTTP_HOST=host, **headers)
+    counts = {}
+    for session in sessions:
+        for endpoint, method, body, _ in session.steps():
+            with CaptureQueriesContext(connection) as queries:
+                if method == "get":
+                    django_client.get(ENDPOINTS[endpoint])
+                else:
+                    django_client.post(ENDPOINTS[endpoint], body, content_type="application/json")
+            counts[endpoint] = len(queries)
+    return counts
+
+
+def summarize(results, elapsed):
+    """Endpointlar bo'yicha soni, xatolar, tezlik va p50/p95/p99 (ms)"""
+    grouped = defaultdict(list)
+    for endpoint, latency, ok in results:
+        grouped[endpoint].append((latency, ok))
+
+    summary = {}
+    for endpoint, rows in grouped.items():
+        latencies = [latency * 1000 for latency, ok in rows if ok]
+        summary[endpoint] = {
+            "count": len(rows),
+            "errors": sum(1 for _, ok in rows if not ok),
+            "rps": len(rows) / elapsed if elapsed else 0.0,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+            "mean": statistics.fmean(latencies) if latencies else 0.0,
+        }
+    return summary
+
+
+def check_thresholds(summary, queries, thresholds, max_error_rate=MAX_ERROR_RATE):
+    """Chegaradan oshgan ko'rsatkichlar ro'yxati (bo'sh bo'lsa — regressiya yo'q)"""
+    failures = []
+    for endpoint, limits in thresholds.items():
+        stats = summary.get(endpoint)
+        if stats is None:
+            continue
+        if "p95" in limits and stats["p95"] > limits["p95"]:
+            failures.append(f"{endpoint}: p95 {stats['p95']:.1f} ms > {limits['p95']} ms")
+        if "queries" in limits and queries.get(endpoint, 0) > limits["queries"]:
+            failures.append(f"{endpoint}: {queries[endpoint]} ta SQL so'rov > {limits['queries']}")
+        if stats["count"] and stats["errors"] / stats["count"] > max_error_rate:
+            failures.append(f"{endpoint}: xatolar {stats['errors']}/{stats['count']}")
+    return failures
+
+
+def host_of(base_url):
+    return urlsplit(base_url).netloc
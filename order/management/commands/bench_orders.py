@@ -0,0 +1,130 @@
+import statistics
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from client.models import Client, Shop
+from order.loadtest import cleanup, ensure_products, foreign_pending, percentile
+from order.telegram import ChatRateLimiter, OutboxWorker, TelegramClient
+from order.telegram_stub import TelegramStub
+
+BENCH_TELEGRAM_ID = 990000001
+
+
+class Command(BaseCommand):
+    help = (
+        "Buyurtma yuborish tezligini sync (WSGI) va async (ASGI) serverlarda solishtirish.\n\n"
+        "  ASYNC_VIEWS=false uvicorn le_vanille.wsgi:application --interface wsgi --port 8000 --workers 4\n"
+        "  ASYNC_VIEWS=true  uvicorn le_vanille.asgi:application --port 8001 --workers 4\n"
+        "  python manage.py bench_orders --target wsgi=http://127.0.0.1:8000 --target asgi=http://127.0.0.1:8001"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", action="append", required=True, help="nom=URL (bir necha marta)")
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--items", type=int, default=5, help="Har bir savatdagi qatorlar soni")
+        parser.add_argument("--stub-latency", type=float, default=0.3, help="Soxta Bot API javob kechikishi")
+        parser.add_argument("--no-worker", action="store_true", help="Outbox worker'ni ishga tushirmaslik")
+        parser.add_argument("--keep", action="store_true", help="Sinov mijozi, buyurtmalari va xabarlarini o'chirmaslik")
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options["target"]:
+            name, sep, url = target.partition("=")
+            if not sep:
+                raise CommandError(f"--target nom=URL ko'rinishida bo'lishi kerak: {target}")
+            targets.append((name, url.rstrip("/")))
+
+        clients = Client.objects.filter(telegram_id=BENCH_TELEGRAM_ID)
+        pending = 0 if options["no_worker"] else foreign_pending(clients)
+        if pending:
+            raise CommandError(
+                f"Outbox navbatida {pending} ta haqiqiy xabar bor — ular soxta Bot API ga ketib qoladi. "
+                "Alohida bazada ishlating yoki --no-worker bering."
+            )
+
+        product_ids = self.fixtures(options["items"])
+        started_at = timezone.now()
+
+        # Buyurtmalar yaratgan xabarlar soxta Bot API ga worker orqali yuboriladi
+        with TelegramStub(latency=options["stub_latency"]) as stub:
+            stop = threading.Event()
+            worker_thread = None
+            if not options["no_worker"]:
+                worker = OutboxWorker(
+                    client=TelegramClient(token="bench", api_url=stub.url),
+                    limiter=ChatRateLimiter(group_interval=0, private_interval=0, per_second=0),
+                )
+                worker_thread = threading.Thread(target=worker.run, kwargs={"idle_sleep": 0.1, "stop": stop})
+                worker_thread.start()
+
+            try:
+                for name, url in targets:
+                    self.report(name, self.run(url, product_ids, options))
+            finally:
+                stop.set()
+                if worker_thread:
+                    worker_thread.join()
+
+            self.stdout.write(f"Soxta Bot API qabul qilgan xabarlar: {len(stub.calls)}")
+
+        if not options["keep"]:
+            # Jamlanmalarni (order=None) faqat shu buyruqning worker'i yaratgan bo'lishi mumkin
+            cleanup(clients, since=None if options["no_worker"] else started_at)
+
+    def fixtures(self, items):
+        shop, _ = Shop.objects.get_or_create(name="Benchmark")
+        Client.objects.get_or_create(
+            telegram_id=BENCH_TELEGRAM_ID,
+            defaults={"shop": shop, "filial_name": "Benchmark", "full_name": "Benchmark", "phone": "-",
+                      "latitude": 41.311081, "longitude": 69.240562},
+        )
+        return ensure_products(items)
+
+    def run(self, url, product_ids, options):
+        local = threading.local()
+        body = {"telegram_id": BENCH_TELEGRAM_ID, "items": [{"product_id": pid, "quantity": 1} for pid in product_ids]}
+
+        def submit(_):
+            session = getattr(local, "session", None)
+            if session is None:
+                session = local.session = requests.Session()
+            started = time.perf_counter()
+            try:
+                response = session.post(
+                    f"{url}/order/create-order/", json={**body, "request_id": uuid.uuid4().hex}, timeout=30,
+                )
+                ok = response.status_code == 200
+            except requests.RequestException:
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+            results = list(pool.map(submit, range(options["requests"])))
+        elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, ok in results if ok]
+        return {
+            "total": len(results),
+            "errors": sum(1 for _, ok in results if not ok),
+            "elapsed": elapsed,
+            "latencies": latencies,
+        }
+
+    def report(self, name, result):
+        latencies = result["latencies"]
+        self.stdout.write(
+            f"{name:>8}: {result['total'] / result['elapsed']:8.1f} so'rov/s | "
+            f"p50 {percentile(latencies, 50) * 1000:7.1f} ms | "
+            f"p95 {percentile(latencies, 95) * 1000:7.1f} ms | "
+            f"p99 {percentile(latencies, 99) * 1000:7.1f} ms | "
+            f"o'rtacha {statistics.fmean(latencies) * 1000 if latencies else 0:7.1f} ms | "
+            f"xato {result['errors']}"
+        )
@@ -0,0 +1,124 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from order.loadtest import (
+    ENDPOINTS, MAX_ERROR_RATE, THRESHOLDS, WebAppSession, check_thresholds, cleanup, count_queries,
+    ensure_products, foreign_pending, host_of, loadtest_clients, summarize,
+)
+from order.models import TelegramOutbox
+from order.telegram import ChatRateLimiter, OutboxWorker, TelegramClient
+from order.telegram_stub import TelegramStub
+
+
+def parse_limit(value):
+    endpoint, sep, number = value.partition("=")
+    if not sep or endpoint not in ENDPOINTS:
+        raise CommandError(f"endpoint=qiymat ko'rinishida bo'lishi kerak ({', '.join(ENDPOINTS)}): {value}")
+    return endpoint, float(number)
+
+
+class Command(BaseCommand):
+    help = (
+        "WebApp endpointlarini parallel sessiyalar bilan yuklama sinovi; chegara oshsa xato bilan tugaydi.\n\n"
+        "  uvicorn le_vanille.wsgi:application --interface wsgi --port 8000 --workers 4\n"
+        "  python manage.py loadtest --target http://127.0.0.1:8000 --sessions 200 --concurrency 32\n\n"
+        "Sinov paytida serverning o'z send_notifications worker'i to'xtatilgan bo'lishi kerak: "
+        "xabarlarni soxta Bot API ga shu buyruq yuboradi. Navbatda boshqa xabarlar bo'lsa buyruq ishlamaydi; "
+        "oxirida sinov mijozlari, buyurtmalari, xabarlari, restoranlari va Benchmark mahsulotlari o'chiriladi."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target", default="http://127.0.0.1:8000", help="Sinovdan o'tkaziladigan server")
+        parser.add_argument("--sessions", type=int, default=100, help="WebApp sessiyalari soni")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--orders", type=int, default=3, help="Har bir sessiyadagi buyurtmalar soni")
+        parser.add_argument("--items", type=int, default=5, help="Har bir savatdagi qatorlar soni")
+        parser.add_argument("--stub-latency", type=float, default=0.2, help="Soxta Bot API javob kechikishi")
+        parser.add_argument("--stub-429", type=float, default=0.0, help="Soxta Bot API 429 qaytarish ehtimoli")
+        parser.add_argument("--max-p95", action="append", default=[], type=parse_limit,
+                            help="endpoint=ms (standart chegarani almashtiradi)")
+        parser.add_argument("--max-queries", action="append", default=[], type=parse_limit,
+                            help="endpoint=son (standart chegarani almashtiradi)")
+        parser.add_argument("--max-error-rate", type=float, default=MAX_ERROR_RATE)
+        parser.add_argument("--json", help="Natijani JSON faylga yozish (CI uchun)")
+        parser.add_argument("--keep", action="store_true", help="Sinov ma'lumotlarini o'chirmaslik")
+
+    def handle(self, *args, **options):
+        base_url = options["target"].rstrip("/")
+        thresholds = {endpoint: dict(limits) for endpoint, limits in THRESHOLDS.items()}
+        for key, option in (("p95", "max_p95"), ("queries", "max_queries")):
+            for endpoint, value in options[option]:
+                thresholds[endpoint][key] = value
+
+        clients = loadtest_clients()
+        pending = foreign_pending(clients)
+        if pending:
+            raise CommandError(
+                f"Outbox navbatida {pending} ta haqiqiy xabar bor — ular soxta Bot API ga ketib qoladi. "
+                "Sinovni alohida bazada o'tkazing yoki avval navbatni bo'shating."
+            )
+
+        cleanup(clients)
+        product_ids = ensure_products(options["items"])
+        sessions = [WebAppSession(n, product_ids, options["orders"]) for n in range(options["sessions"])]
+
+        # SQL so'rovlar soni jarayon ichida o'lchanadi (sessiyalar oxiridan ikkitasi ajratiladi)
+        probes = [WebAppSession(options["sessions"] + n, product_ids, options["orders"]) for n in range(2)]
+        queries = count_queries(probes, host_of(base_url))
+
+        started_at = timezone.now()
+        with TelegramStub(latency=options["stub_latency"], rate_429=options["stub_429"]) as stub:
+            stop = threading.Event()
+            worker = OutboxWorker(
+                client=TelegramClient(token="loadtest", api_url=stub.url),
+                limiter=ChatRateLimiter(group_interval=0, private_interval=0, per_second=0),
+            )
+            worker_thread = threading.Thread(target=worker.run, kwargs={"idle_sleep": 0.1, "stop": stop})
+            worker_thread.start()
+
+            try:
+                started = time.perf_counter()
+                with ThreadPoolExecutor(max_workers=options["concurrency"]) as pool:
+                    results = list(chain.from_iterable(pool.map(lambda s: s.run(base_url), sessions)))
+                elapsed = time.perf_counter() - started
+            finally:
+                stop.set()
+                worker_thread.join()
+
+        summary = summarize(results, elapsed)
+        backlog = TelegramOutbox.objects.filter(status=TelegramOutbox.Status.PENDING).count()
+        self.report(summary, queries, elapsed, len(results))
+        self.stdout.write(
+            f"Soxta Bot API: {len(stub.calls)} ta xabar, {stub.rejected} ta 429 | outbox navbatida: {backlog}"
+        )
+
+        if not options["keep"]:
+            cleanup(clients, since=started_at)
+
+        failures = check_thresholds(summary, queries, thresholds, options["max_error_rate"])
+        if options["json"]:
+            with open(options["json"], "w") as f:
+                json.dump({"summary": summary, "queries": queries, "thresholds": thresholds,
+                           "failures": failures}, f, indent=2)
+
+        if failures:
+            raise CommandError("Regressiya:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS("Barcha ko'rsatkichlar chegaradan oshmadi"))
+
+    def report(self, summary, queries, elapsed, total):
+        self.stdout.write(f"{total} ta so'rov, {elapsed:.1f} s, {total / elapsed:.1f} so'rov/s")
+        for endpoint in ENDPOINTS:
+            stats = summary.get(endpoint)
+            if stats is None:
+                continue
+            self.stdout.write(
+                f"{endpoint:>13}: {stats['rps']:8.1f} so'rov/s | "
+                f"p50 {stats['p50']:7.1f} ms | p95 {stats['p95']:7.1f} ms | p99 {stats['p99']:7.1f} ms | "
+                f"SQL {queries.get(endpoint, 0):3d} | xato {stats['errors']}/{stats['count']}"
+            )
@@ -0,0 +1,23 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from order.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = "SalesRollup jadvalini buyurtmalardan qaytadan yig'ish (import yoki qo'lda tuzatishlardan keyin)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="Faqat shu kundan boshlab (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = date.fromisoformat(options["since"])
+            except ValueError:
+                raise CommandError("--since YYYY-MM-DD ko'rinishida bo'lishi kerak")
+
+        rows = rebuild(since=since)
+        self.stdout.write(self.style.SUCCESS(f"Yig'indi qatorlari: {rows}"))
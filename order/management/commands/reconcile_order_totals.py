@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Sum, Value, DecimalField
+from django.db.models.functions import Coalesce
+
+from order.models import Order
+
+
+class Command(BaseCommand):
+    help = "Order.total_price ni SUM(OrderItem.summary) bilan solishtirib, farqlarni tuzatish"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Faqat ko'rsatish, o'zgartirmaslik")
+
+    def handle(self, *args, **options):
+        # Bitta guruhlangan so'rov: LEFT JOIN + GROUP BY, faqat farqi borlar
+        drift = list(
+            Order.objects.annotate(
+                items_sum=Coalesce(Sum("items__summary"), Value(Decimal(0)),
+                                   output_field=DecimalField(max_digits=12, decimal_places=2)),
+            )
+            .exclude(total_price=F("items_sum"))
+            .values_list("id", "total_price", "items_sum")
+        )
+
+        for order_id, total, items_sum in drift[:50]:
+            self.stdout.write(f"#{order_id}: {total} -> {items_sum}")
+        if len(drift) > 50:
+            self.stdout.write(f"... va yana {len(drift) - 50} ta")
+
+        if not drift or options["dry_run"]:
+            self.stdout.write(self.style.SUCCESS(f"Farqi bor buyurtmalar: {len(drift)}"))
+            return
+
+        # Tuzatish ham bitta UPDATE: summa bazada subquery bilan hisoblanadi
+        with transaction.atomic():
+            fixed = Order.objects.filter(pk__in=[row[0] for row in drift]).update(
+                total_price=Order.items_total_subquery(),
+            )
+        self.stdout.write(self.style.SUCCESS(f"Tuzatildi: {fixed} ta buyurtma"))
@@ -0,0 +1,46 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from config.env_config import NOTIFY_DIGEST_THRESHOLD, NOTIFY_DIGEST_WINDOW
+from le_vanille.metrics import serve_metrics
+from order.telegram import OutboxWorker
+
+
+class Command(BaseCommand):
+    help = "Outbox'dagi Telegram xabarlarini yuboruvchi worker"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Bitta partiyani yuborib to'xtash")
+        parser.add_argument("--batch-size", type=int, default=50)
+        parser.add_argument("--idle-sleep", type=float, default=0.5, help="Navbat bo'sh bo'lganda kutish (soniya)")
+        parser.add_argument("--digest-threshold", type=int, default=NOTIFY_DIGEST_THRESHOLD,
+                            help="Navbatda shuncha buyurtma bo'lsa jamlanma yuboriladi (0 — o'chirilgan)")
+        parser.add_argument("--digest-window", type=int, default=NOTIFY_DIGEST_WINDOW, help="Jamlanma oynasi (soniya)")
+        parser.add_argument("--metrics-port", type=int, help="Prometheus uchun /metrics shu portda ochiladi")
+        parser.add_argument("--metrics-host", default="127.0.0.1")
+
+    def handle(self, *args, **options):
+        worker = OutboxWorker(
+            batch_size=options["batch_size"],
+            digest_threshold=options["digest_threshold"],
+            digest_window=options["digest_window"],
+        )
+
+        if options["once"]:
+            sent, deferred = worker.drain_once()
+            self.stdout.write(self.style.SUCCESS(f"Yuborildi: {sent}, keyinga qoldi: {deferred}"))
+            return
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        signal.signal(signal.SIGINT, lambda *_: stop.set())
+
+        if options["metrics_port"] is not None:
+            server = serve_metrics(options["metrics_port"], options["metrics_host"])
+            self.stdout.write(f"Metrikalar: http://{options['metrics_host']}:{server.server_address[1]}/metrics")
+
+        self.stdout.write("Worker ishga tushdi")
+        worker.run(idle_sleep=options["idle_sleep"], stop=stop)
+        self.stdout.write("Worker to'xtadi")
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 08:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0005_order_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='telegramoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Navbatda'), ('sent', 'Yuborildi'), ('failed', 'Yuborilmadi'), ('digested', "Jamlanmaga qo'shildi")], default='pending', max_length=10, verbose_name='Holati'),
+        ),
+    ]
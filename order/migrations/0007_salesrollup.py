@@ -0,0 +1,36 @@
+# Generated by Django 5.2 on 2026-10-18 08:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('client', '0005_client_telegram_id_unique'),
+        ('order', '0006_telegramoutbox_digested'),
+        ('product', '0008_product_search_text'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Kun')),
+                ('quantity', models.BigIntegerField(default=0, verbose_name='Soni')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14, verbose_name='Tushum')),
+                ('lines', models.IntegerField(default=0, verbose_name='Buyurtma qatorlari')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.category', verbose_name='Kategoriya')),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='client.client', verbose_name='Filial')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='product.product', verbose_name='Mahsulot')),
+                ('shop', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='client.shop', verbose_name='Restoran')),
+            ],
+            options={
+                'verbose_name': "Savdo yig'indisi",
+                'verbose_name_plural': "Savdo yig'indilari",
+                'indexes': [models.Index(fields=['shop', 'day'], name='sales_rollup_shop_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('day', 'shop', 'client', 'product', 'category'), name='sales_rollup_key')],
+            },
+        ),
+    ]
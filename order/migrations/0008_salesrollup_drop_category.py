@@ -0,0 +1,44 @@
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_categories(apps, schema_editor):
+    # Mahsulot kategoriyasi o'zgargandan keyin bitta kalit ikki qatorga bo'lingan bo'lishi mumkin:
+    # ular birinchi qatorga qo'shiladi, qolganlari o'chiriladi
+    SalesRollup = apps.get_model('order', 'SalesRollup')
+    duplicates = list(
+        SalesRollup.objects.values('day', 'shop_id', 'client_id', 'product_id')
+        .annotate(rows=Count('id'), keep=Min('id'), total_quantity=Sum('quantity'), total_revenue=Sum('revenue'),
+                  total_lines=Sum('lines'))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        key = {name: row[name] for name in ('day', 'shop_id', 'client_id', 'product_id')}
+        SalesRollup.objects.filter(**key).exclude(id=row['keep']).delete()
+        SalesRollup.objects.filter(id=row['keep']).update(
+            quantity=row['total_quantity'], revenue=row['total_revenue'], lines=row['total_lines'],
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('order', '0007_salesrollup'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='salesrollup',
+            name='sales_rollup_key',
+        ),
+        migrations.RunPython(merge_categories, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='salesrollup',
+            name='category',
+        ),
+        migrations.AddConstraint(
+            model_name='salesrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'shop', 'client', 'product'), name='sales_rollup_key'),
+        ),
+    ]
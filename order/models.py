@@ -1,4 +1,9 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 
 from client.models import Client, Shop
 from product.models import Product
@@ -11,6 +16,19 @@ class Order(models.Model):
         DELIVERED = "delivered", "Yetkazildi"
         CANCELED = "canceled", "Bekor qilindi"
 
+    # Ruxsat etilgan holat o'tishlari: yetkazilgan va bekor qilingan buyurtmalar yakuniy
+    TRANSITIONS = {
+        Status.CREATED: (Status.CONFIRMED, Status.CANCELED),
+        Status.CONFIRMED: (Status.DELIVERED, Status.CANCELED),
+        Status.DELIVERED: (),
+        Status.CANCELED: (),
+    }
+    # O'tishda yoziladigan vaqt maydoni
+    STATUS_TIMESTAMPS = {
+        Status.CONFIRMED: "confirmed_at",
+        Status.DELIVERED: "delivered_at",
+    }
+
     shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="orders", verbose_name="Restoran")
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="orders", verbose_name="Mijoz (filial)")
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.CREATED, verbose_name="Holati")
@@ -29,17 +47,74 @@ class Order(models.Model):
     delivered_at = models.DateTimeField(null=True, blank=True, verbose_name="Yetkazilgan sana")
     comment = models.TextField(blank=True, verbose_name="Izoh")
 
+    # WebApp yuborgan so'rov ID si: qayta yuborilganda takroriy buyurtma yaratilmaydi
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
+
+    @classmethod
+    def can_transition(cls, source, target):
+        return target in cls.TRANSITIONS.get(source, ())
+
+    @classmethod
+    def sources_for(cls, target):
+        """``target`` holatiga o'tish mumkin bo'lgan holatlar"""
+        return [source for source, targets in cls.TRANSITIONS.items() if target in targets]
+
+    @staticmethod
+    def items_total_subquery():
+        """SUM(OrderItem.summary) — bazaning o'zida hisoblanadigan korrelyatsiyalangan subquery"""
+        total = (
+            OrderItem.objects.filter(order=OuterRef('pk'))
+            .order_by()
+            .values('order')
+            .annotate(total=Sum('summary'))
+            .values('total')
+        )
+        return Coalesce(Subquery(total), Value(Decimal(0)), output_field=models.DecimalField(max_digits=12, decimal_places=2))
+
     def update_total_price(self):
-        """Barcha itemlar summasini qayta hisoblab, total_price ga saqlaydi"""
-        total = sum(item.summary for item in self.items.all())
-        self.total_price = total
-        # Faqat total_price ustunini yangilash (save() rekursiya bermasligi uchun)
-        Order.objects.filter(pk=self.pk).update(total_price=total)
+        """Barcha itemlar summasini bazada qayta hisoblab, total_price ga saqlaydi (bitta UPDATE)"""
+        Order.objects.filter(pk=self.pk).update(total_price=Order.items_total_subquery())
+        self.total_price = Order.objects.filter(pk=self.pk).values_list('total_price', flat=True).first()
+
+    @staticmethod
+    def add_to_total(order_id, delta):
+        """total_price ni F() orqali delta qadar o'zgartirish (poyga holatisiz, bitta so'rov)"""
+        if delta:
+            Order.objects.filter(pk=order_id).update(total_price=F('total_price') + delta)
 
     def __str__(self):
         return f"#{self.id}"
 
 
+def _expression(value):
+    return value if hasattr(value, 'resolve_expression') else Value(value)
+
+
+class OrderItemQuerySet(models.QuerySet):
+    # Shu maydonlar o'zgarsa buyurtma summasi ham o'zgaradi
+    TOTAL_FIELDS = {'order', 'order_id', 'price', 'quantity', 'summary'}
+
+    def update(self, **kwargs):
+        """Ommaviy update(): qator summasi va tegishli buyurtmalar summasi ham yangilanadi"""
+        if not kwargs.keys() & self.TOTAL_FIELDS:
+            return super().update(**kwargs)
+
+        order_ids = set(self.order_by().values_list('order_id', flat=True).distinct())
+        target = kwargs.get('order', kwargs.get('order_id'))
+        if target is not None:
+            order_ids.add(getattr(target, 'pk', target))
+        if 'summary' not in kwargs and kwargs.keys() & {'price', 'quantity'}:
+            # UPDATE ichida F() eski qiymatni beradi: yangi qiymatlar to'g'ridan-to'g'ri ko'paytiriladi
+            kwargs['summary'] = ExpressionWrapper(
+                _expression(kwargs.get('price', F('price'))) * _expression(kwargs.get('quantity', F('quantity'))),
+                output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            )
+
+        rows = super().update(**kwargs)
+        Order.objects.filter(pk__in=order_ids).update(total_price=Order.items_total_subquery())
+        return rows
+
+
 class OrderItem(models.Model):
     order = models.ForeignKey("Order", on_delete=models.CASCADE, related_name="items", verbose_name="Buyurtma")
     product = models.ForeignKey(Product, on_delete=models.CASCADE, verbose_name="Mahsulot")
@@ -63,6 +138,16 @@ class OrderItem(models.Model):
         blank=True
     )
 
+    # O'chirish (shu jumladan ommaviy va kaskad) order.signals da summadan ayiriladi
+    objects = OrderItemQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Bazadagi holat: saqlashda faqat farq (delta) buyurtma summasiga qo'shiladi
+        instance._saved_state = (instance.__dict__.get('order_id'), instance.__dict__.get('summary'))
+        return instance
+
     def save(self, *args, **kwargs):
         # 1. Narxni bazadagi mahsulot narxi bilan to'ldirish
         if self.price is None:
@@ -71,16 +156,86 @@ class OrderItem(models.Model):
         # 2. Qator summasini hisoblash
         self.summary = self.price * self.quantity
 
+        old_order_id, old_summary = getattr(self, '_saved_state', (None, None))
+
         super().save(*args, **kwargs)
+        self._saved_state = (self.order_id, self.summary)
 
-        # 3. Asosiy buyurtmaning umumiy summasini yangilash
-        self.order.update_total_price()
+        # 3. Asosiy buyurtmaning umumiy summasini delta bilan yangilash (qayta yig'ishsiz)
+        if old_order_id is not None and old_order_id != self.order_id:
+            Order.add_to_total(old_order_id, -(old_summary or 0))
+            old_summary = None
+        self._apply_delta(self.summary - (old_summary or 0))
 
-    def delete(self, *args, **kwargs):
-        order = self.order
-        super().delete(*args, **kwargs)
-        # Mahsulot o'chirilganda ham asosiy summani yangilab qo'yamiz
-        order.update_total_price()
+    def _apply_delta(self, delta):
+        Order.add_to_total(self.order_id, delta)
+        # Xotiradagi buyurtma obyekti ham (masalan admin inline'da) mos bo'lib qolsin
+        if delta and OrderItem.order.is_cached(self):
+            self.order.total_price = (self.order.total_price or 0) + delta
 
     def __str__(self):
         return f"{self.product.name} × {self.quantity}"
+
+
+
+class SalesRollup(models.Model):
+    """Kunlik savdo yig'indisi (bekor qilinmagan buyurtmalar): restoran, filial va mahsulot bo'yicha.
+
+    Kategoriya kalitda saqlanmaydi — o'qishda ``product__category`` dan olinadi, shuning uchun
+    mahsulot boshqa kategoriyaga o'tkazilsa ham delta o'sha qatorga tushadi.
+    ``order.rollups`` orqali buyurtma yaratilganda va holati o'zgarganda delta bilan yangilanadi,
+    ``rebuild_sales_rollup`` buyrug'i bilan qaytadan yig'iladi.
+    """
+    day = models.DateField(verbose_name="Kun")
+    shop = models.ForeignKey(Shop, on_delete=models.CASCADE, related_name="+", verbose_name="Restoran")
+    client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name="+", verbose_name="Filial")
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="+", verbose_name="Mahsulot")
+    quantity = models.BigIntegerField(default=0, verbose_name="Soni")
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0, verbose_name="Tushum")
+    lines = models.IntegerField(default=0, verbose_name="Buyurtma qatorlari")
+
+    class Meta:
+        verbose_name = "Savdo yig'indisi"
+        verbose_name_plural = "Savdo yig'indilari"
+        constraints = [
+            models.UniqueConstraint(fields=["day", "shop", "client", "product"], name="sales_rollup_key"),
+        ]
+        indexes = [
+            models.Index(fields=["shop", "day"], name="sales_rollup_shop_day_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.product_id} x {self.quantity}"
+
+
+class TelegramOutbox(models.Model):
+    """Yuborilishi kerak bo'lgan Telegram xabarlari (buyurtma bilan bitta tranzaksiyada yoziladi)"""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Navbatda"
+        SENT = "sent", "Yuborildi"
+        FAILED = "failed", "Yuborilmadi"
+        DIGESTED = "digested", "Jamlanmaga qo'shildi"
+
+    order = models.ForeignKey(
+        "Order", on_delete=models.SET_NULL, null=True, blank=True,
+        related_name="notifications", verbose_name="Buyurtma",
+    )
+    chat_id = models.CharField(max_length=64, verbose_name="Chat")
+    method = models.CharField(max_length=32, verbose_name="Bot API metodi")
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, verbose_name="Holati")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Urinishlar")
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Worker navbatdagi xabarlarni shu indeks bo'yicha oladi
+            models.Index(fields=["status", "next_attempt_at"], name="outbox_status_next_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.method} -> {self.chat_id} ({self.status})"
@@ -0,0 +1,123 @@
+"""SalesRollup jadvalini delta bilan yuritish.
+
+Har bir o'zgarish ``(kun, restoran, filial, mahsulot)`` kaliti bo'yicha
+``INSERT ... ON CONFLICT DO UPDATE SET x = x + excluded.x`` bilan qo'shiladi,
+shuning uchun bir vaqtdagi buyurtmalar bir-birining yozuvini o'chirmaydi. Kategoriya kalitga
+kirmaydi: u o'zgaruvchan, o'qishda mahsulot orqali olinadi.
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Order, OrderItem, SalesRollup
+
+KEY = ("day", "shop_id", "client_id", "product_id")
+BATCH_SIZE = 1000
+
+
+def _add(rows, key, quantity, revenue, lines):
+    row = rows[key]
+    row[0] += quantity
+    row[1] += revenue
+    row[2] += lines
+
+
+def lines_rows(order, lines):
+    """Yangi buyurtma qatorlaridan delta (bazaga murojaatsiz)"""
+    rows = defaultdict(lambda: [0, 0, 0])
+    day = timezone.localdate(order.created_at)
+    for line in lines:
+        key = (day, order.shop_id, order.client_id, line.product_id)
+        _add(rows, key, line.quantity, line.summary, 1)
+    return rows
+
+
+def orders_rows(order_ids=None, since=None):
+    """Bazadagi bekor qilinmagan buyurtmalar hissasi (kalit bo'yicha guruhlangan)"""
+    queryset = OrderItem.objects.exclude(order__status=Order.Status.CANCELED)
+    if order_ids is not None:
+        queryset = queryset.filter(order_id__in=order_ids)
+    if since is not None:
+        queryset = queryset.filter(order__created_at__date__gte=since)
+    queryset = (
+        queryset.annotate(day=TruncDate("order__created_at"))
+        .values_list("day", "order__shop_id", "order__client_id", "product_id")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("summary"), lines=Count("id"))
+        .order_by()
+    )
+    for *key, quantity, revenue, lines in queryset.iterator(chunk_size=BATCH_SIZE):
+        yield tuple(key), (quantity or 0, revenue or 0, lines)
+
+
+def upsert(rows, sign=1):
+    """``{kalit: (soni, tushum, qatorlar)}`` ni jadvalga qo'shadi (sign=-1 — ayiradi)"""
+    rows = list(rows.items()) if isinstance(rows, dict) else list(rows)
+    if not rows:
+        return
+    table = connection.ops.quote_name(SalesRollup._meta.db_table)
+    columns = KEY + ("quantity", "revenue", "lines")
+    placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), BATCH_SIZE):
+            batch = rows[start:start + BATCH_SIZE]
+            params = []
+            for (day, *ids), (quantity, revenue, lines) in batch:
+                params += [connection.ops.adapt_datefield_value(day), *ids, sign * quantity,
+                           connection.ops.adapt_decimalfield_value(sign * revenue, 14, 2), sign * lines]
+            cursor.execute(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES {', '.join([placeholders] * len(batch))} "
+                f"ON CONFLICT ({', '.join(KEY)}) DO UPDATE SET "
+                f"quantity = {table}.quantity + EXCLUDED.quantity, "
+                f"revenue = {table}.revenue + EXCLUDED.revenue, "
+                f"lines = {table}.lines + EXCLUDED.lines",
+                params,
+            )
+
+
+def add_order(order, lines):
+    """place_order dan: yangi buyurtma qatorlarini qo'shish (bitta so'rov)"""
+    upsert(lines_rows(order, lines))
+
+
+def apply_orders(order_ids, sign=1):
+    """Buyurtmalarning bazadagi joriy hissasini qo'shish yoki ayirish"""
+    if order_ids:
+        upsert(orders_rows(order_ids=list(order_ids)), sign)
+
+
+@contextmanager
+def refreshing(order_ids):
+    """Buyurtmani tahrirlash atrofida: eski hissa ayiriladi, o'zgarishdan keyingisi qo'shiladi"""
+    order_ids = [pk for pk in set(order_ids) if pk is not None]
+    with transaction.atomic():
+        apply_orders(order_ids, -1)
+        yield
+        apply_orders(order_ids, 1)
+
+
+def rebuild(since=None):
+    """Jadvalni xom ma'lumotdan qaytadan yig'ish (``since`` — shu kundan boshlab)"""
+    with transaction.atomic():
+        stale = SalesRollup.objects.all()
+        if since is not None:
+            stale = stale.filter(day__gte=since)
+        stale.delete()
+
+        total = 0
+        batch = []
+        for (day, shop_id, client_id, product_id), (quantity, revenue, lines) in orders_rows(since=since):
+            batch.append(SalesRollup(
+                day=day, shop_id=shop_id, client_id=client_id, product_id=product_id,
+                quantity=quantity, revenue=revenue, lines=lines,
+            ))
+            if len(batch) >= BATCH_SIZE:
+                SalesRollup.objects.bulk_create(batch)
+                total += len(batch)
+                batch = []
+        SalesRollup.objects.bulk_create(batch)
+        return total + len(batch)
@@ -0,0 +1,186 @@
+from collections import OrderedDict
+
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+
+from config.env_config import ADMIN_GROUP
+from product.models import Product
+from product.prices import price_table
+from .models import Order, OrderItem, TelegramOutbox
+from .rollups import add_order
+from .telegram import enqueue
+
+
+class OrderError(Exception):
+    """Savatdagi xatolar (mijozga 400 bilan qaytariladi).
+
+    ``errors`` — qatorlar bo'yicha xatolar: ``[{"line", "product_id", "code", "message"}, ...]``
+    """
+
+    def __init__(self, message, status=400, errors=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.errors = errors or []
+
+    def as_dict(self):
+        data = {'status': 'error', 'message': self.message}
+        if self.errors:
+            data['errors'] = self.errors
+        return data
+
+
+class DuplicateOrder(Exception):
+    """Shu idempotentlik kaliti bilan buyurtma allaqachon yaratilgan"""
+
+    def __init__(self, order_id):
+        super().__init__(order_id)
+        self.order_id = order_id
+
+
+def _replay_row(client, row):
+    if row is None:
+        return None
+    if row[1] != client.id:
+        raise OrderError("So'rov ID si boshqa mijozga tegishli", status=409)
+    return row[0]
+
+
+def replayed_order_id(client, key):
+    """Kalit bo'yicha avval yaratilgan buyurtma ID si (bitta indeksli o'qish) yoki None"""
+    return _replay_row(client, Order.objects.filter(idempotency_key=key).values_list('id', 'client_id').first())
+
+
+async def areplayed_order_id(client, key):
+    """replayed_order_id ning async varianti"""
+    return _replay_row(client, await Order.objects.filter(idempotency_key=key).values_list('id', 'client_id').afirst())
+
+
+def line_error(line, product_id, code, message):
+    return {'line': line, 'product_id': product_id, 'code': code, 'message': message}
+
+
+def parse_cart(items, table):
+    """Savat qatorlarini tekshiradi.
+
+    ``(cart, errors)`` qaytaradi: cart — ``{product_id: soni}`` (takrorlar qo'shiladi),
+    errors — noto'g'ri, noma'lum yoki mavjud bo'lmagan mahsulot qatorlari.
+    """
+    cart = OrderedDict()
+    errors = []
+    for line, item in enumerate(items or []):
+        try:
+            product_id = int(item.get('product_id'))
+            qty = int(item.get('quantity', 0))
+        except (TypeError, ValueError, AttributeError):
+            errors.append(line_error(line, None, 'invalid', "Savat qatori noto'g'ri"))
+            continue
+
+        if qty <= 0:
+            continue
+
+        row = table.get(product_id)
+        if row is None:
+            errors.append(line_error(line, product_id, 'unknown', "Mahsulot topilmadi"))
+        elif not row[1]:
+            errors.append(line_error(line, product_id, 'unavailable', f"{row[2]} hozircha mavjud emas"))
+        else:
+            cart[product_id] = cart.get(product_id, 0) + qty
+    return cart, errors
+
+
+def place_order(client, items, comment, idempotency_key=None):
+    """Buyurtmani bitta tranzaksiyada yaratadi.
+
+    Narx va mavjudlik xotiradagi jadvaldan olinadi (mahsulotlar uchun so'rov yo'q),
+    qatorlar bitta ``bulk_create`` bilan yoziladi — so'rovlar soni savat hajmiga bog'liq emas.
+    """
+    table = price_table()
+    cart, errors = parse_cart(items, table)
+    if errors:
+        raise OrderError("Savatdagi ba'zi mahsulotlarni buyurtma qilib bo'lmaydi", errors=errors)
+    if not cart:
+        raise OrderError("Savat bo'sh")
+
+    lines = []
+    total = 0
+    for product_id, qty in cart.items():
+        price, _, name, category_id = table.get(product_id)
+        summary = price * qty
+        total += summary
+        # Hisobot uchun nom kerak: bazadan o'qimasdan Product obyekti biriktiriladi
+        product = Product(id=product_id, name=name, price=price, category_id=category_id)
+        lines.append(OrderItem(product=product, quantity=qty, price=price, summary=summary))
+
+    try:
+        with transaction.atomic():
+            order = Order.objects.create(
+                client=client,
+                shop=client.shop,
+                comment=comment,
+                total_price=total,
+                idempotency_key=idempotency_key,
+            )
+            for line in lines:
+                line.order = order
+            # bulk_create save() ni chaqirmaydi: narx va summa yuqorida hisoblangan
+            OrderItem.objects.bulk_create(lines)
+            # Hisobotlar uchun kunlik yig'indi (bitta upsert)
+            add_order(order, lines)
+
+            # Xabarlar ham shu tranzaksiyada outbox'ga yoziladi, worker keyin yuboradi
+            TelegramOutbox.objects.bulk_create(order_notifications(order, client, lines))
+    except IntegrityError:
+        # Bir xil kalitli ikki so'rov bir vaqtda kelsa, ikkinchisi birinchisini qaytaradi
+        order_id = idempotency_key and replayed_order_id(client, idempotency_key)
+        if order_id:
+            raise DuplicateOrder(order_id)
+        raise
+
+    return order, lines
+
+
+def order_notifications(order, client, lines):
+    """Adminlar guruhi uchun outbox yozuvlari: avval lokatsiya, keyin hisobot"""
+    rows = []
+    if client.latitude and client.longitude:
+        rows.append(enqueue(ADMIN_GROUP, "sendLocation", {
+            "chat_id": ADMIN_GROUP,
+            "latitude": float(client.latitude),
+            "longitude": float(client.longitude),
+        }, order=order))
+
+    rows.append(enqueue(ADMIN_GROUP, "sendMessage", {
+        "chat_id": ADMIN_GROUP,
+        "text": build_order_report(order, client, lines),
+        "parse_mode": "HTML",
+    }, order=order))
+    return rows
+
+
+def build_order_report(order, client, lines):
+    """Adminlar guruhiga yuboriladigan hisobot matni"""
+    items_text = ""
+    for line in lines:
+        items_text += (
+            f"🔹 <b>{line.product.name}</b>\n"
+            f"   └ {line.quantity} x {line.price:,.0f} = {line.summary:,.0f} so'm\n"
+        )
+
+    client_name = getattr(client, 'full_name', 'Noma’lum')
+    client_phone = getattr(client, 'phone', 'Kiritilmagan')
+    branch_name = getattr(client, 'filial_name', 'Kiritilmagan')
+
+    return (
+        f"🛍 <b>YANGI BUYURTMA #{order.id}</b>\n"
+        f"━━━━━━━━━━━━━━━━━━━━\n"
+        f"👤 <b>Mijoz:</b> {client_name}\n"
+        f"📞 <b>Tel:</b> {client_phone}\n"
+        f"🏪 <b>Restoran:</b> {client.shop.name}\n"
+        f"📍 <b>Filial:</b> {branch_name}\n"
+        f"━━━━━━━━━━━━━━━━━━━━\n"
+        f"{items_text}"
+        f"━━━━━━━━━━━━━━━━━━━━\n"
+        f"💰 <b>JAMI: {order.total_price:,.0f} so'm</b>\n"
+        f"⏰ <b>Vaqt:</b> {timezone.localtime(order.created_at).strftime('%H:%M | %d.%m.%Y')}"
+    )
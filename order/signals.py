@@ -0,0 +1,15 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Order, OrderItem
+
+
+@receiver(post_delete, sender=OrderItem)
+def item_deleted(sender, instance, origin=None, **kwargs):
+    """Qator o'chirilganda (item.delete(), queryset.delete(), mahsulot bilan kaskad) summadan ayiriladi"""
+    # Buyurtmaning o'zi o'chirilayotgan bo'lsa summani yangilashga hojat yo'q
+    if isinstance(origin, Order) or (isinstance(origin, QuerySet) and origin.model is Order):
+        return
+    summary = getattr(instance, '_saved_state', (None, instance.summary))[1]
+    instance._apply_delta(-(summary or 0))
@@ -0,0 +1,267 @@
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+
+import requests
+from django.db import transaction, connection
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from config.env_config import (
+    ADMIN_GROUP, BOT_TOKEN, NOTIFY_DIGEST_THRESHOLD, NOTIFY_DIGEST_WINDOW, TELEGRAM_API_URL,
+)
+from le_vanille.metrics import TELEGRAM_LATENCY
+from .digest import collapse_pending, pending_order_count
+from .models import TelegramOutbox
+
+logger = logging.getLogger(__name__)
+
+CONNECT_TIMEOUT = 3
+READ_TIMEOUT = 10
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 2  # soniya
+BACKOFF_MAX = 600
+# Ijara: olingan qatorlar shuncha vaqt boshqa workerlarga ko'rinmaydi (har bir xabar uchun timeout + zaxira)
+LEASE_MARGIN = 30
+
+# Telegram cheklovlari: guruhga daqiqasiga ~20 ta, shaxsiy chatga soniyasiga ~1 ta,
+# bot bo'yicha umumiy — soniyasiga ~30 ta xabar
+GROUP_INTERVAL = 3.0
+PRIVATE_INTERVAL = 1.0
+GLOBAL_PER_SECOND = 30
+
+
+class TelegramError(Exception):
+    def __init__(self, message, retry_after=None, permanent=False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.permanent = permanent
+
+
+def enqueue(chat_id, method, payload, order=None):
+    """Outbox uchun yozuv (saqlanmagan) — chaqiruvchi bulk_create qiladi"""
+    return TelegramOutbox(order=order, chat_id=str(chat_id), method=method, payload=payload)
+
+
+class ChatRateLimiter:
+    """Har bir chat va umumiy bot uchun minimal oraliqni ta'minlaydi"""
+
+    def __init__(self, group_interval=GROUP_INTERVAL, private_interval=PRIVATE_INTERVAL,
+                 per_second=GLOBAL_PER_SECOND, clock=time.monotonic):
+        self.group_interval = group_interval
+        self.private_interval = private_interval
+        self.global_interval = 1.0 / per_second if per_second else 0
+        self.clock = clock
+        self._next_chat = {}
+        self._next_global = 0.0
+        self._lock = threading.Lock()
+
+    def interval(self, chat_id):
+        return self.group_interval if str(chat_id).startswith("-") else self.private_interval
+
+    def wait_time(self, chat_id):
+        now = self.clock()
+        return max(self._next_chat.get(str(chat_id), 0.0) - now, self._next_global - now, 0.0)
+
+    def acquire(self, chat_id):
+        """Chatga hozir yuborish mumkin bo'lsa joyni band qiladi va True qaytaradi"""
+        with self._lock:
+            if self.wait_time(chat_id) > 0:
+                return False
+            now = self.clock()
+            self._next_chat[str(chat_id)] = now + self.interval(chat_id)
+            self._next_global = now + self.global_interval
+            return True
+
+    def penalize(self, chat_id, seconds):
+        """429 javobidagi retry_after ni hisobga olish"""
+        with self._lock:
+            self._next_chat[str(chat_id)] = self.clock() + seconds
+
+
+class TelegramClient:
+    """Bot API uchun keep-alive ulanishlar puli bilan HTTP klient"""
+
+    def __init__(self, token=BOT_TOKEN, api_url=TELEGRAM_API_URL, pool_size=10):
+        self.base_url = f"{api_url.rstrip('/')}/bot{token}"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def call(self, method, payload):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = self._call(method, payload)
+            outcome = "ok"
+            return result
+        except TelegramError as e:
+            if e.retry_after:
+                outcome = "rate_limited"
+            raise
+        finally:
+            TELEGRAM_LATENCY.observe(time.perf_counter() - started, method=method, outcome=outcome)
+
+    def _call(self, method, payload):
+        try:
+            response = self.session.post(
+                f"{self.base_url}/{method}", json=payload, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+            )
+        except requests.RequestException as e:
+            raise TelegramError(str(e))
+
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        if not isinstance(data, dict):
+            # Proksi yoki balanser javobi — Bot API obyekti emas, keyinroq qayta urinib ko'riladi
+            raise TelegramError(f"HTTP {response.status_code}: kutilmagan javob")
+
+        if response.status_code == 429:
+            retry_after = (data.get("parameters") or {}).get("retry_after", 1)
+            raise TelegramError("Too Many Requests", retry_after=retry_after)
+        if response.status_code >= 500:
+            raise TelegramError(f"HTTP {response.status_code}")
+        if not data.get("ok"):
+            # 400/403 kabi xatolar qayta urinish bilan tuzalmaydi
+            raise TelegramError(data.get("description") or f"HTTP {response.status_code}", permanent=True)
+        return data.get("result")
+
+
+def backoff_delay(attempts):
+    """Eksponensial kutish (jitter bilan)"""
+    delay = min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+    return delay * random.uniform(0.8, 1.2)
+
+
+class OutboxWorker:
+    """Outbox'dagi xabarlarni navbat bo'yicha yuboradi"""
+
+    def __init__(self, client=None, limiter=None, batch_size=50, digest_chat=ADMIN_GROUP,
+                 digest_threshold=NOTIFY_DIGEST_THRESHOLD, digest_window=NOTIFY_DIGEST_WINDOW,
+                 clock=time.monotonic):
+        self.client = client or TelegramClient()
+        self.limiter = limiter or ChatRateLimiter()
+        self.batch_size = batch_size
+        self.digest_chat = str(digest_chat)
+        self.digest_threshold = digest_threshold
+        self.digest_window = digest_window
+        self.clock = clock
+        # Jamlanma rejimi shu vaqtgacha davom etadi (None — har bir buyurtma alohida yuboriladi)
+        self.digest_until = None
+
+    def digest_active(self):
+        return self.digest_until is not None and self.clock() < self.digest_until
+
+    def update_digest(self):
+        """Navbat katta bo'lsa buyurtma xabarlarini jamlaydi; yuklama tushsa alohida xabarlarga qaytadi"""
+        if not self.digest_threshold or self.digest_active():
+            return 0
+        if pending_order_count(self.digest_chat) < self.digest_threshold:
+            self.digest_until = None
+            return 0
+        collapsed = collapse_pending(self.digest_chat)
+        self.digest_until = self.clock() + self.digest_window
+        logger.info("Jamlanma rejimi: %s ta buyurtma birlashtirildi", collapsed)
+        return collapsed
+
+    def held(self, row):
+        """Jamlanma oynasi davomida yangi buyurtma xabarlari keyingi jamlanmani kutadi"""
+        return row.order_id is not None and row.chat_id == self.digest_chat and self.digest_active()
+
+    def _due(self):
+        queryset = TelegramOutbox.objects.filter(
+            status=TelegramOutbox.Status.PENDING,
+            next_attempt_at__lte=timezone.now(),
+        ).order_by("id")
+        if connection.features.has_select_for_update_skip_locked:
+            # Bir nechta worker bir xabarni ikki marta olmasligi uchun
+            queryset = queryset.select_for_update(skip_locked=True)
+        return queryset[:self.batch_size]
+
+    def _claim(self):
+        """Yuboriladigan qatorlarni qisqa tranzaksiyada ijaraga oladi: ``(olinganlar, keyinga_qoldi)``"""
+        claimed, deferred = [], 0
+        blocked_chats = set()
+        with transaction.atomic():
+            for row in self._due():
+                if self.held(row):
+                    deferred += 1
+                    continue
+                # Bir chatdagi tartib buzilmasligi uchun band chatning keyingi xabarlari ham kutadi
+                if row.chat_id in blocked_chats or not self.limiter.acquire(row.chat_id):
+                    blocked_chats.add(row.chat_id)
+                    deferred += 1
+                    continue
+                claimed.append(row)
+            if claimed:
+                # Worker yuborish paytida o'lsa, ijara tugagach xabarlar qayta navbatga chiqadi
+                lease = len(claimed) * (CONNECT_TIMEOUT + READ_TIMEOUT) + LEASE_MARGIN
+                TelegramOutbox.objects.filter(pk__in=[row.pk for row in claimed]).update(
+                    next_attempt_at=timezone.now() + timedelta(seconds=lease),
+                )
+        return claimed, deferred
+
+    def drain_once(self):
+        """Bitta partiyani yuboradi; ``(yuborildi, keyinga_qoldi)`` qaytaradi.
+
+        HTTP so'rovlar tranzaksiyadan tashqarida: qatorlar qulflanib turmaydi, har bir xabar
+        holati alohida saqlanadi.
+        """
+        self.update_digest()
+        claimed, deferred = self._claim()
+        sent = 0
+        failed_chats = set()
+        for row in claimed:
+            if row.chat_id in failed_chats:
+                # Chatdagi oldingi xabar o'tmadi: bu xabar ijaradan qaytariladi
+                TelegramOutbox.objects.filter(pk=row.pk).update(next_attempt_at=timezone.now())
+                deferred += 1
+                continue
+            if self._send(row):
+                sent += 1
+            else:
+                failed_chats.add(row.chat_id)
+                deferred += 1
+        return sent, deferred
+
+    def _send(self, row):
+        now = timezone.now()
+        try:
+            self.client.call(row.method, row.payload)
+        except TelegramError as e:
+            row.attempts += 1
+            row.last_error = str(e)[:1000]
+            if e.permanent or row.attempts >= MAX_ATTEMPTS:
+                row.status = TelegramOutbox.Status.FAILED
+                logger.error("Telegram xabari yuborilmadi #%s: %s", row.pk, e)
+            elif e.retry_after:
+                self.limiter.penalize(row.chat_id, e.retry_after)
+                row.next_attempt_at = now + timedelta(seconds=e.retry_after)
+            else:
+                row.next_attempt_at = now + timedelta(seconds=backoff_delay(row.attempts))
+            row.save(update_fields=["attempts", "last_error", "status", "next_attempt_at"])
+            return False
+
+        row.status = TelegramOutbox.Status.SENT
+        row.attempts += 1
+        row.sent_at = now
+        row.save(update_fields=["status", "attempts", "sent_at"])
+        return True
+
+    def run(self, idle_sleep=0.5, stop=None):
+        """Doimiy ishlovchi sikl (``stop`` — threading.Event)"""
+        while not (stop and stop.is_set()):
+            try:
+                sent, deferred = self.drain_once()
+            except Exception:
+                # Baza vaqtincha band/uzilgan bo'lsa worker to'xtab qolmasin
+                logger.exception("Outbox'ni yuborishda xato")
+                connection.close()
+                sent = 0
+            if not sent:
+                time.sleep(idle_sleep)
@@ -0,0 +1,123 @@
+"""Mahalliy soxta Telegram Bot API serveri (testlar va yuklama sinovlari uchun).
+
+Ishga tushirish::
+
+    python -m order.telegram_stub --port 8081 --latency 0.2 --rate-429 0.05
+
+So'ng ``TELEGRAM_API_URL=http://127.0.0.1:8081`` bilan ilovani ishga tushiring.
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PATH = re.compile(r"^/bot(?P<token>[^/]+)/(?P<method>\w+)$")
+
+
+class TelegramStub:
+    """``with TelegramStub() as stub:`` — fon oqimida ishlaydi, so'rovlarni ``stub.calls`` ga yozadi"""
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, rate_429=0.0, retry_after=1, seed=None):
+        self.latency = latency
+        self.rate_429 = rate_429
+        self.retry_after = retry_after
+        self.calls = []
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self._message_id = 0
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                match = _PATH.match(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if not match:
+                    return self._reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+
+                if stub.latency:
+                    time.sleep(stub.latency)
+
+                try:
+                    payload = json.loads(body or b"{}")
+                except ValueError:
+                    return self._reply(400, {"ok": False, "error_code": 400, "description": "Bad Request"})
+
+                with stub._lock:
+                    if stub.rate_429 and stub._random.random() < stub.rate_429:
+                        stub.rejected += 1
+                        return self._reply(429, {
+                            "ok": False, "error_code": 429,
+                            "description": f"Too Many Requests: retry after {stub.retry_after}",
+                            "parameters": {"retry_after": stub.retry_after},
+                        })
+                    stub._message_id += 1
+                    stub.calls.append({"method": match["method"], "payload": payload, "at": time.time()})
+                    message_id = stub._message_id
+
+                self._reply(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": payload.get("chat_id")}}})
+
+            def _reply(self, code, data):
+                raw = json.dumps(data).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(raw)))
+                self.end_headers()
+                self.wfile.write(raw)
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soxta Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="Har bir javob oldidan kutish (soniya)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429 qaytarish ehtimoli (0..1)")
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    stub = TelegramStub(args.host, args.port, args.latency, args.rate_429, args.retry_after)
+    print(f"Soxta Bot API: {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,648 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+import requests
+from openpyxl import load_workbook
+
+from client.cache import client_cache
+from client.models import Client, Shop
+from le_vanille.metrics import serve_metrics
+from product.catalog import invalidate_catalog
+from product.models import Category, Product
+from .admin import OrderItemResource
+from .delivery import delivery_batches
+from .digest import MESSAGE_LIMIT, ROUTE_POINTS, route_links, shop_digest
+from .exports import export_xlsx, stream_csv
+from .loadtest import (
+    TELEGRAM_ID_BASE, check_thresholds, cleanup, ensure_products, foreign_pending, loadtest_clients, percentile,
+    summarize,
+)
+from .models import Order, OrderItem, SalesRollup, TelegramOutbox
+from .rollups import rebuild
+from .transitions import transition
+from .services import DuplicateOrder, place_order
+from .telegram import ChatRateLimiter, OutboxWorker, TelegramClient, TelegramError
+from .telegram_stub import TelegramStub
+from .views import create_order_async
+
+
+class CreateOrderTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name="Evos")
+        cls.client_obj = Client.objects.create(
+            shop=shop, filial_name="Chilonzor", telegram_id=111, full_name="Ali", phone="+998900000000",
+            latitude="41.311081", longitude="69.240562",
+        )
+        category = Category.objects.create(name="Tortlar")
+        cls.products = [
+            Product.objects.create(category=category, name=f"Tort {i}", price=1000 * (i + 1), image="products/t.jpg")
+            for i in range(10)
+        ]
+
+    def setUp(self):
+        # TestCase'da on_commit ishlamaydi: kesh va narx jadvalini qo'lda yangilaymiz
+        client_cache.clear()
+        invalidate_catalog()
+
+    def post_order(self, items, **extra):
+        body = {"telegram_id": self.client_obj.telegram_id, "items": items, **extra}
+        return self.client.post(reverse("create_order"), json.dumps(body), content_type="application/json")
+
+    def test_query_count_does_not_depend_on_basket_size(self):
+        small = [{"product_id": self.products[0].id, "quantity": 1}]
+        large = [{"product_id": p.id, "quantity": 2} for p in self.products]
+
+        # Birinchi so'rov mijozni keshga yuklaydi va narx jadvalini quradi (+2 so'rov)
+        with self.assertNumQueries(8):
+            self.assertEqual(self.post_order(small).status_code, 200)
+        with self.assertNumQueries(6):
+            self.assertEqual(self.post_order(small).status_code, 200)
+        with self.assertNumQueries(6):
+            self.assertEqual(self.post_order(large).status_code, 200)
+
+    def test_items_and_total_are_saved(self):
+        response = self.post_order([
+            {"product_id": self.products[0].id, "quantity": 2},
+            {"product_id": self.products[1].id, "quantity": 1},
+            {"product_id": self.products[0].id, "quantity": 1},
+        ])
+
+        order = Order.objects.get(pk=response.json()["order_id"])
+        self.assertEqual(order.total_price, 3 * 1000 + 2000)
+        self.assertEqual(
+            sorted(order.items.values_list("product_id", "quantity", "summary")),
+            [(self.products[0].id, 3, 3000), (self.products[1].id, 1, 2000)],
+        )
+
+    def test_notifications_are_queued_with_the_order(self):
+        response = self.post_order([{"product_id": self.products[0].id, "quantity": 1}])
+
+        order_id = response.json()["order_id"]
+        self.assertEqual(
+            list(TelegramOutbox.objects.filter(order_id=order_id).values_list("method", flat=True).order_by("id")),
+            ["sendLocation", "sendMessage"],
+        )
+
+    def test_replayed_request_returns_the_original_order(self):
+        items = [{"product_id": self.products[0].id, "quantity": 1}]
+        first = self.post_order(items, request_id="abc-1").json()
+
+        with self.assertNumQueries(1):
+            second = self.post_order(items, request_id="abc-1").json()
+
+        self.assertEqual(second["order_id"], first["order_id"])
+        self.assertTrue(second["replayed"])
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(TelegramOutbox.objects.filter(method="sendMessage").count(), 1)
+
+    def test_concurrent_duplicate_hits_unique_key(self):
+        items = [{"product_id": self.products[0].id, "quantity": 1}]
+        order, _ = place_order(self.client_obj, items, "", idempotency_key="abc-2")
+
+        with self.assertRaises(DuplicateOrder) as ctx:
+            place_order(self.client_obj, items, "", idempotency_key="abc-2")
+        self.assertEqual(ctx.exception.order_id, order.id)
+
+    def test_async_view_creates_and_replays(self):
+        body = json.dumps({
+            "telegram_id": self.client_obj.telegram_id, "request_id": "abc-3",
+            "items": [{"product_id": self.products[1].id, "quantity": 2}],
+        })
+        post = lambda: async_to_sync(create_order_async)(  # noqa: E731
+            AsyncRequestFactory().post("/order/create-order/", body, content_type="application/json")
+        )
+
+        first = json.loads(post().content)
+        second = json.loads(post().content)
+
+        self.assertEqual(Order.objects.get(pk=first["order_id"]).total_price, 4000)
+        self.assertEqual(second, {"status": "success", "order_id": first["order_id"], "replayed": True})
+
+    def test_unavailable_and_unknown_lines_get_structured_errors(self):
+        Product.objects.filter(pk=self.products[2].pk).update(is_available=False)
+        invalidate_catalog()
+
+        response = self.post_order([
+            {"product_id": self.products[0].id, "quantity": 1},
+            {"product_id": self.products[2].id, "quantity": 1},
+            {"product_id": 999999, "quantity": 1},
+            {"product_id": "x", "quantity": 1},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [(e["line"], e["product_id"], e["code"]) for e in response.json()["errors"]],
+            [(1, self.products[2].id, "unavailable"), (2, 999999, "unknown"), (3, None, "invalid")],
+        )
+        self.assertFalse(Order.objects.exists())
+
+    def test_unknown_product_rolls_back(self):
+        response = self.post_order([
+            {"product_id": self.products[0].id, "quantity": 1},
+            {"product_id": 999999, "quantity": 1},
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+        self.assertFalse(OrderItem.objects.exists())
+        self.assertFalse(TelegramOutbox.objects.exists())
+
+
+class SalesRollupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name="Evos")
+        cls.clients = [
+            Client.objects.create(shop=shop, filial_name=f"Filial {i}", telegram_id=700 + i, full_name="-", phone="-")
+            for i in range(2)
+        ]
+        category = Category.objects.create(name="Tortlar")
+        cls.products = [
+            Product.objects.create(category=category, name=f"Tort {i}", price=1000 * (i + 1), image="products/t.jpg")
+            for i in range(2)
+        ]
+
+    def setUp(self):
+        invalidate_catalog()
+
+    def totals(self):
+        return sorted(SalesRollup.objects.values_list("client_id", "product_id", "quantity", "revenue", "lines"))
+
+    def test_orders_and_status_changes_keep_rollup_in_sync(self):
+        first, second = self.products
+        place_order(self.clients[0], [{"product_id": first.id, "quantity": 2}, {"product_id": second.id, "quantity": 1}], "")
+        place_order(self.clients[0], [{"product_id": first.id, "quantity": 3}], "")
+        order, _ = place_order(self.clients[1], [{"product_id": second.id, "quantity": 4}], "")
+
+        self.assertEqual(self.totals(), [
+            (self.clients[0].id, first.id, 5, 5000, 2),
+            (self.clients[0].id, second.id, 1, 2000, 1),
+            (self.clients[1].id, second.id, 4, 8000, 1),
+        ])
+
+        transition(Order.objects.filter(pk=order.pk), Order.Status.CANCELED)
+        incremental = self.totals()
+        self.assertEqual(incremental[-1], (self.clients[1].id, second.id, 0, 0, 0))
+
+        # Qayta yig'ilganda bekor qilingan buyurtmaning (nol) qatori umuman bo'lmaydi
+        self.assertEqual(rebuild(), 2)
+        self.assertEqual(self.totals(), incremental[:-1])
+
+    def test_category_change_does_not_split_rollup_key(self):
+        first = self.products[0]
+        order, _ = place_order(self.clients[0], [{"product_id": first.id, "quantity": 2}], "")
+
+        # Buyurtmadan keyin mahsulot boshqa kategoriyaga o'tkaziladi, so'ng buyurtma bekor qilinadi
+        first.category = Category.objects.create(name="Pishiriqlar")
+        first.save()
+        transition(Order.objects.filter(pk=order.pk), Order.Status.CANCELED)
+
+        self.assertEqual(self.totals(), [(self.clients[0].id, first.id, 0, 0, 0)])
+        place_order(self.clients[0], [{"product_id": first.id, "quantity": 1}], "")
+        self.assertEqual(
+            list(SalesRollup.objects.values_list("product__category__name", "quantity")), [("Pishiriqlar", 1)],
+        )
+
+
+class StatusTransitionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name="Evos")
+        cls.client_obj = Client.objects.create(shop=shop, filial_name="-", telegram_id=900, full_name="-", phone="-")
+
+    def make_orders(self, count, status=Order.Status.CREATED):
+        return Order.objects.bulk_create([Order(shop=self.client_obj.shop, client=self.client_obj, status=status)
+                                          for _ in range(count)])
+
+    def test_illegal_transitions_are_skipped_and_reported(self):
+        created = self.make_orders(2)
+        delivered = self.make_orders(1, Order.Status.DELIVERED)
+
+        moved, skipped = transition(Order.objects.all(), Order.Status.CONFIRMED)
+
+        self.assertEqual(sorted(moved), sorted(o.id for o in created))
+        self.assertEqual(skipped, [(delivered[0].id, Order.Status.DELIVERED)])
+        self.assertEqual(Order.objects.get(pk=delivered[0].pk).status, Order.Status.DELIVERED)
+        self.assertFalse(Order.objects.filter(status=Order.Status.CONFIRMED, confirmed_at__isnull=True).exists())
+
+    def test_cancel_does_not_touch_delivered_at(self):
+        order = self.make_orders(1, Order.Status.CONFIRMED)[0]
+        transition(Order.objects.filter(pk=order.pk), Order.Status.CANCELED)
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.Status.CANCELED)
+        self.assertIsNone(order.delivered_at)
+
+    def test_query_count_does_not_depend_on_selection_size(self):
+        self.make_orders(3)
+        self.make_orders(2, Order.Status.CONFIRMED)
+        # savepoint + o'qish + yig'indi + har bir manba holat uchun UPDATE + xabarlar + release
+        with self.assertNumQueries(7):
+            moved, _ = transition(Order.objects.all(), Order.Status.CANCELED)
+        self.make_orders(50)
+        with self.assertNumQueries(5):
+            transition(Order.objects.filter(status=Order.Status.CREATED), Order.Status.CONFIRMED)
+
+        self.assertEqual(len(moved), 5)
+        self.assertEqual(
+            TelegramOutbox.objects.filter(chat_id=str(self.client_obj.telegram_id), method="sendMessage").count(), 55,
+        )
+
+
+class DeliveryBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name="Evos")
+        points = {
+            "Chilonzor": [(41.2850, 69.2040), (41.2870, 69.2060), (41.2900, 69.2010)],
+            "Yunusobod": [(41.3660, 69.2880), (41.3675, 69.2900)],
+            "Manzilsiz": [(None, None)],
+        }
+        telegram_id = 700
+        for filial, coordinates in points.items():
+            for latitude, longitude in coordinates:
+                telegram_id += 1
+                client = Client.objects.create(shop=shop, filial_name=filial, telegram_id=telegram_id, full_name="-",
+                                               phone="-", latitude=latitude, longitude=longitude)
+                Order.objects.create(shop=shop, client=client, status=Order.Status.CONFIRMED, total_price=1000)
+        # Tasdiqlanmagan buyurtma partiyaga kirmaydi
+        Order.objects.create(shop=shop, client=client, status=Order.Status.CREATED)
+
+    def test_geohash_follows_coordinates(self):
+        client = Client.objects.get(telegram_id=701)
+        self.assertEqual(len(client.geohash), 9)
+        client.latitude = client.longitude = None
+        client.save()
+        self.assertEqual(client.geohash, "")
+
+    def test_orders_are_grouped_by_proximity(self):
+        with self.assertNumQueries(1):
+            result = delivery_batches(radius_km=2, max_orders=10)
+
+        filials = sorted(tuple(order["filial"] for order in batch["orders"]) for batch in result["batches"])
+        self.assertEqual(filials, [("Chilonzor",) * 3, ("Yunusobod",) * 2])
+        self.assertEqual(len(result["unlocated"]), 1)
+        self.assertTrue(all(batch["route_km"] < 2 for batch in result["batches"]))
+        self.assertTrue(all(len(batch["route_urls"]) == 1 for batch in result["batches"]))
+
+    def test_max_orders_splits_dense_area(self):
+        result = delivery_batches(radius_km=2, max_orders=2)
+        self.assertEqual(sorted(batch["order_count"] for batch in result["batches"]), [1, 2, 2])
+
+    def test_api_is_staff_only(self):
+        url = reverse("delivery_batches")
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        User = get_user_model()
+        self.client.force_login(User.objects.create_user("kuryer", password="-", is_staff=True))
+        response = self.client.get(url, {"radius_km": "20", "max_orders": "x"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["batches"]), 1)
+
+        # Cheksiz/NaN qiymatlar standart radiusga qaytadi
+        for radius in ("nan", "inf", "-inf"):
+            data = self.client.get(url, {"radius_km": radius}).json()
+            self.assertEqual((data["radius_km"], len(data["batches"])), (2.0, 2), radius)
+
+
+class StreamingExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name="Evos")
+        client = Client.objects.create(shop=shop, filial_name="Chilonzor", telegram_id=800, full_name="Ali", phone="-")
+        category = Category.objects.create(name="Tortlar")
+        product = Product.objects.create(category=category, name="Napoleon", price=1000, image="products/t.jpg")
+        for _ in range(30):
+            order = Order.objects.create(shop=shop, client=client)
+            OrderItem.objects.bulk_create([OrderItem(order=order, product=product, quantity=2, price=1000, summary=2000)])
+
+    def test_csv_streams_all_rows_in_one_query(self):
+        with self.assertNumQueries(1):
+            body = b"".join(stream_csv(OrderItem.objects.all(), OrderItemResource()).streaming_content).decode()
+
+        lines = body.lstrip("\ufeff").splitlines()
+        self.assertEqual(len(lines), 31)
+        self.assertTrue(lines[0].startswith("Restoran,Filial,Mijoz,Kategoriya,Mahsulot"))
+        self.assertTrue(lines[1].startswith("Evos,Chilonzor,Ali,Tortlar,Napoleon,2,"))
+
+    def test_xlsx_matches_resource_columns(self):
+        with self.assertNumQueries(1):
+            response = export_xlsx(OrderItem.objects.all(), OrderItemResource())
+
+        sheet = load_workbook(BytesIO(b"".join(response.streaming_content))).active
+        rows = list(sheet.values)
+        self.assertEqual(len(rows), 31)
+        self.assertEqual(list(rows[0]), OrderItemResource().get_export_headers())
+        self.assertEqual(rows[1][:6], ("Evos", "Chilonzor", "Ali", "Tortlar", "Napoleon", 2))
+
+
+class OrderTotalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        shop = Shop.objects.create(name="Evos")
+        client = Client.objects.create(shop=shop, filial_name="Yunusobod", telegram_id=222, full_name="Vali", phone="-")
+        category = Category.objects.create(name="Ichimliklar")
+        cls.product = Product.objects.create(category=category, name="Choy", price=500, image="products/c.jpg")
+        cls.order = Order.objects.create(shop=shop, client=client)
+
+    def total(self):
+        return Order.objects.get(pk=self.order.pk).total_price
+
+    def test_item_changes_apply_single_statement_deltas(self):
+        with self.assertNumQueries(2):
+            item = OrderItem.objects.create(order=self.order, product=self.product, quantity=2, price=500)
+        self.assertEqual(self.total(), 1000)
+
+        item = OrderItem.objects.get(pk=item.pk)
+        item.quantity = 5
+        with self.assertNumQueries(2):
+            item.save()
+        self.assertEqual(self.total(), 2500)
+
+        item.delete()
+        self.assertEqual(self.total(), 0)
+
+    def test_queryset_update_and_delete_keep_total(self):
+        other = Order.objects.create(shop=self.order.shop, client=self.order.client)
+        for quantity in (1, 2, 3):
+            OrderItem.objects.create(order=self.order, product=self.product, quantity=quantity, price=500)
+        self.assertEqual(self.total(), 3000)
+
+        OrderItem.objects.filter(order=self.order, quantity=1).update(quantity=4)
+        self.assertEqual(self.total(), 4500)
+        OrderItem.objects.filter(order=self.order).update(price=100)
+        self.assertEqual(self.total(), 900)
+
+        OrderItem.objects.filter(quantity=4).update(order=other)
+        self.assertEqual((self.total(), Order.objects.get(pk=other.pk).total_price), (500, 400))
+
+        OrderItem.objects.filter(order=self.order).delete()
+        self.assertEqual(self.total(), 0)
+
+    def test_product_delete_cascade_keeps_total(self):
+        product = Product.objects.create(category=self.product.category, name="Kofe", price=900, image="products/k.jpg")
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=1, price=500)
+        OrderItem.objects.create(order=self.order, product=product, quantity=2, price=900)
+
+        product.delete()
+
+        self.assertEqual(self.total(), 500)
+
+    def test_reconcile_repairs_drift(self):
+        OrderItem.objects.create(order=self.order, product=self.product, quantity=3, price=500)
+        Order.objects.filter(pk=self.order.pk).update(total_price=1)
+
+        call_command("reconcile_order_totals", stdout=StringIO())
+
+        self.assertEqual(self.total(), 1500)
+
+
+class OutboxWorkerTests(TransactionTestCase):
+    def make_worker(self, stub):
+        limiter = ChatRateLimiter(group_interval=0, private_interval=0, per_second=0)
+        return OutboxWorker(client=TelegramClient(token="test", api_url=stub.url), limiter=limiter)
+
+    def queue(self, *texts):
+        TelegramOutbox.objects.bulk_create([
+            TelegramOutbox(chat_id="-100", method="sendMessage", payload={"chat_id": "-100", "text": text})
+            for text in texts
+        ])
+
+    def test_pending_messages_are_sent_in_order(self):
+        self.queue("birinchi", "ikkinchi")
+
+        with TelegramStub() as stub:
+            self.assertEqual(self.make_worker(stub).drain_once(), (2, 0))
+
+        self.assertEqual([c["payload"]["text"] for c in stub.calls], ["birinchi", "ikkinchi"])
+        self.assertFalse(TelegramOutbox.objects.exclude(status=TelegramOutbox.Status.SENT).exists())
+
+    def test_429_is_retried_later(self):
+        self.queue("xabar")
+
+        with TelegramStub(rate_429=1.0, retry_after=7) as stub:
+            self.assertEqual(self.make_worker(stub).drain_once(), (0, 1))
+
+        row = TelegramOutbox.objects.get()
+        self.assertEqual(row.status, TelegramOutbox.Status.PENDING)
+        self.assertEqual(row.attempts, 1)
+        self.assertGreater(row.next_attempt_at, row.created_at)
+        self.assertEqual(stub.rejected, 1)
+
+    def test_group_rate_limit_defers_second_message(self):
+        self.queue("birinchi", "ikkinchi")
+
+        with TelegramStub() as stub:
+            worker = OutboxWorker(client=TelegramClient(token="test", api_url=stub.url), limiter=ChatRateLimiter())
+            self.assertEqual(worker.drain_once(), (1, 1))
+
+        self.assertEqual(len(stub.calls), 1)
+
+    def test_messages_are_sent_outside_transaction_under_lease(self):
+        self.queue("birinchi", "ikkinchi")
+        seen = []
+
+        class Client:
+            def call(client, method, payload):
+                # Yuborish paytida qator qulflanmagan va boshqa workerga berilmaydi
+                seen.append((connection.in_atomic_block, other._claim()[0]))
+                return {"message_id": 1}
+
+        worker = OutboxWorker(client=Client(), limiter=ChatRateLimiter(0, 0, 0))
+        other = OutboxWorker(client=Client(), limiter=ChatRateLimiter(0, 0, 0))
+        self.assertEqual(worker.drain_once(), (2, 0))
+
+        self.assertEqual(seen, [(False, []), (False, [])])
+        self.assertEqual(TelegramOutbox.objects.filter(status=TelegramOutbox.Status.SENT).count(), 2)
+
+    def test_unexpected_response_body_is_retried(self):
+        class Response:
+            status_code = 200
+
+            def json(self):
+                return ["ok"]
+
+        client = TelegramClient(token="test", api_url="http://127.0.0.1:9")
+        client.session.post = lambda *args, **kwargs: Response()
+        with self.assertRaises(TelegramError) as error:
+            client.call("sendMessage", {})
+        self.assertFalse(error.exception.permanent)
+
+    def place_orders(self, count):
+        shops = [Shop.objects.get_or_create(name=name)[0] for name in ("Evos", "Oqtepa")]
+        category, _ = Category.objects.get_or_create(name="Tortlar")
+        product, _ = Product.objects.get_or_create(
+            category=category, name="Napoleon", defaults={"price": 5000, "image": "products/t.jpg", "image_variants": {"source": "products/t.jpg"}},
+        )
+        invalidate_catalog()
+        start = Client.objects.count()
+        for i in range(start, start + count):
+            client = Client.objects.create(
+                shop=shops[i % 2], filial_name=f"Filial {i}", telegram_id=500 + i, full_name=f"Mijoz {i}",
+                phone="-", latitude=f"41.3{i}", longitude="69.24",
+            )
+            place_order(client, [{"product_id": product.id, "quantity": i + 1}], "")
+
+    def test_backlog_is_collapsed_into_digest_per_shop(self):
+        self.place_orders(4)
+        now = [0.0]
+
+        with TelegramStub() as stub:
+            worker = self.make_worker(stub)
+            worker.digest_chat, worker.digest_threshold, worker.digest_window = "-100", 3, 60
+            worker.clock = lambda: now[0]
+            self.assertEqual(worker.drain_once(), (2, 0))
+
+            # Oyna davomida kelgan buyurtma keyingi jamlanmani kutadi
+            self.place_orders(1)
+            self.assertEqual(worker.drain_once(), (0, 2))
+
+            # Oyna tugadi, yuklama past: alohida xabarlarga qaytiladi
+            now[0] = 61
+            self.assertEqual(worker.drain_once(), (2, 0))
+
+        texts = [c["payload"].get("text", "") for c in stub.calls]
+        self.assertIn("JAMLANMA: Evos</b> — 2 ta buyurtma", texts[0])
+        self.assertIn("JAMLANMA: Oqtepa</b> — 2 ta buyurtma", texts[1])
+        self.assertIn("maps/dir/", texts[0])
+        self.assertEqual([c["method"] for c in stub.calls[2:]], ["sendLocation", "sendMessage"])
+        self.assertEqual(TelegramOutbox.objects.filter(status=TelegramOutbox.Status.DIGESTED).count(), 8)
+        self.assertIsNone(worker.digest_until)
+
+    def test_low_traffic_keeps_per_order_messages(self):
+        self.place_orders(2)
+
+        with TelegramStub() as stub:
+            worker = self.make_worker(stub)
+            worker.digest_chat, worker.digest_threshold = "-100", 3
+            self.assertEqual(worker.drain_once(), (4, 0))
+
+        self.assertEqual([c["method"] for c in stub.calls], ["sendLocation", "sendMessage"] * 2)
+
+
+class DigestTests(SimpleTestCase):
+    def make_order(self, pk, shop, full_name, products):
+        client = Client(shop=shop, full_name=full_name, filial_name="A<B", latitude="41.3", longitude=f"69.{pk}")
+        order = Order(id=pk, shop=shop, client=client, total_price=Decimal("1000"), created_at=timezone.now())
+        return order, [OrderItem(order=order, product=Product(name=name), quantity=1) for name in products]
+
+    def test_values_are_html_escaped(self):
+        shop = Shop(name="<Evos>")
+        order, items = self.make_order(1, shop, "Ali & <b>Vali</b>", ["Tort </b><i>"])
+
+        text, = shop_digest(shop, [order], {1: items})
+        self.assertIn("JAMLANMA: &lt;Evos&gt;</b>", text)
+        self.assertIn("Ali &amp; &lt;b&gt;Vali&lt;/b&gt; (A&lt;B)", text)
+        self.assertIn("Tort &lt;/b&gt;&lt;i&gt; x 1", text)
+        self.assertNotIn("<i>", text)
+
+    def test_oversized_order_is_split(self):
+        shop = Shop(name="Evos")
+        names = [f"{i:03} " + "N" * 195 for i in range(60)]
+        order, items = self.make_order(1, shop, "Ali", names)
+        other, other_items = self.make_order(2, shop, "Vali", ["Napoleon"])
+
+        texts = shop_digest(shop, [order, other], {1: items, 2: other_items})
+        self.assertGreater(len(texts), 2)
+        self.assertTrue(all(len(text) <= MESSAGE_LIMIT for text in texts))
+        joined = "".join(texts)
+        self.assertTrue(all(name in joined for name in names + ["Napoleon"]))
+        self.assertIn("JAMI: 2,000 so'm", texts[-1])
+
+    def test_long_route_is_split_into_links(self):
+        points = [(41.0, 69.0 + i / 100) for i in range(23)]
+        legs = [url.removeprefix("https://www.google.com/maps/dir/").split("/") for url in route_links(points)]
+
+        self.assertEqual(len(legs), 3)
+        self.assertTrue(all(len(leg) <= ROUTE_POINTS for leg in legs))
+        # Har bir havola oldingisi tugagan nuqtadan boshlanadi va barcha manzillar qamraladi
+        self.assertEqual(legs[0] + legs[1][1:] + legs[2][1:], [f"{lat},{lon}" for lat, lon in points])
+        self.assertEqual(len(route_links(points[:ROUTE_POINTS])), 1)
+
+
+class LoadTestReportTests(TestCase):
+    def test_cleanup_removes_everything_the_run_created(self):
+        real_shop = Shop.objects.create(name="Evos")
+        real = Client.objects.create(shop=real_shop, filial_name="A", telegram_id=111, full_name="Ali", phone="-")
+        product_ids = ensure_products(2)
+        place_order(real, [{"product_id": product_ids[0], "quantity": 1}], "")
+        self.assertEqual(foreign_pending(loadtest_clients()), TelegramOutbox.objects.count())
+        TelegramOutbox.objects.update(status=TelegramOutbox.Status.SENT)
+
+        started_at = timezone.now()
+        shop = Shop.objects.create(name="Yuklama 1")
+        client = Client.objects.create(
+            shop=shop, filial_name="Sinov", telegram_id=TELEGRAM_ID_BASE + 1, full_name="Yuklama", phone="-",
+        )
+        place_order(client, [{"product_id": pid, "quantity": 1} for pid in product_ids], "")
+        TelegramOutbox.objects.create(chat_id="-100", method="sendMessage", payload={"text": "JAMLANMA"})
+        self.assertEqual(foreign_pending(loadtest_clients()), 1)
+
+        cleanup(loadtest_clients(), since=started_at)
+
+        self.assertEqual(list(Client.objects.values_list("id", flat=True)), [real.id])
+        self.assertEqual(list(Shop.objects.values_list("id", flat=True)), [real_shop.id])
+        self.assertFalse(TelegramOutbox.objects.filter(order__isnull=True).exists())
+        self.assertFalse(TelegramOutbox.objects.exclude(order__client=real).exists())
+        # Haqiqiy buyurtmadagi Benchmark mahsuloti va uning kategoriyasi qoladi, qolganlari o'chadi
+        self.assertEqual(list(Product.objects.values_list("id", flat=True)), product_ids[:1])
+        self.assertTrue(Category.objects.filter(name="Benchmark").exists())
+
+    def test_percentiles_and_threshold_failures(self):
+        results = [("create_order", ms / 1000, True) for ms in range(1, 101)] + [("create_order", 5, False)]
+        summary = summarize(results, elapsed=10)
+
+        self.assertEqual(percentile([3, 1, 2], 50), 2)
+        self.assertAlmostEqual(summary["create_order"]["p95"], 95)
+        self.assertEqual(summary["create_order"]["errors"], 1)
+        self.assertEqual(check_thresholds(summary, {"create_order": 6}, {"create_order": {"p95": 100, "queries": 6}}), [])
+        self.assertEqual(
+            check_thresholds(summary, {"create_order": 8}, {"create_order": {"p95": 50, "queries": 6}}, 0),
+            ["create_order: p95 95.0 ms > 50 ms", "create_order: 8 ta SQL so'rov > 6", "create_order: xatolar 1/101"],
+        )
+
+
+@override_settings(MIDDLEWARE=[
+    "le_vanille.metrics.MetricsMiddleware",
+    "django.contrib.sessions.middleware.SessionMiddleware",
+    "django.contrib.auth.middleware.AuthenticationMiddleware",
+])
+class MetricsTests(TestCase):
+    def test_requests_are_exported_with_query_counts(self):
+        response = self.client.post(
+            reverse("create_order"), data=json.dumps({"telegram_id": 404, "items": []}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 404)
+
+        # METRICS_TOKEN berilmagan: faqat xodimlarga ochiq
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+        self.client.force_login(get_user_model().objects.create_user("staff", is_staff=True))
+
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="create_order",method="POST",status="4xx"}', body)
+        self.assertRegex(body, r'http_request_db_queries_bucket\{view="create_order",le="1"\} [1-9]')
+        self.assertIn('cache_requests_total{cache="client",result="miss"}', body)
+
+    def test_worker_process_serves_telegram_latency(self):
+        server = serve_metrics(0)
+        self.addCleanup(server.shutdown)
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+        with TelegramStub() as stub:
+            TelegramClient(token="test", api_url=stub.url).call("sendMessage", {"chat_id": 1, "text": "salom"})
+
+        response = requests.get(f"{url}/metrics", timeout=5)
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response.text, r'telegram_request_duration_seconds_count\{method="sendMessage",outcome="ok"\} [1-9]',
+        )
+        self.assertEqual(requests.get(f"{url}/", timeout=5).status_code, 404)
@@ -0,0 +1,72 @@
+"""Buyurtmalar holatini ommaviy o'zgartirish: faqat ruxsat etilgan o'tishlar, har bir manba
+holat uchun bitta shartli UPDATE, mijozlarga xabarlar esa bitta ``bulk_create`` bilan."""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import rollups
+from .models import Order, TelegramOutbox
+from .telegram import enqueue
+
+CLIENT_MESSAGES = {
+    Order.Status.CONFIRMED: "✅ Buyurtmangiz #{id} tasdiqlandi.",
+    Order.Status.DELIVERED: "🚚 Buyurtmangiz #{id} yetkazildi. Xaridingiz uchun rahmat!",
+    Order.Status.CANCELED: "❌ Buyurtmangiz #{id} bekor qilindi.",
+}
+
+
+def status_fields(target, now=None):
+    """UPDATE uchun maydonlar: yangi holat va (bo'lsa) uning vaqti"""
+    fields = {"status": target}
+    stamp = Order.STATUS_TIMESTAMPS.get(target)
+    if stamp:
+        fields[stamp] = now or timezone.now()
+    return fields
+
+
+def client_notifications(rows, target):
+    """``[(order_id, telegram_id), ...]`` uchun mijozlarga outbox yozuvlari (saqlanmagan)"""
+    template = CLIENT_MESSAGES.get(target)
+    if not template:
+        return []
+    return [
+        enqueue(telegram_id, "sendMessage", {"chat_id": telegram_id, "text": template.format(id=order_id)},
+                order=Order(id=order_id))
+        for order_id, telegram_id in rows
+        if telegram_id
+    ]
+
+
+def transition(queryset, target, now=None):
+    """Tanlangan buyurtmalarni ``target`` holatiga o'tkazadi.
+
+    ``(o'tkazilgan_idlar, o'tkazib_yuborilganlar)`` qaytaradi; ikkinchisi — ``[(id, joriy_holat), ...]``.
+    So'rovlar soni buyurtmalar soniga emas, manba holatlar soniga bog'liq.
+    """
+    fields = status_fields(target, now)
+    with transaction.atomic():
+        # Bir vaqtda ishlayotgan boshqa dispetcher bilan to'qnashmaslik uchun qatorlar qulflanadi
+        rows = list(
+            queryset.select_for_update(of=("self",)).order_by()
+            .values_list("id", "status", "client__telegram_id")
+        )
+        by_source = defaultdict(list)
+        skipped = []
+        for order_id, status, telegram_id in rows:
+            if Order.can_transition(status, target):
+                by_source[status].append((order_id, telegram_id))
+            else:
+                skipped.append((order_id, status))
+
+        moved = [row for source_rows in by_source.values() for row in source_rows]
+        if target == Order.Status.CANCELED:
+            # Bekor qilingan buyurtmalar savdo yig'indisidan chiqariladi
+            rollups.apply_orders([order_id for order_id, _ in moved], -1)
+
+        for source, source_rows in by_source.items():
+            # status=source sharti: holat shu orada o'zgargan bo'lsa qator tegilmaydi
+            Order.objects.filter(pk__in=[order_id for order_id, _ in source_rows], status=source).update(**fields)
+
+        TelegramOutbox.objects.bulk_create(client_notifications(moved, target))
+    return [order_id for order_id, _ in moved], skipped
@@ -1,6 +1,9 @@
 from django.urls import path
-from .views import create_order
+
+from config.env_config import ASYNC_VIEWS
+from .views import create_order, create_order_async, delivery_batches_api
 
 urlpatterns = [
-    path('create-order/', create_order, name='create_order'),
-]
\ No newline at end of file
+    path('create-order/', create_order_async if ASYNC_VIEWS else create_order, name='create_order'),
+    path('api/delivery-batches/', delivery_batches_api, name='delivery_batches'),
+]
@@ -1,48 +1,31 @@
 import json
+import math
 
-import requests
+from asgiref.sync import sync_to_async
+from django.contrib.admin.views.decorators import staff_member_required
 from django.http import JsonResponse
-from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_GET
 
-# Modellarni import qilish
-from client.models import Client
-from config.env_config import ADMIN_GROUP, BOT_TOKEN
-from product.models import Product
-from .models import Order, OrderItem
-
-
-def send_telegram_location(chat_id, lat, lon):
-    """Guruhga mijoz lokatsiyasini xarita ko'rinishida yuborish"""
-    token = BOT_TOKEN
-    url = f"https://api.telegram.org/bot{token}/sendLocation"
-    payload = {
-        "chat_id": chat_id,
-        "latitude": float(lat),
-        "longitude": float(lon)
-    }
-    try:
-        requests.post(url, json=payload)
-    except Exception as e:
-        print(f"Lokatsiya yuborishda xato: {e}")
+from client.cache import get_client, aget_client
+from .delivery import DEFAULT_MAX_ORDERS, DEFAULT_RADIUS_KM, delivery_batches
+from .services import place_order, replayed_order_id, areplayed_order_id, OrderError, DuplicateOrder
 
+CLIENT_NOT_FOUND = {'status': 'error',
+                    'message': 'Mijozlarimiz orasida topilmadingiz! Iltimos, '
+                               'adminga murojaat qiling!'}
 
-def send_telegram_message(message, chat_id):
-    """Adminlar guruhiga matnli xabar yuborish"""
-    token = BOT_TOKEN
-    url = f"https://api.telegram.org/bot{token}/sendMessage"
 
-    payload = {
-        "chat_id": chat_id,
-        "text": message,
-        "parse_mode": "HTML"
-    }
+def get_request_id(request, data):
+    """WebApp yuborgan idempotentlik kaliti (bo'lmasa None)"""
+    request_id = str(data.get('request_id') or request.headers.get('Idempotency-Key') or '').strip()
+    if len(request_id) > 64:
+        raise OrderError("So'rov ID si juda uzun")
+    return request_id or None
 
-    try:
-        response = requests.post(url, json=payload)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"Xabar yuborishda xato: {e}")
+
+def replay_response(order_id):
+    return JsonResponse({'status': 'success', 'order_id': order_id, 'replayed': True})
 
 
 @csrf_exempt
@@ -52,73 +35,85 @@ def create_order(request):
             data = json.loads(request.body)
             telegram_id = data.get('telegram_id')
 
-            # 1. Mijozni topamiz
+            # 1. Mijozni topamiz (avval jarayon ichidagi keshdan)
+            client = get_client(telegram_id)
+            if client is None:
+                return JsonResponse(CLIENT_NOT_FOUND, status=404)
+
             try:
-                client = Client.objects.get(telegram_id=telegram_id)
-            except Client.DoesNotExist:
-                return JsonResponse({'status': 'error',
-                                     'message': 'Mijozlarimiz orasida topilmadingiz! Iltimos, '
-                                                'adminga murojaat qiling!'},
-                                    status=404)
-
-            # 2. Order yaratish
-            new_order = Order.objects.create(
-                client=client,
-                shop=client.shop,
-                comment=data.get('comment', 'Yo\'q')
-            )
+                # 2. Qayta yuborilgan so'rov bo'lsa avvalgi buyurtma qaytariladi
+                request_id = get_request_id(request, data)
+                order_id = replayed_order_id(client, request_id) if request_id else None
+                if order_id:
+                    return replay_response(order_id)
+
+                # 3. Order, uning tarkibi va guruhga xabarlar bitta tranzaksiyada yoziladi
+                #    (xabarlarni send_notifications worker'i yuboradi)
+                new_order, lines = place_order(
+                    client, data.get('items', []), data.get('comment', 'Yo\'q'), idempotency_key=request_id,
+                )
+            except DuplicateOrder as e:
+                return replay_response(e.order_id)
+            except OrderError as e:
+                return JsonResponse(e.as_dict(), status=e.status)
 
-            items_text = ""
-            total_order_sum = 0
+            return JsonResponse({'status': 'success', 'order_id': new_order.id})
 
-            # 3. Savatdagi mahsulotlarni aylanamiz
-            for item in data.get('items', []):
-                product = Product.objects.get(id=item.get('product_id'))
-                qty = int(item.get('quantity', 0))
+        except Exception as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
-                if qty <= 0: continue
+    return JsonResponse({'status': 'invalid method'}, status=405)
 
-                order_item = OrderItem.objects.create(
-                    order=new_order,
-                    product=product,
-                    quantity=qty,
-                    price=product.price
-                )
-                total_order_sum += order_item.summary
-                items_text += f"🔹 <b>{product.name}</b>\n   └ {qty} x {product.price:,.0f} = {order_item.summary:,.0f} so'm\n"
-
-            # 4. Yakuniy summani saqlash
-            new_order.total_price = total_order_sum
-            new_order.save()
-
-            # 5. Hisobotni tayyorlash
-            client_name = getattr(client, 'full_name', 'Noma’lum')
-            client_phone = getattr(client, 'phone', 'Kiritilmagan')
-            branch_name = getattr(client, 'filial_name', 'Kiritilmagan')
-
-            report = (
-                f"🛍 <b>YANGI BUYURTMA #{new_order.id}</b>\n"
-                f"━━━━━━━━━━━━━━━━━━━━\n"
-                f"👤 <b>Mijoz:</b> {client_name}\n"
-                f"📞 <b>Tel:</b> {client_phone}\n"
-                f"🏪 <b>Restoran:</b> {client.shop.name}\n"
-                f"📍 <b>Filial:</b> {branch_name}\n"                
-                f"━━━━━━━━━━━━━━━━━━━━\n"
-                f"{items_text}"
-                f"━━━━━━━━━━━━━━━━━━━━\n"
-                f"💰 <b>JAMI: {total_order_sum:,.0f} so'm</b>\n"
-                f"⏰ <b>Vaqt:</b> {timezone.localtime(new_order.created_at).strftime('%H:%M | %d.%m.%Y')}"
-            )
 
-            # 6. Lokatsiyani yuborish (Client jadvalidan olingan)
-            if client.latitude and client.longitude:
-                send_telegram_location(ADMIN_GROUP, client.latitude, client.longitude)
+@csrf_exempt
+async def create_order_async(request):
+    """create_order ning async varianti (ASGI/uvicorn uchun)"""
+    if request.method != 'POST':
+        return JsonResponse({'status': 'invalid method'}, status=405)
 
-            send_telegram_message(report, ADMIN_GROUP)
+    try:
+        data = json.loads(request.body)
 
-            return JsonResponse({'status': 'success', 'order_id': new_order.id})
+        client = await aget_client(data.get('telegram_id'))
+        if client is None:
+            return JsonResponse(CLIENT_NOT_FOUND, status=404)
 
-        except Exception as e:
-            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        try:
+            request_id = get_request_id(request, data)
+            order_id = await areplayed_order_id(client, request_id) if request_id else None
+            if order_id:
+                return replay_response(order_id)
+
+            # Tranzaksiya sync kodda bo'lishi shart, shuning uchun alohida oqimda bajariladi
+            new_order, lines = await sync_to_async(place_order)(
+                client, data.get('items', []), data.get('comment', 'Yo\'q'), idempotency_key=request_id,
+            )
+        except DuplicateOrder as e:
+            return replay_response(e.order_id)
+        except OrderError as e:
+            return JsonResponse(e.as_dict(), status=e.status)
 
-    return JsonResponse({'status': 'invalid method'}, status=405)
+        return JsonResponse({'status': 'success', 'order_id': new_order.id})
+
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+def bounded(value, default, cast, low, high):
+    try:
+        number = cast(value)
+    except (TypeError, ValueError):
+        return default
+    # "nan"/"inf" float() dan o'tadi, lekin min/max bilan chegaralab bo'lmaydi
+    if not math.isfinite(number):
+        return default
+    return min(max(number, low), high)
+
+
+@staff_member_required
+@require_GET
+def delivery_batches_api(request):
+    """Tasdiqlangan buyurtmalar yaqinlik bo'yicha partiyalarga bo'lingan holda (kuryerlar uchun)"""
+    radius_km = bounded(request.GET.get('radius_km'), DEFAULT_RADIUS_KM, float, 0.05, 50)
+    max_orders = bounded(request.GET.get('max_orders'), DEFAULT_MAX_ORDERS, int, 1, 100)
+    return JsonResponse(delivery_batches(radius_km, max_orders))
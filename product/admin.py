@@ -1,10 +1,43 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.db.models import Avg, Case, Count, Max, Q, Value, When
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
 from django.utils.html import format_html
 from django.utils.translation import gettext_lazy as _
 from unfold.admin import ModelAdmin
-from unfold.decorators import display
+from unfold.decorators import action, display
+from unfold.widgets import UnfoldAdminFileFieldWidget
 
+from le_vanille.admin_metrics import admin_metric, get_metric
 from .models import Category, Product
+from .pricelist import apply_prices, diff_prices
+from .search import search_products
+
+# Ko'rib chiqish va tasdiqlash orasida o'zgarishlar sessiyada saqlanadi
+PRICE_IMPORT_SESSION_KEY = "price_import"
+# Admin qidiruvida shuncha eng mos natija moslik bo'yicha tartiblanadi
+SEARCH_ORDER_LIMIT = 100
+
+
+class PriceListForm(forms.Form):
+    file = forms.FileField(label="Narxlar ro'yxati (XLSX yoki CSV)", widget=UnfoldAdminFileFieldWidget)
+
+
+def change_rows(changes):
+    return [
+        [change.product_id, change.name, f"{change.old_price:,.0f}".replace(",", " "),
+         f"{change.price:,.0f}".replace(",", " "), f"{change.delta:+,.0f}".replace(",", " "),
+         "Ha" if change.available else "Yo'q"]
+        for change in changes
+    ]
+
+
+@admin_metric("product_stats", Product)
+def product_stats():
+    # Soni va narx ko'rsatkichlari bitta so'rovda
+    return Product.objects.aggregate(total=Count("id"), avg_price=Avg("price"), max_price=Max("price"))
 
 
 @admin.register(Category)
@@ -19,11 +52,12 @@ class CategoryAdmin(ModelAdmin):
     def name_display(self, obj):
         return obj.name
 
-    @display(description="Mahsulotlar soni", label=True)
+    @display(description="Mahsulotlar soni", label=True, ordering="products_count")
     def products_count(self, obj):
-        # product_set o'rniga to'g'ridan-to'g'ri Product modelidan filter qilamiz
-        count = Product.objects.filter(category=obj).count()
-        return f"{count} ta mahsulot"
+        return f"{obj.products_count} ta mahsulot"
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(products_count=Count("products"))
 
 
 @admin.register(Product)
@@ -81,13 +115,12 @@ class ProductAdmin(ModelAdmin):  # Unfold ModelAdmin
 
     # --- DASHBOARD METRICS ---
     def get_list_display_metrics(self, request):
-        from django.db.models import Avg, Max
-        stats = Product.objects.aggregate(avg_price=Avg('price'), max_price=Max('price'))
+        stats = get_metric("product_stats")
 
         return [
             {
                 "title": "Jami mahsulotlar",
-                "value": Product.objects.count(),
+                "value": stats['total'],
                 "icon": "inventory",
                 "color": "primary",
             },
@@ -102,3 +135,66 @@ class ProductAdmin(ModelAdmin):  # Unfold ModelAdmin
     # Queryset optimizatsiyasi
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('category')
+
+    @action(description="Narxlar ro'yxatini import qilish", url_path="import-prices", permissions=["change"],
+            icon="price_change")
+    def import_prices(self, request):
+        changelist = reverse("admin:product_product_changelist")
+        if "apply" in request.POST:
+            targets = request.session.pop(PRICE_IMPORT_SESSION_KEY, None)
+            if targets is None:
+                self.message_user(request, "Avval faylni yuklang", level=messages.WARNING)
+            else:
+                self.message_user(request, f"{apply_prices(targets)} ta mahsulot yangilandi")
+            return redirect(changelist)
+
+        form = PriceListForm(request.POST or None, request.FILES or None)
+        context = {
+            **self.admin_site.each_context(request),
+            "title": "Narxlar ro'yxatini import qilish",
+            "opts": self.model._meta,
+            "form": form,
+        }
+        if request.method == "POST" and form.is_valid():
+            upload = form.cleaned_data["file"]
+            try:
+                diff = diff_prices(upload, upload.name)
+            except ValueError as e:
+                form.add_error("file", str(e))
+            else:
+                request.session[PRICE_IMPORT_SESSION_KEY] = diff.targets()
+                headers = ["ID", "Mahsulot", "Eski narx", "Yangi narx", "Farq", "Mavjud"]
+                context.update({
+                    "diff": diff,
+                    "sections": [
+                        (title, {"headers": headers, "rows": change_rows(changes)})
+                        for title, changes in (("Narxi oshgan", diff.increases), ("Narxi tushgan", diff.decreases),
+                                               ("Mavjudligi o'zgargan", diff.availability))
+                        if changes
+                    ],
+                    "unknown": {"headers": ["Qator", "ID yoki nom"], "rows": diff.unknown},
+                    "errors": {"headers": ["Qator", "Xato"], "rows": diff.errors},
+                })
+        return TemplateResponse(request, "admin/product/product/import_prices.html", context)
+
+    actions_list = ["import_prices"]
+
+    # Qidiruv (va OrderItemInline autocomplete) indekslangan qidiruv orqali
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+
+        ranked, _ = search_products(search_term, available_only=False, limit=None)
+        ids = [pid for pid, _ in ranked]
+        condition = Q(pk__in=ids)
+        order = [When(pk=pk, then=pos + 1) for pos, pk in enumerate(ids[:SEARCH_ORDER_LIMIT])]
+        if search_term.isdecimal():
+            # Mahsulot ID si bo'yicha ham topiladi (narxlar ro'yxatidagi kod)
+            condition |= Q(pk=int(search_term))
+            order.insert(0, When(pk=int(search_term), then=0))
+        queryset = queryset.filter(condition)
+        if order:
+            # Natijalar moslik darajasi bo'yicha tartiblanadi
+            queryset = queryset.order_by(Case(*order, default=Value(len(order) + 1)), "name")
+        return queryset, False
@@ -0,0 +1,174 @@
+import time
+
+from django.core.cache import cache
+from django.dispatch import Signal
+
+from client.models import Banner
+from le_vanille.metrics import cache_result
+from product.images import srcset_map
+from product.models import Product, Category
+
+VERSION_KEY = "catalog:version"
+SNAPSHOT_KEY = "catalog:snapshot"
+
+# Versiya oshgandan keyin yuboriladi (sahifa keshi va boshqalar uchun)
+catalog_invalidated = Signal()
+
+# Jarayon ichidagi nusxa: barqaror holatda har so'rovda faqat versiya o'qiladi
+_local = {"version": None, "snapshot": None, "by_host": {}}
+
+
+def current_version():
+    """Katalogning joriy versiyasi (monoton o'suvchi son)"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Cache tozalansa ham versiya orqaga qaytmasligi uchun vaqtdan boshlaymiz
+        cache.add(VERSION_KEY, int(time.time() * 1000), timeout=None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    """Versiyani bittaga oshiradi"""
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        current_version()
+        return cache.incr(VERSION_KEY)
+
+
+def product_row(p):
+    """Bitta mahsulotning WebApp uchun ko'rinishi (rasm yo'li nisbiy)"""
+    return {
+        'id': p.id,
+        'name': p.name,
+        'price': float(p.price),
+        'cat': p.category.name.lower() if p.category else "boshqa",
+        'category_id': p.category_id,
+        'img': p.image.url if p.image else "/static/img/no-image.png",
+        'images': srcset_map(p.image_variants, p.image.storage),
+    }
+
+
+def banner_row(b):
+    images = srcset_map(b.image_variants, b.image.storage)
+    return {
+        'id': b.id,
+        'title': b.title,
+        'image': b.image.url,
+        'images': images,
+        # Shablondagi <picture> uchun tayyor srcset qatorlari
+        'srcset': {
+            fmt: ", ".join(f"{url} {width}w" for width, url in urls.items())
+            for fmt, urls in images.items()
+        },
+    }
+
+
+def absolute_row(row, base_url):
+    """Mahsulot qatoridagi rasm yo'llarini to'liq URL ga aylantirish"""
+    return {
+        **row,
+        'img': f"{base_url}{row['img']}",
+        'images': {
+            fmt: {width: f"{base_url}{url}" for width, url in urls.items()}
+            for fmt, urls in row['images'].items()
+        },
+    }
+
+
+def build_snapshot(version, previous=None):
+    """Mahsulot, kategoriya va bannerlardan yangi snapshot yig'adi.
+
+    Oldingi snapshot bilan solishtirib, har bir mahsulot qaysi versiyada
+    o'zgarganini (``changed``) va o'chirilganlarini (``removed``) saqlaydi.
+    """
+    products = [
+        product_row(p)
+        for p in Product.objects.filter(is_available=True).select_related('category').order_by('id')
+    ]
+    categories = list(Category.objects.values('id', 'name'))
+    banners = [banner_row(b) for b in Banner.objects.filter(is_active=True)]
+
+    old_rows = {row['id']: row for row in previous['products']} if previous else {}
+    old_changed = previous['changed'] if previous else {}
+    removed = dict(previous['removed']) if previous else {}
+
+    changed = {}
+    for row in products:
+        pid = row['id']
+        same = old_rows.get(pid) == row
+        changed[pid] = old_changed.get(pid, version) if same else version
+        removed.pop(pid, None)
+
+    for pid in old_rows.keys() - changed.keys():
+        removed[pid] = version
+
+    # Delta javobida kategoriya va bannerlar yo'q: ular o'zgargan versiyadan oldingilarga to'liq katalog
+    same_layout = previous and previous['categories'] == categories and previous['banners'] == banners
+    layout_version = previous.get('layout_version', version) if same_layout else version
+
+    return {
+        'version': version,
+        # Shu versiyadan oldingi delta so'rovlariga to'liq katalog qaytariladi
+        'base_version': previous['base_version'] if previous else version,
+        'products': products,
+        'categories': categories,
+        'banners': banners,
+        'changed': changed,
+        'removed': removed,
+        'layout_version': layout_version,
+    }
+
+
+def get_catalog():
+    """Joriy versiyaga mos snapshot; kerak bo'lsagina qayta yig'iladi"""
+    version = current_version()
+    if _local['version'] == version:
+        cache_result('catalog', True)
+        return _local['snapshot']
+    cache_result('catalog', False)
+
+    snapshot = cache.get(SNAPSHOT_KEY)
+    if snapshot is None or snapshot['version'] != version:
+        snapshot = build_snapshot(version, previous=snapshot)
+        cache.set(SNAPSHOT_KEY, snapshot, timeout=None)
+
+    _local.update(version=version, snapshot=snapshot, by_host={})
+    return snapshot
+
+
+def products_for_host(base_url):
+    """Rasm yo'llari to'liq URL ga aylantirilgan mahsulotlar ro'yxati"""
+    snapshot = get_catalog()
+    key = (snapshot['version'], base_url)
+    rows = _local['by_host'].get(key)
+    if rows is None:
+        rows = [absolute_row(p, base_url) for p in snapshot['products']]
+        _local['by_host'][key] = rows
+    return rows
+
+
+def catalog_delta(since, base_url):
+    """``since`` versiyasidan keyin qo'shilgan/o'zgargan va o'chirilgan mahsulotlar.
+
+    Versiya juda eski yoki noto'g'ri bo'lsa, yoki shundan keyin kategoriya/bannerlar
+    o'zgargan bo'lsa ``None`` qaytadi (to'liq katalog kerak).
+    """
+    snapshot = get_catalog()
+    if since < snapshot['base_version'] or since > snapshot['version']:
+        return None
+    if since < snapshot.get('layout_version', snapshot['version']):
+        return None
+
+    changed = snapshot['changed']
+    products = [p for p in products_for_host(base_url) if changed[p['id']] > since]
+    removed = [pid for pid, version in snapshot['removed'].items() if version > since]
+    return {'products': products, 'removed': removed}
+
+
+def invalidate_catalog():
+    """Katalog o'zgardi: versiyani oshiramiz, snapshot keyingi so'rovda yangilanadi"""
+    version = bump_version()
+    catalog_invalidated.send(sender=None, version=version)
+    return version
@@ -0,0 +1,128 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+from django.core.files.base import ContentFile
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# Model bo'yicha hosilaviy rasm kengliklari (px)
+VARIANT_WIDTHS = {
+    "product.product": (160, 320, 640),
+    "client.banner": (480, 960, 1440),
+}
+FORMATS = {
+    "webp": {"format": "WEBP", "quality": 80, "method": 4},
+    "jpeg": {"format": "JPEG", "quality": 82, "optimize": True, "progressive": True},
+}
+
+# Admin so'rovini kutdirmaslik uchun rasmlar alohida oqimda tayyorlanadi
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="image-variants")
+
+
+def _open_image(field_file):
+    with field_file.open("rb") as f:
+        image = Image.open(f)
+        # Telefon rasmlari EXIF bo'yicha buriladi, keyin EXIF tashlab yuboriladi
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    return image
+
+
+def _encode(image, width, fmt):
+    height = max(1, round(image.height * width / image.width))
+    resized = image.resize((width, height), Image.LANCZOS)
+
+    if fmt == "jpeg" or resized.mode not in ("RGB", "RGBA"):
+        if resized.mode in ("RGBA", "LA", "P"):
+            resized = resized.convert("RGBA")
+            background = Image.new("RGB", resized.size, (255, 255, 255))
+            background.paste(resized, mask=resized.getchannel("A"))
+            resized = background
+        else:
+            resized = resized.convert("RGB")
+
+    buffer = io.BytesIO()
+    # exif/icc berilmaydi — hosilaviy faylda metadata qolmaydi
+    resized.save(buffer, **FORMATS[fmt])
+    return buffer.getvalue()
+
+
+def delete_variants(storage, variants):
+    """Eski hosilaviy fayllarni o'chirish"""
+    for fmt in FORMATS:
+        for name in (variants or {}).get(fmt, {}).values():
+            if storage.exists(name):
+                storage.delete(name)
+
+
+def build_variants(field_file, widths):
+    """Asl rasm yonida bir nechta kenglikdagi WebP va JPEG nusxalarni yaratadi"""
+    storage = field_file.storage
+    image = _open_image(field_file)
+    base, _ = os.path.splitext(field_file.name)
+
+    # Asl rasmdan katta nusxa yaratilmaydi (kamida bittasi bo'ladi)
+    targets = [w for w in widths if w < image.width] or [min(image.width, widths[0])]
+
+    variants = {"source": field_file.name, "width": image.width}
+    for fmt in FORMATS:
+        variants[fmt] = {}
+        for width in targets:
+            name = f"{base}_{width}w.{fmt if fmt != 'jpeg' else 'jpg'}"
+            if storage.exists(name):
+                storage.delete(name)
+            variants[fmt][str(width)] = storage.save(name, ContentFile(_encode(image, width, fmt)))
+    return variants
+
+
+def needs_variants(instance):
+    image = instance.image
+    return bool(image) and (instance.image_variants or {}).get("source") != image.name
+
+
+def refresh_variants(model, pk, force=False):
+    """Bitta obyekt uchun hosilaviy rasmlarni yangilab, katalogni eskirgan deb belgilaydi"""
+    from product.catalog import invalidate_catalog
+
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None or not (force or needs_variants(instance)):
+        return False
+
+    old = instance.image_variants or {}
+    variants = build_variants(instance.image, VARIANT_WIDTHS[model._meta.label_lower]) if instance.image else {}
+    delete_variants(instance.image.storage, {
+        fmt: {w: n for w, n in old.get(fmt, {}).items() if n not in variants.get(fmt, {}).values()}
+        for fmt in FORMATS
+    })
+
+    # update() signal chaqirmaydi, shuning uchun qayta ishga tushish bo'lmaydi
+    model.objects.filter(pk=pk).update(image_variants=variants)
+    invalidate_catalog()
+    return True
+
+
+def _run(model, pk):
+    try:
+        refresh_variants(model, pk)
+    except Exception:
+        logger.exception("Rasm nusxalarini yaratishda xato: %s #%s", model._meta.label, pk)
+    finally:
+        connections.close_all()
+
+
+def schedule_variants(model, pk):
+    """Hosilaviy rasmlarni fonda yaratish uchun navbatga qo'yish"""
+    _executor.submit(_run, model, pk)
+
+
+def srcset_map(variants, storage):
+    """Katalog uchun {format: {kenglik: url}} ko'rinishi"""
+    return {
+        fmt: {width: storage.url(name) for width, name in variants[fmt].items()}
+        for fmt in FORMATS
+        if variants and variants.get(fmt)
+    }
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from client.models import Banner
+from product.images import refresh_variants
+from product.models import Product
+
+
+class Command(BaseCommand):
+    help = "Mavjud Product va Banner rasmlari uchun WebP/JPEG nusxalarni yaratish"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Nusxalari borlarini ham qayta yaratish")
+
+    def handle(self, *args, **options):
+        for model in (Product, Banner):
+            done = failed = 0
+            for pk in model.objects.exclude(image="").values_list("pk", flat=True).iterator():
+                try:
+                    if refresh_variants(model, pk, force=options["force"]):
+                        done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(f"{model._meta.label} #{pk}: {e}")
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{model._meta.verbose_name_plural}: {done} ta yangilandi, {failed} ta xato"
+            ))
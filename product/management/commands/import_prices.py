@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from product.pricelist import apply_prices, diff_prices
+
+
+class Command(BaseCommand):
+    help = (
+        "Narxlar ro'yxatini (XLSX/CSV) mahsulotlar bilan solishtirish; --apply bilan o'zgarishlarni yozish.\n"
+        "Ustunlar: id (yoki nomi), narxi, mavjud (ixtiyoriy)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("file")
+        parser.add_argument("--apply", action="store_true", help="O'zgargan narxlarni saqlash")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["file"], "rb") as file:
+                diff = diff_prices(file, options["file"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for title, changes in (("Oshgan", diff.increases), ("Kamaygan", diff.decreases),
+                               ("Mavjudligi o'zgargan", diff.availability)):
+            if changes:
+                self.stdout.write(f"{title}: {len(changes)}")
+            for change in changes:
+                available = "" if change.available == change.old_available else f" (mavjud: {change.available})"
+                self.stdout.write(f"  #{change.product_id} {change.name}: {change.old_price} -> {change.price}{available}")
+        for number, value in diff.unknown:
+            self.stderr.write(f"{number}-qator: mahsulot topilmadi ({value})")
+        for number, message in diff.errors:
+            self.stderr.write(f"{number}-qator: {message}")
+
+        summary = (f"O'zgarish: {len(diff.changes)}, o'zgarmagan: {diff.unchanged}, "
+                   f"topilmagan: {len(diff.unknown)}, xato: {len(diff.errors)}")
+        if options["apply"]:
+            summary += f". Saqlandi: {apply_prices(diff.targets())}"
+        self.stdout.write(self.style.SUCCESS(summary))
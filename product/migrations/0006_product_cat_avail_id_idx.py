@@ -0,0 +1,17 @@
+# Generated by Django 5.2 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0005_alter_category_options_alter_product_options'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', 'is_available', 'id'], name='product_cat_avail_id_idx'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2 on 2026-10-18 07:59
+
+import re
+
+from django.db import migrations, models, transaction
+
+# product.search dagi normalize/product_search_text ning shu migratsiya vaqtidagi nusxasi:
+# keyinchalik qidiruv qoidalari o'zgarsa ham migratsiya natijasi o'zgarmaydi
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "j",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "x", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "", "ы": "i", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya", "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",
+}
+_TRANSLIT = str.maketrans(CYRILLIC_TO_LATIN)
+_APOSTROPHES = re.compile(r"['`ʻʼ‘’]")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+
+def normalize(text):
+    text = (text or "").lower().translate(_TRANSLIT)
+    text = _APOSTROPHES.sub("", text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def product_search_text(name, category_name="", description=""):
+    return " ".join(filter(None, (normalize(name), normalize(category_name), normalize(description))))
+
+
+def fill_search_text(apps, schema_editor):
+    Product = apps.get_model('product', 'Product')
+    products = list(Product.objects.select_related('category'))
+    for p in products:
+        p.search_text = product_search_text(p.name, p.category.name, p.description)
+    Product.objects.bulk_update(products, ['search_text'], batch_size=500)
+
+
+def create_trigram_index(apps, schema_editor):
+    # Faqat PostgreSQL: pg_trgm bo'lmasa xotiradagi indeks ishlatiladi
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    except Exception:
+        return
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_search_text_trgm '
+        'ON product_product USING gin (search_text gin_trgm_ops)'
+    )
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS product_search_text_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('product', '0007_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(fill_search_text, migrations.RunPython.noop),
+        migrations.RunPython(create_trigram_index, drop_trigram_index),
+    ]
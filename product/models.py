@@ -8,6 +8,13 @@ class Category(models.Model):
     #     verbose_name = "Kategoriya"
     #     verbose_name_plural = "Kategoriyalar"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Bazadagi nom: o'zgarmagan bo'lsa mahsulotlarning qidiruv matni qayta yozilmaydi
+        instance._saved_name = instance.__dict__.get('name')
+        return instance
+
     def __str__(self):
         return self.name
 
@@ -21,8 +28,12 @@ class Product(models.Model):
     )
     name = models.CharField(max_length=200, verbose_name="Nomi")
     image = models.ImageField(upload_to="products/", verbose_name="Rasm")
+    # Kichraytirilgan WebP/JPEG nusxalar: {"source": ..., "webp": {"320": "products/..."}, ...}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     price = models.DecimalField(max_digits=10, decimal_places=0, verbose_name="Narxi")
     description = models.TextField(null=True, blank=True, verbose_name="Tavsifi")
+    # Qidiruv uchun normallashtirilgan matn (nom + kategoriya + tavsif, lotin yozuvida)
+    search_text = models.TextField(default="", blank=True, editable=False)
 
     # Standart BooleanField - Admin panelda galochka bo'lib chiqadi
     is_available = models.BooleanField(
@@ -30,9 +41,13 @@ class Product(models.Model):
         verbose_name="Mavjudmi?"
     )
 
-    # class Meta:
-    #     verbose_name = "Mahsulot"
-    #     verbose_name_plural = "Mahsulotlar"
+    class Meta:
+        # verbose_name = "Mahsulot"
+        # verbose_name_plural = "Mahsulotlar"
+        indexes = [
+            # Kategoriya bo'yicha keyset (cursor) sahifalash uchun
+            models.Index(fields=["category", "is_available", "id"], name="product_cat_avail_id_idx"),
+        ]
 
     def __str__(self):
-        return self.name
\ No newline at end of file
+        return self.name
@@ -0,0 +1,78 @@
+import os
+import re
+import tempfile
+import zlib
+
+from django.dispatch import receiver
+from django.template.loader import render_to_string
+
+from config.env_config import PAGE_CACHE, PAGE_CACHE_DIR
+from le_vanille.metrics import cache_result
+from product.catalog import get_catalog, catalog_invalidated
+
+# {(versiya, host kaliti): (etag, html)} — faqat joriy versiya saqlanadi
+_pages = {}
+# Host sarlavhasi mijozdan keladi: xotirada ko'pi bilan shuncha host sahifasi turadi
+MAX_PAGES = 32
+_HOST_JUNK = re.compile(r'[^a-z0-9.-]+')
+
+
+def host_key(host):
+    """Disk papkasi va kesh kaliti uchun xavfsiz nom: ``example.uz_8000-1a2b3c4d``"""
+    host = host.lower()
+    slug = _HOST_JUNK.sub('_', host)[:64]
+    return f'{slug}-{zlib.crc32(host.encode()):08x}'
+
+
+def render_shell():
+    """index.html ni foydalanuvchiga bog'liq ma'lumotsiz (cookie, CSRF) render qilish"""
+    catalog = get_catalog()
+    context = {
+        'categories': catalog['categories'],
+        'banners': catalog['banners'],
+    }
+    return render_to_string('index.html', context)
+
+
+def _write_disk(key, html):
+    folder = os.path.join(PAGE_CACHE_DIR, key)
+    os.makedirs(folder, exist_ok=True)
+    # Yarim yozilgan fayl berilmasligi uchun vaqtinchalik fayl + rename
+    fd, tmp_path = tempfile.mkstemp(dir=folder, suffix='.tmp')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(html)
+    os.replace(tmp_path, os.path.join(folder, 'index.html'))
+
+
+def get_shell(host):
+    """``(etag, html_bytes)`` — katalog versiyasi va host bo'yicha keshlangan"""
+    version = get_catalog()['version']
+    name = host_key(host)
+    key = (version, name)
+    page = _pages.get(key)
+    cache_result('page', page is not None)
+    if page is None:
+        html = render_shell().encode()
+        page = (f'"shell-{version}-{zlib.crc32(html):08x}"', html)
+        if PAGE_CACHE:
+            for old in [k for k in _pages if k[0] != version]:
+                _pages.pop(old, None)
+            if len(_pages) >= MAX_PAGES:
+                # Eng eski qo'shilgani chiqariladi
+                _pages.pop(next(iter(_pages)), None)
+            _pages[key] = page
+            if PAGE_CACHE_DIR:
+                _write_disk(name, html)
+    return page
+
+
+@receiver(catalog_invalidated)
+def purge_pages(sender, **kwargs):
+    """Katalog o'zgarganda xotira va diskdagi eski sahifalarni o'chirish"""
+    _pages.clear()
+    if not PAGE_CACHE_DIR or not os.path.isdir(PAGE_CACHE_DIR):
+        return
+    for host in os.listdir(PAGE_CACHE_DIR):
+        path = os.path.join(PAGE_CACHE_DIR, host, 'index.html')
+        if os.path.exists(path):
+            os.remove(path)
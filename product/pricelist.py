@@ -0,0 +1,206 @@
+"""Yetkazib beruvchi narxlar ro'yxatini (XLSX/CSV) mahsulotlarga qo'llash.
+
+Qatorlar mahsulotga ID (kod) yoki nom bo'yicha bog'lanadi va joriy narx/mavjudlik bilan
+solishtiriladi. Ko'rib chiqish (``diff_prices``) bazaga yozmaydi; ``apply_prices`` faqat
+o'zgargan mahsulotlarni bitta ``bulk_update`` bilan yozadi va katalogni bir marta yangilaydi.
+"""
+import re
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+
+from client.imports import table_rows
+from le_vanille.admin_metrics import invalidate
+from .catalog import invalidate_catalog
+from .models import Product
+from .search import normalize
+
+# Sarlavha (kichik harflarda) -> ustun
+HEADERS = {
+    "id": "code", "code": "code", "kod": "code", "kodi": "code",
+    "name": "name", "nomi": "name", "mahsulot": "name",
+    "price": "price", "narx": "price", "narxi": "price",
+    "is_available": "available", "available": "available", "mavjud": "available", "mavjudmi?": "available",
+}
+YES = {"1", "ha", "yes", "true", "+", "bor", "mavjud"}
+NO = {"0", "yo'q", "yoq", "yo‘q", "no", "false", "-", "tugagan"}
+_PRICE_JUNK = re.compile(r"[^\d.,-]")
+# Uch xonali guruhlar: "12.000", "12,000", "1.200.000" — minglik ajratgich
+_GROUPED = re.compile(r"^-?\d{1,3}(?:([.,])\d{3})(?:\1\d{3})*$")
+
+
+class PriceChange:
+    __slots__ = ("product_id", "name", "old_price", "price", "old_available", "available")
+
+    def __init__(self, product_id, name, old_price, price, old_available, available):
+        self.product_id = product_id
+        self.name = name
+        self.old_price = old_price
+        self.price = price
+        self.old_available = old_available
+        self.available = available
+
+    @property
+    def delta(self):
+        return self.price - self.old_price
+
+
+class PriceDiff:
+    def __init__(self):
+        self.increases = []
+        self.decreases = []
+        # Faqat mavjudligi o'zgarganlar
+        self.availability = []
+        self.unchanged = 0
+        # [(qator raqami, qiymat), ...]
+        self.unknown = []
+        self.errors = []
+
+    @property
+    def changes(self):
+        return self.increases + self.decreases + self.availability
+
+    def targets(self):
+        """Sessiyada saqlash uchun: ``{id: [narx, mavjudlik]}``"""
+        return {str(c.product_id): [str(c.price), c.available] for c in self.changes}
+
+
+def parse_price(value):
+    if isinstance(value, (int, float, Decimal)):
+        price = Decimal(str(value))
+        if not price.is_finite():
+            raise ValueError(f"narx noto'g'ri: {value}")
+    else:
+        # "12 000", "12 000 so'm", "12,000", "12.000", "1.200.000", "12 000,50"
+        text = _PRICE_JUNK.sub("", str(value or ""))
+        separators = [char for char in text if char in ".,"]
+        if len(set(separators)) > 1:
+            # Ikkala belgi bor: oxirgisi kasr ajratgichi, butun qism guruhlangan bo'lishi shart
+            whole, _, fraction = text.rpartition(separators[-1])
+            if not _GROUPED.match(whole) or separators[-1] in whole:
+                raise ValueError(f"narx noto'g'ri: {value}")
+            text = f"{whole.replace(separators[0], '')}.{fraction}"
+        elif _GROUPED.match(text):
+            text = text.replace(separators[0], "")
+        elif len(separators) == 1:
+            text = text.replace(",", ".")
+        elif separators:
+            # "12.34.5" — minglik ham, kasr ham emas
+            raise ValueError(f"narx noto'g'ri: {value}")
+        try:
+            price = Decimal(text)
+        except InvalidOperation:
+            raise ValueError(f"narx noto'g'ri: {value}")
+    if price < 0:
+        raise ValueError(f"narx manfiy: {value}")
+    return price.quantize(Decimal(1))
+
+
+def parse_available(value):
+    """None — ustun bo'sh, mavjudlik o'zgarmaydi"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().casefold()
+    if text in YES:
+        return True
+    if text in NO:
+        return False
+    raise ValueError(f"mavjudlik noto'g'ri: {value}")
+
+
+def read_price_rows(file, filename):
+    """``(qator raqami, {ustun: qiymat})``"""
+    rows = table_rows(file, filename)
+    columns = {}
+    for position, title in enumerate(next(rows, None) or ()):
+        column = HEADERS.get(str(title or "").strip().casefold())
+        if column:
+            columns.setdefault(column, position)
+    if "price" not in columns or not columns.keys() & {"code", "name"}:
+        raise ValueError("Narx va mahsulot ID yoki nomi ustunlari kerak")
+
+    for number, row in enumerate(rows, 2):
+        if not any(value not in (None, "") for value in row):
+            continue
+        yield number, {column: row[position] if position < len(row) else None for column, position in columns.items()}
+
+
+def product_lookup():
+    """Bitta so'rov: ``({id: qator}, {normallashtirilgan nom: id yoki None})``"""
+    by_id, by_name = {}, {}
+    for row in Product.objects.values_list("id", "name", "price", "is_available"):
+        by_id[row[0]] = row
+        key = normalize(row[1])
+        # Bir xil nomli mahsulotlar nom bo'yicha bog'lanmaydi
+        by_name[key] = None if key in by_name else row[0]
+    return by_id, by_name
+
+
+def match(row, by_id, by_name):
+    """Avval ID bo'yicha, topilmasa nom bo'yicha"""
+    code = row.get("code")
+    if code not in (None, ""):
+        try:
+            product = by_id.get(int(float(code)))
+        except (TypeError, ValueError, OverflowError):
+            # "abc", "inf", "1e400" — ID emas, nom bo'yicha qidiriladi
+            product = None
+        if product is not None:
+            return product
+    product_id = by_name.get(normalize(str(row.get("name") or "")))
+    return by_id.get(product_id) if product_id else None
+
+
+def diff_prices(file, filename):
+    diff = PriceDiff()
+    by_id, by_name = product_lookup()
+    seen = set()
+    for number, row in read_price_rows(file, filename):
+        product = match(row, by_id, by_name)
+        if product is None:
+            diff.unknown.append((number, row.get("code") or row.get("name")))
+            continue
+        product_id, name, old_price, old_available = product
+        try:
+            price = parse_price(row.get("price"))
+            available = parse_available(row.get("available"))
+        except ValueError as e:
+            diff.errors.append((number, str(e)))
+            continue
+        if product_id in seen:
+            diff.errors.append((number, f"{name}: ro'yxatda takrorlangan"))
+            continue
+        seen.add(product_id)
+
+        if available is None:
+            available = old_available
+        change = PriceChange(product_id, name, old_price, price, old_available, available)
+        if price > old_price:
+            diff.increases.append(change)
+        elif price < old_price:
+            diff.decreases.append(change)
+        elif available != old_available:
+            diff.availability.append(change)
+        else:
+            diff.unchanged += 1
+    return diff
+
+
+def apply_prices(targets):
+    """``{id: (narx, mavjudlik)}`` dan faqat hozir ham farq qiladiganlarini yozadi; yozilganlar soni"""
+    targets = {int(pk): (Decimal(price), available) for pk, (price, available) in targets.items()}
+    with transaction.atomic():
+        current = Product.objects.select_for_update().filter(pk__in=targets).values_list("id", "price", "is_available")
+        changed = [
+            Product(id=pk, price=targets[pk][0], is_available=targets[pk][1])
+            for pk, price, available in current
+            if (price, available) != targets[pk]
+        ]
+        if changed:
+            # bulk_update signal chaqirmaydi: katalog va admin ko'rsatkichlari bir marta yangilanadi
+            Product.objects.bulk_update(changed, ["price", "is_available"], batch_size=500)
+            transaction.on_commit(invalidate_catalog)
+            invalidate(Product)
+    return len(changed)
@@ -0,0 +1,63 @@
+import threading
+from array import array
+from bisect import bisect_left
+
+from le_vanille.metrics import cache_result
+from product.catalog import current_version
+from product.models import Product
+
+
+class PriceTable:
+    """(product_id, narx, mavjudligi, nomi, kategoriya) ning ixcham jadvali.
+
+    Qatorlar ID bo'yicha tartiblangan: mahsulot ``ids`` dan ikkilik qidiruv bilan
+    O(log n) da topiladi, xotira esa faqat mahsulotlar soniga bog'liq (eng katta ID ga emas).
+    """
+
+    def __init__(self, version, rows):
+        self.version = version
+        rows = sorted(rows)
+        self.ids = array("q")
+        self.prices = array("q")
+        self.available = bytearray()
+        self.names = []
+        self.categories = array("q")
+        for pid, price, is_available, name, category_id in rows:
+            self.ids.append(pid)
+            # Product.price butun so'mda saqlanadi (decimal_places=0)
+            self.prices.append(int(price))
+            self.available.append(1 if is_available else 0)
+            self.names.append(name)
+            self.categories.append(category_id)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def get(self, product_id):
+        """``(narx, mavjudmi, nomi, kategoriya_id)`` yoki None"""
+        position = bisect_left(self.ids, product_id)
+        if position == len(self.ids) or self.ids[position] != product_id:
+            return None
+        return (self.prices[position], bool(self.available[position]), self.names[position],
+                self.categories[position])
+
+
+_table = None
+_lock = threading.Lock()
+
+
+def price_table():
+    """Katalog versiyasiga mos jadval; mahsulot saqlanganda versiya oshadi va jadval qayta quriladi"""
+    global _table
+    version = current_version()
+    table = _table
+    hit = table is not None and table.version == version
+    cache_result("prices", hit)
+    if not hit:
+        with _lock:
+            if _table is None or _table.version != version:
+                _table = PriceTable(version, Product.objects.values_list(
+                    "id", "price", "is_available", "name", "category_id",
+                ))
+            table = _table
+    return table
@@ -0,0 +1,194 @@
+"""Mahsulot qidiruvi: lotin/kirill yozuvidan qat'i nazar, xatoliklarga chidamli.
+
+PostgreSQL da ``pg_trgm`` (0008 migratsiyasidagi GIN indeksi) ishlatiladi; buning uchun
+settings.INSTALLED_APPS ga qo'shing::
+
+    "django.contrib.postgres",
+
+Aks holda katalog versiyasiga bog'langan xotiradagi trigramma indeksidan qidiriladi.
+"""
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+# O'zbek (va rus) kirill harflarini lotinga o'girish jadvali
+CYRILLIC_TO_LATIN = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "yo", "ж": "j",
+    "з": "z", "и": "i", "й": "y", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "x", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "", "ы": "i", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya", "ў": "o", "қ": "q", "ғ": "g", "ҳ": "h",
+}
+_TRANSLIT = str.maketrans(CYRILLIC_TO_LATIN)
+# o‘, g‘ dagi turli apostroflar olib tashlanadi: "qo'y" == "qoy" == "қўй"
+_APOSTROPHES = re.compile(r"['`ʻʼ‘’]")
+_NON_WORD = re.compile(r"[^a-z0-9]+")
+
+MIN_SCORE = 0.6
+PG_MIN_SIMILARITY = 0.3
+
+
+def normalize(text):
+    """Qidiruv uchun matnni bir xil ko'rinishga keltirish (kichik harf, lotin)"""
+    text = (text or "").lower().translate(_TRANSLIT)
+    text = _APOSTROPHES.sub("", text)
+    return _NON_WORD.sub(" ", text).strip()
+
+
+def product_search_text(name, category_name="", description=""):
+    """Product.search_text ustuni uchun qiymat"""
+    return " ".join(filter(None, (normalize(name), normalize(category_name), normalize(description))))
+
+
+def trigrams(text):
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def use_pg_trgm():
+    """PostgreSQL, pg_trgm kengaytmasi va django.contrib.postgres (lookup'lar uchun) bor bo'lsa True"""
+    if connection.vendor != "postgresql" or not apps.is_installed("django.contrib.postgres"):
+        return False
+    if not hasattr(connection, "_pg_trgm_available"):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+            connection._pg_trgm_available = cursor.fetchone() is not None
+    return connection._pg_trgm_available
+
+
+def set_similarity_threshold(sender, connection, **kwargs):
+    """``%>`` operatori ``pg_trgm.word_similarity_threshold`` (standart 0.6) bo'yicha ishlaydi"""
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)", [str(PG_MIN_SIMILARITY)],
+            )
+
+
+connection_created.connect(set_similarity_threshold, dispatch_uid="search_similarity_threshold")
+
+
+class NgramIndex:
+    """Xotiradagi trigram indeksi (pg_trgm bo'lmaganda ishlatiladi)"""
+
+    def __init__(self, rows):
+        self.docs = {}
+        self.postings = defaultdict(set)
+        for row in rows:
+            pid = row["id"]
+            self.docs[pid] = row
+            for gram in trigrams(row["search_text"]):
+                self.postings[gram].add(pid)
+
+    def search(self, query, available_only=True):
+        query_grams = trigrams(query)
+        if not query_grams:
+            return []
+
+        hits = defaultdict(int)
+        for gram in query_grams:
+            for pid in self.postings.get(gram, ()):
+                hits[pid] += 1
+
+        words = query.split()
+        ranked = []
+        for pid, count in hits.items():
+            doc = self.docs[pid]
+            if available_only and not doc["is_available"]:
+                continue
+            score = count / len(query_grams)
+            # Nomi so'rov so'zlari bilan boshlansa yuqoriroq turadi
+            name_words = doc["name_norm"].split()
+            if all(any(n.startswith(w) for n in name_words) for w in words):
+                score += 0.5
+            if score >= MIN_SCORE:
+                ranked.append((score, pid))
+
+        ranked.sort(key=lambda item: (-item[0], self.docs[item[1]]["name_norm"]))
+        return [(pid, score) for score, pid in ranked]
+
+
+_index = {"version": None, "index": None}
+
+
+def memory_index():
+    """Katalog versiyasiga bog'langan indeks (versiya o'zgarsa qayta quriladi)"""
+    from product.catalog import current_version
+    from product.models import Product
+
+    version = current_version()
+    if _index["version"] != version:
+        rows = list(Product.objects.values(
+            "id", "name", "search_text", "category_id", "category__name", "is_available",
+        ))
+        for row in rows:
+            row["name_norm"] = normalize(row["name"])
+        _index.update(version=version, index=NgramIndex(rows))
+    return _index["index"]
+
+
+def search_products(query, category_id=None, available_only=True, limit=20):
+    """Mahsulot qidiruvi.
+
+    ``(natijalar, kategoriya_soni)`` qaytaradi: natijalar — ``[(id, ball), ...]``,
+    kategoriya_soni — ``[{"id", "name", "count"}, ...]`` (kategoriya filtridan oldin).
+    ``limit=None`` — barcha mos natijalar.
+    """
+    query = normalize(query)
+    if not query:
+        return [], []
+
+    if use_pg_trgm():
+        return _search_pg(query, category_id, available_only, limit)
+
+    index = memory_index()
+    ranked = index.search(query, available_only=available_only)
+
+    facets = {}
+    for pid, _ in ranked:
+        doc = index.docs[pid]
+        facet = facets.setdefault(doc["category_id"], {
+            "id": doc["category_id"], "name": doc["category__name"], "count": 0,
+        })
+        facet["count"] += 1
+
+    if category_id:
+        ranked = [item for item in ranked if index.docs[item[0]]["category_id"] == category_id]
+
+    return ranked[:limit], sorted(facets.values(), key=lambda f: -f["count"])
+
+
+def _search_pg(query, category_id, available_only, limit):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+    from django.db.models import Count, Q
+
+    from product.models import Product
+
+    # %> va LIKE 'so'z%' GIN (gin_trgm_ops) indeksidan foydalanadi; funksiya natijasini
+    # solishtirish (rank >= x) esa butun jadvalni o'qiydi, shuning uchun ball faqat tartiblash uchun
+    queryset = Product.objects.filter(
+        Q(search_text__trigram_word_similar=query) | Q(search_text__startswith=query),
+    )
+    if available_only:
+        queryset = queryset.filter(is_available=True)
+
+    facets = [
+        {"id": row["category_id"], "name": row["category__name"], "count": row["count"]}
+        for row in queryset.values("category_id", "category__name").annotate(count=Count("id")).order_by("-count")
+    ]
+
+    if category_id:
+        queryset = queryset.filter(category_id=category_id)
+
+    ranked = (
+        queryset.annotate(rank=TrigramWordSimilarity(query, "search_text"))
+        .order_by("-rank", "name")
+        .values_list("id", "rank")[:limit]
+    )
+    return list(ranked), facets
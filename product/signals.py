@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from client.models import Banner
+from product.catalog import invalidate_catalog
+from product.images import needs_variants, schedule_variants, delete_variants
+from product.models import Product, Category
+from product.search import product_search_text
+
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=Banner)
+def catalog_changed(sender, **kwargs):
+    """Katalog modellari o'zgarganda snapshotni eskirgan deb belgilash"""
+    transaction.on_commit(invalidate_catalog)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Banner)
+def image_saved(sender, instance, **kwargs):
+    """Yangi rasm yuklanganda kichraytirilgan nusxalar fonda yaratiladi"""
+    if needs_variants(instance):
+        transaction.on_commit(lambda: schedule_variants(sender, instance.pk))
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Banner)
+def image_deleted(sender, instance, **kwargs):
+    if instance.image_variants:
+        transaction.on_commit(lambda: delete_variants(instance.image.storage, instance.image_variants))
+
+
+@receiver(pre_save, sender=Product)
+def fill_search_text(sender, instance, **kwargs):
+    """Qidiruv matnini har saqlashda yangilash"""
+    instance.search_text = product_search_text(instance.name, instance.category.name, instance.description)
+
+
+@receiver(post_save, sender=Category)
+def category_renamed(sender, instance, created, update_fields=None, **kwargs):
+    if created or (update_fields is not None and "name" not in update_fields):
+        return
+    if getattr(instance, "_saved_name", None) == instance.name:
+        return
+    products = list(instance.products.all())
+    for p in products:
+        p.search_text = product_search_text(p.name, instance.name, p.description)
+    Product.objects.bulk_update(products, ["search_text"], batch_size=500)
+    instance._saved_name = instance.name
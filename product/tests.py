@@ -1,3 +1,447 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from decimal import Decimal
+from io import BytesIO
 
-# Create your tests here.
+from PIL import Image
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from client.models import Banner
+from product import page_cache, search
+from product.catalog import current_version, get_catalog, invalidate_catalog, products_for_host
+from product.images import build_variants, refresh_variants
+from product.models import Category, Product
+from product.prices import PriceTable
+from product.pricelist import apply_prices, diff_prices, parse_price
+
+
+def make_product(category, name, price=1000, **kwargs):
+    # "source" mos bo'lsa fon oqimida rasm nusxalari yaratilmaydi
+    return Product.objects.create(
+        category=category, name=name, price=price, image="products/t.jpg",
+        image_variants={"source": "products/t.jpg"}, **kwargs,
+    )
+
+
+class CatalogSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Tortlar")
+        cls.product = make_product(cls.category, "Napoleon")
+        cls.banner = Banner.objects.create(image="banners/b.jpg", image_variants={"source": "banners/b.jpg"})
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unchanged_catalog_is_served_without_queries(self):
+        get_catalog()
+        products_for_host("http://testserver")
+
+        with self.assertNumQueries(0):
+            snapshot = get_catalog()
+            rows = products_for_host("http://testserver")
+
+        self.assertEqual([p["name"] for p in snapshot["products"]], ["Napoleon"])
+        self.assertEqual(rows[0]["img"], "http://testserver/media/products/t.jpg")
+
+    def assertBumped(self, change):
+        version = current_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            change()
+        # Tranzaksiya tugamaguncha versiya o'zgarmaydi
+        self.assertEqual(current_version(), version)
+        for callback in callbacks:
+            callback()
+        self.assertGreater(current_version(), version)
+
+    def test_saving_catalog_models_bumps_version_on_commit(self):
+        self.product.price = 2000
+        self.assertBumped(self.product.save)
+        self.category.name = "Tort"
+        self.assertBumped(self.category.save)
+        self.banner.title = "Aksiya"
+        self.assertBumped(self.banner.save)
+
+    def test_deleting_catalog_models_bumps_version_on_commit(self):
+        self.assertBumped(self.banner.delete)
+        self.assertBumped(self.product.delete)
+        self.assertBumped(self.category.delete)
+
+    def test_snapshot_is_rebuilt_after_change(self):
+        get_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            make_product(self.category, "Medovik")
+
+        self.assertEqual([p["name"] for p in get_catalog()["products"]], ["Napoleon", "Medovik"])
+
+
+class CatalogApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Tortlar")
+        cls.napoleon = make_product(cls.category, "Napoleon")
+        cls.medovik = make_product(cls.category, "Medovik")
+
+    def setUp(self):
+        cache.clear()
+
+    def fetch(self, **params):
+        return self.client.get(reverse("catalog_api"), params)
+
+    def change(self, action):
+        with self.captureOnCommitCallbacks(execute=True):
+            action()
+
+    def test_etag_and_not_modified(self):
+        response = self.fetch()
+        data = response.json()
+        self.assertTrue(data["full"])
+        self.assertEqual(len(data["products"]), 2)
+        self.assertEqual(data["categories"], [{"id": self.category.id, "name": "Tortlar"}])
+
+        response = self.client.get(reverse("catalog_api"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_since_returns_changed_and_removed_products(self):
+        since = self.fetch().json()["version"]
+        removed_id = self.medovik.id
+        self.napoleon.price = 2000
+        self.change(self.napoleon.save)
+        self.change(self.medovik.delete)
+
+        data = self.fetch(since=since).json()
+        self.assertFalse(data["full"])
+        self.assertEqual([(p["id"], p["price"]) for p in data["products"]], [(self.napoleon.id, 2000.0)])
+        self.assertEqual(data["removed"], [removed_id])
+
+        # Oxirgi versiyadan keyin hech narsa o'zgarmagan
+        data = self.fetch(since=data["version"]).json()
+        self.assertEqual((data["full"], data["products"], data["removed"]), (False, [], []))
+
+    def test_bad_or_old_since_returns_full_catalog(self):
+        version = self.fetch().json()["version"]
+        # "²" isdigit() dan o'tadi, lekin int() uni qabul qilmaydi
+        for since in ("abc", "1", "²", str(version + 1000)):
+            data = self.fetch(since=since).json()
+            self.assertTrue(data["full"], since)
+            self.assertIn("categories", data)
+
+    def test_category_change_returns_full_catalog(self):
+        since = self.fetch().json()["version"]
+        self.change(lambda: Category.objects.create(name="Pishiriqlar"))
+
+        data = self.fetch(since=since).json()
+        self.assertTrue(data["full"])
+        self.assertEqual(len(data["categories"]), 2)
+
+
+class ProductListApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cakes = Category.objects.create(name="Tortlar")
+        cls.pastry = Category.objects.create(name="Pishiriqlar")
+        for i in range(5):
+            make_product(cls.cakes, f"Tort {i}")
+            make_product(cls.pastry, f"Pishiriq {i}")
+        make_product(cls.cakes, "Tugagan", is_available=False)
+
+    def fetch(self, **params):
+        return self.client.get(reverse("product_list_api"), params)
+
+    def test_next_cursor_walks_all_pages(self):
+        names, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 4}
+            if cursor:
+                params["cursor"] = cursor
+            data = self.fetch(**params).json()
+            names += [p["name"] for p in data["results"]]
+            pages += 1
+            cursor = data["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(names), 10)
+        self.assertNotIn("Tugagan", names)
+
+    def test_category_filter_with_cursor(self):
+        first = self.fetch(category=self.cakes.id, limit=2).json()
+        self.assertEqual([p["name"] for p in first["results"]], ["Tort 0", "Tort 1"])
+
+        second = self.fetch(category=self.cakes.id, limit=10, cursor=first["next_cursor"]).json()
+        self.assertEqual([p["name"] for p in second["results"]], ["Tort 2", "Tort 3", "Tort 4"])
+        self.assertIsNone(second["next_cursor"])
+
+    def test_invalid_parameters(self):
+        for params in ({"limit": "abc"}, {"limit": "-1"}, {"cursor": "1.5"}, {"category": "x"},
+                       {"limit": "²"}, {"cursor": "³"}, {"category": "¹"}):
+            self.assertEqual(self.fetch(**params).status_code, 400, params)
+        self.assertEqual(self.client.get(reverse("product_search_api"), {"q": "tort", "category": "²"}).status_code, 400)
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.category = Category.objects.create(name="Tortlar")
+
+    def upload(self, name, size, orientation=None):
+        buffer = BytesIO()
+        exif = Image.Exif()
+        if orientation:
+            exif[0x0112] = orientation
+        exif[0x010F] = "Telefon"
+        Image.new("RGB", size, (200, 120, 40)).save(buffer, "JPEG", exif=exif)
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def test_variants_are_resized_rotated_and_stripped(self):
+        # EXIF 6: rasm 90° ga burilgan — aslida 400x800
+        product = make_product(self.category, "Napoleon")
+        product.image = self.upload("products/cake.jpg", (800, 400), orientation=6)
+
+        variants = build_variants(product.image, (160, 320, 640))
+
+        self.assertEqual(variants["width"], 400)
+        for fmt in ("webp", "jpeg"):
+            # 640 > 400: kattalashtirilmaydi
+            self.assertEqual(sorted(variants[fmt], key=int), ["160", "320"])
+        with default_storage.open(variants["jpeg"]["320"]) as f:
+            image = Image.open(f)
+            self.assertEqual(image.size, (320, 640))
+            self.assertFalse(image.getexif())
+        with default_storage.open(variants["webp"]["160"]) as f:
+            self.assertEqual(Image.open(f).format, "WEBP")
+
+    def test_small_image_keeps_original_width(self):
+        product = make_product(self.category, "Napoleon")
+        product.image = self.upload("products/small.jpg", (100, 80))
+
+        variants = build_variants(product.image, (160, 320))
+        self.assertEqual(list(variants["jpeg"]), ["100"])
+
+    def test_refresh_deletes_stale_files(self):
+        old = make_product(self.category, "Napoleon")
+        old.image = self.upload("products/old.jpg", (500, 500))
+        old_variants = build_variants(old.image, (160, 320, 640))
+        Product.objects.filter(pk=old.pk).update(
+            image=self.upload("products/new.jpg", (500, 500)), image_variants=old_variants,
+        )
+
+        self.assertTrue(refresh_variants(Product, old.pk))
+
+        variants = Product.objects.get(pk=old.pk).image_variants
+        self.assertEqual(variants["source"], "products/new.jpg")
+        for fmt in ("webp", "jpeg"):
+            for name in old_variants[fmt].values():
+                self.assertFalse(default_storage.exists(name), name)
+            for name in variants[fmt].values():
+                self.assertTrue(default_storage.exists(name), name)
+        # Yangilangan obyekt qayta ishlanmaydi
+        self.assertFalse(refresh_variants(Product, old.pk))
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.cakes = Category.objects.create(name="Tortlar")
+        cls.drinks = Category.objects.create(name="Ichimliklar")
+        cls.napoleon = make_product(cls.cakes, "Napoleon", description="Qatlamli tort")
+        cls.medovik = make_product(cls.cakes, "Medovik", description="Asalli, qo'y sutidan")
+        cls.choco = make_product(cls.cakes, "Shokoladli tort")
+        cls.cocoa = make_product(cls.drinks, "Issiq shokolad")
+        make_product(cls.drinks, "Shokoladli kokteyl", is_available=False)
+
+    def setUp(self):
+        cache.clear()
+        search._index.update(version=None, index=None)
+
+    def names(self, query, **kwargs):
+        ranked, _ = search.search_products(query, **kwargs)
+        names = dict(Product.objects.values_list("id", "name"))
+        return [names[pid] for pid, _ in ranked]
+
+    def test_cyrillic_and_apostrophes_are_normalized(self):
+        self.assertEqual(search.normalize("Қўй гўшти"), "qoy goshti")
+        self.assertEqual(self.names("наполеон"), ["Napoleon"])
+        # "qo'y", "qo‘y" va "qoy" bir xil
+        self.assertEqual(self.names("qo‘y"), ["Medovik"])
+        self.assertEqual(self.names("qoy"), ["Medovik"])
+
+    def test_name_match_ranks_first(self):
+        # "tort" Napoleon va Medovikda faqat tavsif/kategoriyada uchraydi
+        names = self.names("tort")
+        self.assertEqual(names[0], "Shokoladli tort")
+        self.assertEqual(set(names[1:]), {"Napoleon", "Medovik"})
+
+    def test_unavailable_products_are_hidden(self):
+        self.assertNotIn("Shokoladli kokteyl", self.names("shokolad"))
+        self.assertIn("Shokoladli kokteyl", self.names("shokolad", available_only=False))
+
+    def test_facets_are_counted_before_category_filter(self):
+        ranked, facets = search.search_products("shokolad", category_id=self.drinks.id)
+
+        self.assertEqual([pid for pid, _ in ranked], [self.cocoa.id])
+        self.assertEqual({f["name"]: f["count"] for f in facets}, {"Tortlar": 1, "Ichimliklar": 1})
+
+    def test_search_api(self):
+        data = self.client.get(reverse("product_search_api"), {"q": "шоколад"}).json()
+        self.assertEqual({p["name"] for p in data["results"]}, {"Shokoladli tort", "Issiq shokolad"})
+        self.assertEqual(sum(f["count"] for f in data["facets"]), 2)
+        self.assertEqual(self.client.get(reverse("product_search_api"), {"category": "x"}).status_code, 400)
+
+    def test_category_rename_updates_search_text_only_when_changed(self):
+        category = Category.objects.get(pk=self.cakes.pk)
+        with self.assertNumQueries(1):
+            category.save()
+
+        category.name = "Shirinliklar"
+        category.save()
+        self.napoleon.refresh_from_db()
+        self.assertEqual(self.napoleon.search_text, "napoleon shirinliklar qatlamli tort")
+
+    def test_admin_search_matches_id_and_all_results(self):
+        admin = User.objects.create_superuser("admin", "admin@example.com", "x")
+        self.client.force_login(admin)
+        url = reverse("admin:product_product_changelist")
+
+        response = self.client.get(url, {"q": str(self.medovik.id)})
+        self.assertIn(self.medovik, response.context["cl"].result_list)
+
+        response = self.client.get(url, {"q": "tort"})
+        self.assertEqual(response.context["cl"].result_count, 3)
+        self.assertEqual(response.context["cl"].result_list[0], self.choco)
+
+
+class PriceTableTests(SimpleTestCase):
+    def test_lookup_by_sparse_ids(self):
+        table = PriceTable(1, [
+            (10 ** 9, Decimal(7000), True, "Medovik", 2),
+            (5, Decimal(12000), False, "Napoleon", 1),
+        ])
+
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.get(5), (12000, False, "Napoleon", 1))
+        self.assertEqual(table.get(10 ** 9), (7000, True, "Medovik", 2))
+        for missing in (0, 6, -1, 10 ** 10):
+            self.assertIsNone(table.get(missing))
+
+    def test_empty_table(self):
+        self.assertIsNone(PriceTable(1, []).get(1))
+
+
+class PriceListImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        category = Category.objects.create(name="Tortlar")
+        cls.napoleon, cls.medovik, cls.praga = [
+            make_product(category, name, price)
+            for name, price in (("Napoleon", 1000), ("Medovik", 2000), ("Praga", 3000))
+        ]
+
+    def test_price_formats(self):
+        for text, price in (
+            ("12 000 so'm", 12000), ("12,000", 12000), ("12.000", 12000), ("1.200.000", 1200000),
+            ("1 234,50", 1234), ("1.234,56", 1235), ("1,234.56", 1235), ("12.5", 12), (7000.0, 7000),
+        ):
+            self.assertEqual(parse_price(text), price, text)
+        for text in ("abc", "", "12.34.5", "1,234,56", "1.2.3,4", "-5", float("inf"), float("nan")):
+            with self.assertRaises(ValueError, msg=text):
+                parse_price(text)
+
+    def price_list(self, *lines):
+        return BytesIO(("id,nomi,narxi,mavjud\n" + "".join(lines)).encode())
+
+    def test_overflowing_code_is_reported_unmatched(self):
+        diff = diff_prices(self.price_list("inf,Tiramisu,5000,\n", "1e400,,5000,\n", "nan,Praga,3500,\n"), "narxlar.csv")
+
+        self.assertEqual(diff.unknown, [(2, "inf"), (3, "1e400")])
+        # ID o'qilmasa nom bo'yicha topiladi
+        self.assertEqual([c.product_id for c in diff.increases], [self.praga.id])
+
+    def test_preview_and_apply_only_changed_rows(self):
+        diff = diff_prices(self.price_list(
+            f"{self.napoleon.id},,1 200,\n",
+            ",MEDOVIK,1500 so'm,\n",
+            f"{self.praga.id},Praga,3000,yo'q\n",
+            "999,Tiramisu,5000,\n",
+            f"{self.napoleon.id},,abc,\n",
+        ), "narxlar.csv")
+
+        self.assertEqual([c.product_id for c in diff.increases], [self.napoleon.id])
+        self.assertEqual([c.delta for c in diff.decreases], [-500])
+        self.assertEqual([c.available for c in diff.availability], [False])
+        self.assertEqual(diff.unknown, [(5, "999")])
+        self.assertEqual([number for number, _ in diff.errors], [6])
+
+        version = current_version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(apply_prices(diff.targets()), 3)
+        self.assertEqual(callbacks.count(invalidate_catalog), 1)
+        self.assertEqual(current_version(), version + 1)
+
+        self.assertEqual(
+            list(Product.objects.order_by("id").values_list("price", "is_available")),
+            [(1200, True), (1500, True), (3000, False)],
+        )
+        # Qayta qo'llash hech narsani o'zgartirmaydi va katalogni yangilamaydi
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertEqual(apply_prices(diff.targets()), 0)
+        self.assertEqual(callbacks, [])
+
+
+class PageShellTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = Category.objects.create(name="Tortlar")
+        make_product(cls.category, "Napoleon")
+
+    def setUp(self):
+        cache.clear()
+        page_cache._pages.clear()
+
+    def test_shell_is_revalidated_with_etag(self):
+        response = self.client.get(reverse("home"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("public", response["Cache-Control"])
+        etag = response["ETag"]
+
+        response = self.client.get(reverse("home"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_catalog_change_replaces_shell(self):
+        etag = self.client.get(reverse("home"))["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Pishiriqlar")
+
+        response = self.client.get(reverse("home"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("Pishiriqlar", response.content.decode())
+
+    def test_csrf_token_is_served_separately(self):
+        response = self.client.get(reverse("csrf_token_api"))
+
+        self.assertEqual(response["Cache-Control"], "no-store")
+        self.assertTrue(response.json()["csrfToken"])
+        self.assertIn("csrftoken", response.cookies)
+        self.assertNotIn("csrftoken", self.client.get(reverse("home")).cookies)
+
+    def test_host_key_is_safe_and_cache_is_bounded(self):
+        key = page_cache.host_key("../../etc:80")
+        self.assertNotIn("/", key)
+        self.assertNotEqual(key, page_cache.host_key("../../ETC:81"))
+
+        for i in range(page_cache.MAX_PAGES + 5):
+            page_cache.get_shell(f"host{i}.example.uz")
+        self.assertEqual(len(page_cache._pages), page_cache.MAX_PAGES)
@@ -1,7 +1,11 @@
 from django.urls import path
 
-from product.views import home_page
+from product.views import home_page, csrf_token_api, catalog_api, product_list_api, product_search_api
 
 urlpatterns = [
     path("", home_page, name="home"),
+    path("api/csrf/", csrf_token_api, name="csrf_token_api"),
+    path("api/catalog/", catalog_api, name="catalog_api"),
+    path("api/products/", product_list_api, name="product_list_api"),
+    path("api/search/", product_search_api, name="product_search_api"),
 ]
@@ -1,36 +1,139 @@
-from django.shortcuts import render
+import zlib
+
+from django.http import JsonResponse, HttpResponse, HttpResponseNotModified
+from django.middleware.csrf import get_token
 from django.views.decorators.csrf import ensure_csrf_cookie
+from django.views.decorators.http import require_GET
 
-from client.models import Banner
-from product.models import Product, Category
+from product.catalog import get_catalog, products_for_host, catalog_delta, product_row, absolute_row
+from product.models import Product
+from product.page_cache import get_shell
+from product.search import search_products
 
+PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
 
-@ensure_csrf_cookie
+
+@require_GET
 def home_page(request):
-    # Faqat mavjud mahsulotlarni va tegishli kategoriyalarni yuklash
-    active_products = Product.objects.filter(is_available=True).select_related('category')
-    categories = Category.objects.all()
+    """WebApp qobig'i: hamma uchun bir xil, katalog versiyasi bo'yicha keshlanadi"""
+    etag, html = get_shell(request.get_host())
+
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(html)
+    response['ETag'] = etag
+    # Cookie'ga bog'liq emas: brauzer va proxy saqlab, ETag bilan tekshiradi
+    response['Cache-Control'] = 'public, no-cache'
+    return response
+
+
+@ensure_csrf_cookie
+@require_GET
+def csrf_token_api(request):
+    """CSRF tokenni alohida beradi (sahifa keshini buzmaslik uchun)"""
+    response = JsonResponse({'csrfToken': get_token(request)})
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@require_GET
+def catalog_api(request):
+    """Katalog JSON ko'rinishida: ETag/304 va ?since=<versiya> bo'yicha delta"""
+    catalog = get_catalog()
 
     # Bazaviy URL (Telegram WebApp-da rasm yo'llari to'liq bo'lishi kerak)
     base_url = request.build_absolute_uri('/')[:-1]
 
-    products_data = []
+    # Rasm URL lari hostga bog'liq, shuning uchun ETag ga host ham kiradi
+    etag = f'"{catalog["version"]}-{zlib.crc32(base_url.encode()):08x}"'
+    if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    delta = None
+    since = request.GET.get('since')
+    if since and since.isdecimal():
+        delta = catalog_delta(int(since), base_url)
+
+    if delta is not None:
+        data = {
+            'version': catalog['version'],
+            'full': False,
+            'since': int(since),
+            'products': delta['products'],
+            'removed': delta['removed'],
+        }
+    else:
+        data = {
+            'version': catalog['version'],
+            'full': True,
+            'products': products_for_host(base_url),
+            'categories': catalog['categories'],
+            'banners': catalog['banners'],
+        }
+
+    response = JsonResponse(data)
+    response['ETag'] = etag
+    response['Cache-Control'] = 'no-cache'
+    return response
+
 
-    banners = Banner.objects.filter(is_active=True)
+@require_GET
+def product_list_api(request):
+    """Mahsulotlar ro'yxati: kategoriya bo'yicha filtr va keyset (cursor) sahifalash.
 
-    for p in active_products:
-        products_data.append({
-            'id': p.id,
-            'name': p.name,
-            'price': float(p.price),
-            'cat': p.category.name.lower() if p.category else "boshqa",
-            'img': f"{base_url}{p.image.url}" if p.image else f"{base_url}/static/img/no-image.png"
-        })
+    ``?category=<id>&cursor=<oxirgi_id>&limit=<son>`` — keyingi sahifa uchun
+    javobdagi ``next_cursor`` yuboriladi.
+    """
+    category = request.GET.get('category')
+    cursor = request.GET.get('cursor')
+    limit = request.GET.get('limit')
 
-    context = {
-        'categories': categories,
-        'products_list': products_data,
-        'banners': banners,
-    }
-    return render(request, 'index.html', context)
+    for value in (category, cursor, limit):
+        if value and not value.isdecimal():
+            return JsonResponse({'status': 'error', 'message': "Noto'g'ri parametr"}, status=400)
+
+    limit = min(max(int(limit), 1), MAX_PAGE_SIZE) if limit else PAGE_SIZE
+
+    queryset = Product.objects.filter(is_available=True)
+    if category:
+        # (category_id, is_available, id) indeksi bo'yicha o'qiladi
+        queryset = queryset.filter(category_id=int(category))
+    if cursor:
+        queryset = queryset.filter(id__gt=int(cursor))
+
+    page = list(queryset.select_related('category').order_by('id')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    # Bazaviy URL (Telegram WebApp-da rasm yo'llari to'liq bo'lishi kerak)
+    base_url = request.build_absolute_uri('/')[:-1]
+
+    return JsonResponse({
+        'results': [absolute_row(product_row(p), base_url) for p in page],
+        'next_cursor': page[-1].id if has_more else None,
+    })
+
+
+@require_GET
+def product_search_api(request):
+    """Mahsulot qidiruvi: ``?q=<so'z>&category=<id>`` — natijalar va kategoriya bo'yicha sonlar"""
+    query = request.GET.get('q', '').strip()
+    category = request.GET.get('category')
+    if category and not category.isdecimal():
+        return JsonResponse({'status': 'error', 'message': "Noto'g'ri parametr"}, status=400)
+
+    ranked, facets = search_products(query, category_id=int(category) if category else None)
+
+    # Natijalar katalog snapshotidan olinadi (qo'shimcha so'rovsiz)
+    base_url = request.build_absolute_uri('/')[:-1]
+    rows = {p['id']: p for p in products_for_host(base_url)}
 
+    return JsonResponse({
+        'query': query,
+        'results': [rows[pid] for pid, _ in ranked if pid in rows],
+        'facets': facets,
+    })
@@ -4,7 +4,6 @@ tg.expand();
 
 let products = [];
 let cart = JSON.parse(localStorage.getItem('cart')) || {};
-let retryCount = 0;
 
 // ========================
 // Telegram User ID Setup
@@ -24,11 +23,55 @@ function setupTelegramUser() {
     }
 }
 
+// ========================
+// Catalog (localStorage + delta sync)
+// ========================
+const CATALOG_KEY = 'catalog';
+
+function mergeProducts(current, changed, removed) {
+    const byId = new Map((current || []).map(p => [p.id, p]));
+    (removed || []).forEach(id => byId.delete(id));
+    (changed || []).forEach(p => byId.set(p.id, p));
+    return [...byId.values()].sort((a, b) => a.id - b.id);
+}
+
+async function loadCatalog() {
+    const cached = JSON.parse(localStorage.getItem(CATALOG_KEY) || 'null');
+    let url = '/product/api/catalog/';
+    const headers = {};
+
+    if (cached?.version) {
+        url += `?since=${cached.version}`;
+        if (cached.etag) headers['If-None-Match'] = cached.etag;
+    }
+
+    try {
+        const response = await fetch(url, {headers, cache: 'no-store'});
+        if (response.status === 304 && cached) return cached.products;
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+
+        const data = await response.json();
+        const list = data.full
+            ? data.products
+            : mergeProducts(cached?.products, data.products, data.removed);
+
+        localStorage.setItem(CATALOG_KEY, JSON.stringify({
+            version: data.version,
+            etag: response.headers.get('ETag'),
+            products: list,
+        }));
+        return list;
+    } catch (e) {
+        // Tarmoq bo'lmasa oxirgi saqlangan katalog ko'rsatiladi
+        console.error("Katalogni yuklashda xato:", e);
+        return cached?.products || [];
+    }
+}
+
 // ========================
 // Initialize App
 // ========================
-function initializeApp() {
-    setupTelegramUser();
+function startBannerCarousel() {
     const slides = document.querySelectorAll("#banner-carousel img");
 
     if (slides.length === 0) return;
@@ -46,39 +89,117 @@ function initializeApp() {
         slides[current].classList.add("opacity-100");
 
     }, 4000);
+}
 
-    const dataElement = document.getElementById('products-data');
-    if (!dataElement) {
-        if (retryCount < 10) {
-            retryCount++;
-            setTimeout(initializeApp, 100);
-        } else {
-            console.error("products-data topilmadi");
-        }
-        return;
+async function initializeApp() {
+    setupTelegramUser();
+    startBannerCarousel();
+
+    const list = await loadCatalog();
+    products = Array.isArray(list) ? list : [];
+    updateBadge();
+
+    // Birinchi ekran serverdan sahifalab yuklanadi, qolgani scroll bo'yicha
+    await loadNextPage(true);
+    observeGridEnd();
+}
+
+// ========================
+// Server-side listing (keyset pagination)
+// ========================
+const listing = {category: '', cursor: null, done: false, loading: false, token: 0};
+
+async function loadNextPage(reset = false) {
+    if (reset) Object.assign(listing, {cursor: null, done: false, loading: false});
+    if (listing.loading || listing.done) return;
+
+    listing.loading = true;
+    const token = ++listing.token;
+    const params = new URLSearchParams();
+    if (listing.category) params.set('category', listing.category);
+    if (listing.cursor) params.set('cursor', listing.cursor);
+
+    try {
+        const response = await fetch(`/product/api/products/?${params}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+
+        // Kategoriya almashgan bo'lsa eski javob tashlab yuboriladi
+        if (token !== listing.token) return;
+
+        // Savat uchun mahsulot ma'lumotlari katalogda ham bo'lishi kerak
+        products = mergeProducts(products, data.results, []);
+        renderHome(data.results, !reset);
+        listing.cursor = data.next_cursor;
+        listing.done = !data.next_cursor;
+    } catch (e) {
+        console.error("Mahsulotlarni yuklashda xato:", e);
+        if (reset && token === listing.token) renderHome(filterLocal(listing.category));
+    } finally {
+        if (token === listing.token) listing.loading = false;
     }
+}
+
+function filterLocal(category) {
+    // Tarmoq bo'lmaganda saqlangan katalogdan filtrlash
+    return category ? products.filter(p => String(p.category_id) === String(category)) : products;
+}
+
+function observeGridEnd() {
+    const sentinel = document.getElementById('food-grid-sentinel');
+    if (!sentinel || !('IntersectionObserver' in window)) return;
+
+    new IntersectionObserver(entries => {
+        if (entries.some(e => e.isIntersecting)) loadNextPage();
+    }, {rootMargin: '400px'}).observe(sentinel);
+}
+
+// ========================
+// Search
+// ========================
+let searchTimer = null;
+let searchQuery = '';
+
+function onSearchInput(value) {
+    clearTimeout(searchTimer);
+    searchTimer = setTimeout(() => {
+        searchQuery = value.trim();
+        searchQuery ? runSearch() : (showFacets([]), loadNextPage(true));
+    }, 250);
+}
+
+async function runSearch() {
+    const query = searchQuery;
+    const params = new URLSearchParams({q: query});
+    if (listing.category) params.set('category', listing.category);
 
     try {
-        const rawData = JSON.parse(dataElement.textContent);
-        products = Array.isArray(rawData) ? rawData : [];
-        renderHome(products);
-        updateBadge();
+        const response = await fetch(`/product/api/search/?${params}`);
+        if (!response.ok) throw new Error(`HTTP ${response.status}`);
+        const data = await response.json();
+        if (query !== searchQuery) return;
+
+        listing.done = true;
+        listing.token++;
+        renderHome(data.results);
+        showFacets(data.facets);
     } catch (e) {
-        console.error("JSON o‘qishda xato:", e);
+        console.error("Qidiruvda xato:", e);
     }
 }
 
-let currentCategory = 'all'; // Dastlabki holat
+function showFacets(facets) {
+    const counts = new Map((facets || []).map(f => [String(f.id), f.count]));
+    document.querySelectorAll('.category-btn[data-category-id]').forEach(btn => {
+        const el = btn.querySelector('.cat-count');
+        if (el) el.innerText = counts.has(btn.dataset.categoryId) ? `(${counts.get(btn.dataset.categoryId)})` : '';
+    });
+}
 
-// Yangi funksiya: filterItems
+// Yangi funksiya: filterItems (kategoriya id bo'yicha, serverda filtrlanadi)
 function filterItems(category, btn) {
-    // Filtrlangan mahsulotlar
-    const filtered = category === 'all'
-        ? products
-        : products.filter(p => p.cat?.toLowerCase() === category.toLowerCase());
-
-    // Sahifani yangilash
-    renderHome(filtered);
+    listing.category = category === 'all' ? '' : category;
+    searchQuery ? runSearch() : loadNextPage(true);
 
     // Active class ni o'zgartirish
     document.querySelectorAll('.category-btn').forEach(b => b.classList.remove('active-category'));
@@ -86,32 +207,26 @@ function filterItems(category, btn) {
 
     // Haptic feedback (ixtiyoriy)
     tg.HapticFeedback?.impactOccurred('light');
-
-    console.log(`Filtrlandi: ${category}, natijalar: ${filtered.length}`); // Debug uchun
 }
 
 // ========================
 // Render Home / Grid
 // ========================
-function renderHome(items) {
-    const grid = document.getElementById('food-grid');
-    if (!grid) return;
-
-    const safeItems = Array.isArray(items) ? items : [];
-
-    if (!safeItems.length) {
-        grid.innerHTML = `
-            <div class="col-span-2 text-center py-20 text-gray-400 font-medium italic">
-                Hozircha mahsulotlar mavjud emas...
-            </div>`;
-        return;
-    }
+function srcset(sizes) {
+    // {kenglik: url} -> "url 320w, url 640w"
+    return Object.entries(sizes || {}).map(([width, url]) => `${url} ${width}w`).join(', ');
+}
 
-    grid.innerHTML = safeItems.map(p => `
+function productCard(p) {
+    return `
         <div class="bg-white rounded-[2.2rem] p-3 shadow-sm border border-gray-50 flex flex-col">
             <div class="relative overflow-hidden rounded-[1.8rem] mb-3 h-32 bg-gray-50">
-                <img src="${p.img}" class="w-full h-full object-cover"
-                     onerror="this.src='https://via.placeholder.com/150?text=Le+Vanille'">
+                <picture>
+                    <source type="image/webp" srcset="${srcset(p.images?.webp)}" sizes="50vw">
+                    <img src="${p.img}" srcset="${srcset(p.images?.jpeg)}" sizes="50vw"
+                         class="w-full h-full object-cover" loading="lazy"
+                         onerror="this.srcset='';this.src='https://via.placeholder.com/150?text=Le+Vanille'">
+                </picture>
             </div>
             <h4 class="font-bold text-[13px] text-gray-800 px-1 leading-tight h-8 overflow-hidden">${p.name}</h4>
             <div class="flex justify-between items-center mt-3 px-1 pb-1">
@@ -123,9 +238,29 @@ function renderHome(items) {
                 </button>
             </div>
         </div>
-    `).join('');
+    `;
+}
 
-    console.log("Render yakunlandi, grid to'ldirildi.");
+function renderHome(items, append = false) {
+    const grid = document.getElementById('food-grid');
+    if (!grid) return;
+
+    const safeItems = Array.isArray(items) ? items : [];
+
+    if (append) {
+        grid.insertAdjacentHTML('beforeend', safeItems.map(productCard).join(''));
+        return;
+    }
+
+    if (!safeItems.length) {
+        grid.innerHTML = `
+            <div class="col-span-2 text-center py-20 text-gray-400 font-medium italic">
+                Hozircha mahsulotlar mavjud emas...
+            </div>`;
+        return;
+    }
+
+    grid.innerHTML = safeItems.map(productCard).join('');
 }
 
 // ========================
@@ -133,6 +268,7 @@ function renderHome(items) {
 // ========================
 function addToCart(id) {
     cart[id] = (cart[id] || 0) + 1;
+    localStorage.removeItem('order_request_id');
     localStorage.setItem('cart', JSON.stringify(cart));
     updateBadge();
     tg.HapticFeedback?.notificationOccurred('success');
@@ -204,6 +340,7 @@ function changeQty(id, delta) {
     if (!cart[id]) return;
     cart[id] += delta;
     if (cart[id] <= 0) delete cart[id];
+    localStorage.removeItem('order_request_id');
     localStorage.setItem('cart', JSON.stringify(cart));
     renderCart();
     updateBadge();
@@ -226,7 +363,15 @@ async function checkout(event) {
     const ids = Object.keys(cart);
     if (!ids.length) return;
 
+    // Bir savat uchun bitta so'rov ID: qayta bosilsa ham takroriy buyurtma bo'lmaydi
+    let requestId = localStorage.getItem('order_request_id');
+    if (!requestId) {
+        requestId = crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(16).slice(2)}`;
+        localStorage.setItem('order_request_id', requestId);
+    }
+
     const orderData = {
+        request_id: requestId,
         telegram_id: telegramId,
         items: ids.map(id => {
             const product = products.find(p => p.id == id);
@@ -248,7 +393,7 @@ async function checkout(event) {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json',
-                'X-CSRFToken': getCookie('csrftoken')
+                'X-CSRFToken': await csrfToken()
             },
             body: JSON.stringify(orderData)
         });
@@ -260,6 +405,7 @@ async function checkout(event) {
             tg.showAlert("Buyurtmangiz qabul qilindi!");
             cart = {};
             localStorage.removeItem('cart');
+            localStorage.removeItem('order_request_id');
             updateBadge();
             showPage('home');
         } else {
@@ -294,6 +440,20 @@ function showPage(pageId, btn) {
 // ========================
 // Helpers
 // ========================
+async function csrfToken() {
+    // Sahifa keshlangani uchun CSRF cookie alohida so'rov bilan olinadi
+    let token = getCookie('csrftoken');
+    if (!token) {
+        try {
+            const response = await fetch('/product/api/csrf/', {credentials: 'same-origin'});
+            token = (await response.json()).csrfToken;
+        } catch (e) {
+            console.error("CSRF token olinmadi:", e);
+        }
+    }
+    return token;
+}
+
 function getCookie(name) {
     let cookieValue = null;
     if (document.cookie && document.cookie !== '') {